@@ -6,88 +6,530 @@
 import asyncio
 import bz2
 import gzip
+import io
 import json
-from typing import TYPE_CHECKING
+import time
+from contextlib import suppress
+from typing import TYPE_CHECKING, NamedTuple
 
 import numpy as np
 import websockets
 from numpy.typing import NDArray
 from websockets.exceptions import WebSocketException
 
+from sensorium.communication.encoding import (
+    CAMERA_SHAPE,
+    LIDAR_RESOLUTION,
+    MAX_MESSAGE_SIZE,
+    BytesLike,
+    StreamFrame,
+    decode_lidar,
+    decode_message,
+    decode_stream_frame,
+    decode_thumbnails,
+    decode_voxel_geometry,
+    decode_voxel_mesh,
+    decode_voxel_rle,
+    get_camera_shape,
+    get_chunked_size,
+    get_response_error,
+    write_chunk,
+)
+from sensorium.data_processing.camera.thumbnails import (
+    THUMBNAIL_STEP,
+    THUMBNAIL_WIDTH,
+    ThumbnailAtlas,
+)
+from sensorium.data_processing.voxel_process.voxel_geometry import VoxelGeometry
+from sensorium.data_processing.voxel_process.voxel_mesh import VoxelMesh
+
 if TYPE_CHECKING:
     from websockets.legacy.client import WebSocketClientProtocol
 
 
-class ClientManager:
-    """Manages the WebSocket connection and data requests."""
-
-    def __init__(self) -> None:
-        """Initialize ClientManager."""
+RequestOptions = dict[str, str | int | float]
+ControlMessage = dict[str, str | int | float | list[str] | dict[str, RequestOptions]]
+
+
+# Every connection answers its requests one at a time, so the small trajectory replies get their
+# own connection instead of queueing behind the bulk camera, lidar and voxel transfers
+DEFAULT_ROUTES = {
+    'trajectory': 'small',
+    'camera2': 'camera',
+    'camera3': 'camera',
+    'stereo': 'camera',
+    'lidar': 'lidar',
+    'voxel': 'voxel',
+    'map': 'voxel',
+}
+DEFAULT_CONNECTION = 'bulk'  # connection of the sensor types without a route, e.g. thumbnails
+
+
+class QualityLevel(NamedTuple):
+    """The data quality requested by the widgets, from full detail to the smallest responses."""
+
+    name: str
+    camera_scale: float  # of the display size the camera images are requested in
+    lidar_encoding: str | None  # None keeps the configured encoding
+    lidar_subsample: int  # every n-th point of the point cloud is sent
+    voxel_encoding: str | None  # None keeps the configured encoding
+
+
+# The voxels keep their configured encoding at every level: they are not measured, see
+# QUALITY_SENSORS, and an 'rle' grid would replace a configured 'geometry' or 'mesh' view
+QUALITY_LEVELS = (
+    QualityLevel('full', 1.0, None, 1, None),
+    QualityLevel('high', 0.75, 'quantized', 1, None),
+    QualityLevel('medium', 0.5, 'quantized', 2, None),
+    QualityLevel('low', 0.35, 'quantized', 4, None),
+)
+# Sensors the playback waits for, the voxels are shown whenever they are ready
+QUALITY_SENSORS = frozenset({'camera2', 'camera3', 'stereo', 'lidar', 'trajectory'})
+QUALITY_WINDOW = 10  # responses between two decisions of the quality controller
+QUALITY_SMOOTHING = 0.3  # weight of a new measurement in the moving averages
+QUALITY_UPGRADE_MARGIN = 0.5  # a higher quality is tried below this part of the frame time
+
+
+class QualityController:
+    """Picks the quality level whose responses arrive within the target frame time.
+
+    The latency of every response and the throughput of the connections are averaged per
+    sensor. The requests of a frame run in parallel on the connection pool, so the slowest
+    sensor decides the frame time. A frame time above the target lowers the quality by one
+    level, a frame time below half the target raises it again. The averages start anew after
+    every change, so the next decision measures the new level.
+    """
+
+    def __init__(
+        self, target_fps: float = 10, levels: tuple[QualityLevel, ...] = QUALITY_LEVELS
+    ) -> None:
+        """Initialize a disabled controller at the highest level.
+
+        Args:
+            target_fps: the frame rate the responses must keep up with.
+            levels: the quality levels from the highest to the lowest.
+        """
+        self.target_fps = target_fps
+        self.levels = levels
+        self.enabled = False
+        self.level_index = 0
+        self.throughput = 0.0  # in bytes per second
+        self._latencies: dict[str, float] = {}
+        self._responses = 0
+
+    @property
+    def level(self) -> QualityLevel:
+        """The current quality level, the highest while the controller is disabled."""
+        return self.levels[self.level_index if self.enabled else 0]
+
+    @property
+    def frame_time(self) -> float:
+        """The averaged time to fetch the responses of a frame in seconds."""
+        return max(self._latencies.values(), default=0.0)
+
+    def record(self, sensor_type: str, num_bytes: int, seconds: float) -> None:
+        """Measure a response and adapt the quality level every QUALITY_WINDOW responses."""
+        if sensor_type not in QUALITY_SENSORS or seconds <= 0:
+            return
+        latency = self._latencies.get(sensor_type, seconds)
+        self._latencies[sensor_type] = latency + QUALITY_SMOOTHING * (seconds - latency)
+        throughput = num_bytes / seconds
+        self.throughput += QUALITY_SMOOTHING * (throughput - self.throughput)
+        self._responses += 1
+        if self._responses >= QUALITY_WINDOW:
+            self.adapt()
+
+    def adapt(self) -> None:
+        """Lower or raise the quality level by one from the measured frame time."""
+        self._responses = 0
+        if not self.enabled or self.target_fps <= 0:
+            return
+        target = 1 / self.target_fps
+        index = self.level_index
+        if self.frame_time > target:
+            index = min(index + 1, len(self.levels) - 1)
+        elif self.frame_time < QUALITY_UPGRADE_MARGIN * target:
+            index = max(index - 1, 0)
+        if index != self.level_index:
+            print(
+                f'Quality {self.levels[self.level_index].name} -> {self.levels[index].name}: '
+                f'{self.frame_time * 1000:.0f} ms per frame, {self.throughput / 1e6:.1f} MB/s'
+            )
+            self.level_index = index
+            self._latencies.clear()
+
+
+class Connection:
+    """One WebSocket connection that answers its requests in order."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize a closed connection.
+
+        Args:
+            name: the name of the connection in the pool, used in log messages.
+        """
+        self.name = name
         self._client: WebSocketClientProtocol | None = None
         self.sem = asyncio.Semaphore(1)
-
-    async def connect(self, ip: str, port: int) -> None:
-        """Establish a connection to the server."""
-        uri = f'ws://{ip}:{port}'
-        try:
-            print(f'Connecting to {uri}...')
-            self._client = await websockets.connect(uri, max_size=2_097_152)  # type: ignore[assignment]
-            print('Client connected.')
-        except WebSocketException as e:
-            msg = f'Failed to connect to {uri}: {e!s}'
-            raise ConnectionError(msg) from e
+        self.max_message_size = MAX_MESSAGE_SIZE
+        self._request_id = 0
+        # Receive the responses of cancelled requests, which must be read before the next one
+        self._stale_responses: list[asyncio.Task[BytesLike]] = []
+
+    @property
+    def connected(self) -> bool:
+        """Whether the connection is open."""
+        return self._client is not None
+
+    async def connect(self, uri: str, max_message_size: int = MAX_MESSAGE_SIZE) -> None:
+        """Open the connection, see ClientManager.connect."""
+        self._client = await websockets.connect(uri, max_size=max_message_size)  # type: ignore[assignment]
+        self.max_message_size = max_message_size
+        for stale_response in self._stale_responses:
+            stale_response.cancel()
+        self._stale_responses = []
 
     async def disconnect(self) -> None:
-        """Close the WebSocket connection."""
+        """Close the connection."""
         if self._client:
+            client, self._client = self._client, None
+            await client.close()
+
+    async def send_request(
+        self,
+        sensor_type: str,
+        sequence_id: int,
+        frame_id: int,
+        options: RequestOptions | None = None,
+    ) -> BytesLike:
+        """Send a request to the server and fetch the data.
+
+        When the caller is cancelled while waiting for the response, the server is told to skip
+        the request and its (empty) response is discarded before the next request is answered.
+        """
+        if not self._client:
+            msg = 'Client is not connected.'
+            raise ConnectionError(msg)
+
+        self._request_id += 1
+        request_id = self._request_id
+        request: dict[str, str | int | RequestOptions] = {
+            'sensor_type': sensor_type,
+            'seq_id': sequence_id,
+            'frame_id': frame_id,
+            'request_id': request_id,
+            'max_size': self.max_message_size,
+        }
+        if options:
+            request['options'] = options
+        request_message = json.dumps(request)
+
+        try:
+            while self._stale_responses:
+                stale_response = self._stale_responses.pop(0)
+                # The error of a cancelled request is not needed either
+                with suppress(RuntimeError):
+                    await stale_response
+            print(f'Sending request on {self.name}: {request_message}')
+            # The shielded send and receive complete anyway, so the response of a cancelled
+            # request is read completely, even if it is streamed in chunks
+            receive: asyncio.Task[BytesLike] | None = None
             try:
-                await self._client.close()
-                self._client = None
-                print('Client disconnected.')
-            except WebSocketException as e:
-                print(f'Error while disconnecting: {e!s}')
+                await asyncio.shield(self._client.send(request_message))
+                print('Request sent.')
+                receive = asyncio.create_task(self._receive_response())
+                response = await asyncio.shield(receive)
+            except asyncio.CancelledError:
+                if receive is None:
+                    receive = asyncio.create_task(self._receive_response())
+                self._stale_responses.append(receive)
+                await asyncio.shield(self._cancel_request(request_id))
+                raise
+            print('Response received.')
+
+        except WebSocketException as e:
+            msg = f'Communication error: {e!s}'
+            raise RuntimeError(msg) from e
         else:
-            print('No active connection to disconnect.')
+            return response
 
-    async def send_request(self, sensor_type: str, sequence_id: int, frame_id: int) -> bytes:
-        """Send a request to the server and fetch the data."""
+    async def _receive_response(self) -> BytesLike:
+        """Receive one response, reassembling a response that is streamed in chunks.
+
+        The chunks are written into one preallocated buffer, which is returned without copying
+        it into a bytes object.
+
+        Raises:
+            RuntimeError: if the server sent an error instead of the data of the request.
+        """
         if not self._client:
             msg = 'Client is not connected.'
             raise ConnectionError(msg)
+        response = await self._client.recv()
+        if isinstance(response, bytes):
+            return response
+        size = get_chunked_size(response)
+        if size is None:
+            error = get_response_error(response)
+            if error is not None:
+                msg = f'Server error: {error}'
+                raise RuntimeError(msg)
+            return response.encode()
+        buffer = bytearray(size)
+        received = 0
+        while received < size:
+            chunk = await self._client.recv()
+            if isinstance(chunk, str):
+                msg = 'Unexpected text message in a chunked response'
+                raise TypeError(msg)
+            received += write_chunk(buffer, chunk)
+        return buffer
+
+    async def _cancel_request(self, request_id: int) -> None:
+        """Tell the server that the response of a request is not needed anymore."""
+        if self._client:
+            await self._client.send(json.dumps({'cancel': request_id}))
+
+
+class Subscription(Connection):
+    """A connection on which the server pushes the frames of a sequence, see subscribe.
+
+    The frames are received with ``receive`` or by iterating over the subscription. The server
+    paces the frames at the subscribed rate and drops the frames the client cannot keep up with,
+    so the frame ids of the received frames may have gaps.
+    """
 
-        request_message = json.dumps(
-            {'sensor_type': sensor_type, 'seq_id': sequence_id, 'frame_id': frame_id}
+    async def subscribe(
+        self,
+        sequence_id: int,
+        start_frame: int,
+        fps: float,
+        sensors: list[str],
+        options: dict[str, RequestOptions] | None = None,
+    ) -> None:
+        """Start the frames of a sequence, replacing the previous subscription.
+
+        Args:
+            sequence_id: the sequence id.
+            start_frame: the first pushed frame.
+            fps: the rate of the pushed frames.
+            sensors: the sensor types of every frame, e.g. ['stereo', 'lidar'].
+            options: the request options per sensor type, e.g. {'lidar': {'encoding': 'raw'}}.
+        """
+        await self._send_control(
+            'subscribe',
+            seq_id=sequence_id,
+            frame_id=start_frame,
+            fps=fps,
+            sensors=sensors,
+            options=options or {},
+            max_size=self.max_message_size,
         )
 
+    async def pause(self) -> None:
+        """Stop the pushed frames until resume."""
+        await self._send_control('pause')
+
+    async def resume(self) -> None:
+        """Continue the pushed frames, the next frame is due now."""
+        await self._send_control('resume')
+
+    async def seek(self, frame_id: int) -> None:
+        """Continue the pushed frames at a frame."""
+        await self._send_control('seek', frame_id=frame_id)
+
+    async def set_rate(self, fps: float) -> None:
+        """Change the rate of the pushed frames."""
+        await self._send_control('rate', fps=fps)
+
+    async def unsubscribe(self) -> None:
+        """Stop the pushed frames and close the connection."""
+        if self._client:
+            await self._send_control('unsubscribe')
+        await self.disconnect()
+
+    async def receive(self) -> StreamFrame:
+        """Receive the next pushed frame, the responses are decoded by the caller.
+
+        Frames that were pushed before a seek or a rate change may still arrive after it.
+        """
         try:
-            print(f'Sending request: {request_message}')
-            await self._client.send(request_message)
-            print('Request sent.')
-            response = await self._client.recv()
-            print('Response received.')
-            if isinstance(response, str):
-                response = response.encode()
+            return decode_stream_frame(await self._receive_response())
+        except WebSocketException as e:
+            msg = f'Communication error: {e!s}'
+            raise RuntimeError(msg) from e
 
+    def __aiter__(self) -> 'Subscription':
+        """Iterate over the pushed frames."""
+        return self
+
+    async def __anext__(self) -> StreamFrame:
+        """Receive the next pushed frame."""
+        if not self._client:
+            raise StopAsyncIteration
+        return await self.receive()
+
+    async def _send_control(
+        self, command: str, **fields: str | float | list[str] | dict[str, RequestOptions]
+    ) -> None:
+        """Send a control message of the frame stream."""
+        if not self._client:
+            msg = 'Client is not connected.'
+            raise ConnectionError(msg)
+        message: ControlMessage = {'control': command, **fields}
+        try:
+            await self._client.send(json.dumps(message))
         except WebSocketException as e:
             msg = f'Communication error: {e!s}'
             raise RuntimeError(msg) from e
-        else:
-            return response
+
+
+class ClientManager:
+    """Manages a pool of WebSocket connections and routes the data requests to them."""
+
+    def __init__(self, routes: dict[str, str] | None = None) -> None:
+        """Initialize ClientManager.
+
+        Args:
+            routes: the name of the connection of every sensor type, the sensor types without
+                a route use DEFAULT_CONNECTION. One connection is opened per name.
+        """
+        self.connections: dict[str, Connection] = {}
+        self.set_routes(DEFAULT_ROUTES if routes is None else routes)
+        self.quality = QualityController()
+        self.uri = ''
+        self.max_message_size = MAX_MESSAGE_SIZE
+
+    def set_routes(self, routes: dict[str, str]) -> None:
+        """Replace the routing policy and the pool of connections, while disconnected."""
+        if self.connected:
+            msg = 'The routes cannot be changed while the client is connected.'
+            raise RuntimeError(msg)
+        self.routes = routes
+        names = dict.fromkeys([*routes.values(), DEFAULT_CONNECTION])
+        self.connections = {name: Connection(name) for name in names}
+
+    @property
+    def connected(self) -> bool:
+        """Whether the connections are open."""
+        return any(connection.connected for connection in self.connections.values())
+
+    def get_connection(self, sensor_type: str) -> Connection:
+        """Get the connection the requests of a sensor type are sent on."""
+        return self.connections[self.routes.get(sensor_type, DEFAULT_CONNECTION)]
+
+    async def connect(self, ip: str, port: int, max_message_size: int = MAX_MESSAGE_SIZE) -> None:
+        """Establish the connections to the server.
+
+        Args:
+            ip: the server address.
+            port: the server port.
+            max_message_size: the largest message in bytes, larger responses are streamed in
+                chunks of at most this size.
+        """
+        uri = f'ws://{ip}:{port}'
+        self.uri = uri
+        self.max_message_size = max_message_size
+        try:
+            print(f'Connecting to {uri} with {len(self.connections)} connections...')
+            await asyncio.gather(
+                *(
+                    connection.connect(uri, max_message_size)
+                    for connection in self.connections.values()
+                )
+            )
+            print('Client connected.')
+        except (WebSocketException, OSError) as e:
+            await self.disconnect()
+            msg = f'Failed to connect to {uri}: {e!s}'
+            raise ConnectionError(msg) from e
+
+    async def subscribe(
+        self,
+        sequence_id: int,
+        start_frame: int,
+        fps: float,
+        sensors: list[str],
+        options: dict[str, RequestOptions] | None = None,
+    ) -> Subscription:
+        """Open a connection on which the server pushes frames, see Subscription.subscribe.
+
+        The pushed frames get their own connection, so they do not delay the data requests.
+        """
+        if not self.connected:
+            msg = 'Client is not connected.'
+            raise ConnectionError(msg)
+        subscription = Subscription('stream')
+        try:
+            await subscription.connect(self.uri, self.max_message_size)
+        except (WebSocketException, OSError) as e:
+            msg = f'Failed to connect to {self.uri}: {e!s}'
+            raise ConnectionError(msg) from e
+        await subscription.subscribe(sequence_id, start_frame, fps, sensors, options)
+        return subscription
+
+    async def disconnect(self) -> None:
+        """Close the WebSocket connections."""
+        if not self.connected:
+            print('No active connection to disconnect.')
+            return
+        try:
+            await asyncio.gather(
+                *(connection.disconnect() for connection in self.connections.values())
+            )
+            print('Client disconnected.')
+        except WebSocketException as e:
+            print(f'Error while disconnecting: {e!s}')
+
+    async def send_request(
+        self,
+        sensor_type: str,
+        sequence_id: int,
+        frame_id: int,
+        options: RequestOptions | None = None,
+    ) -> BytesLike:
+        """Send a request on the connection of the sensor type and fetch the data."""
+        connection = self.get_connection(sensor_type)
+        return await connection.send_request(sensor_type, sequence_id, frame_id, options)
 
     async def get_data(
-        self, sensor_type: str, sequence_id: int, frame_id: int, result: dict[str, bytes]
+        self,
+        sensor_type: str,
+        sequence_id: int,
+        frame_id: int,
+        result: dict[str, BytesLike],
+        options: RequestOptions | None = None,
     ) -> None:
-        """Fetch data for a specific sensor."""
-        async with self.sem:
-            result['data'] = await self.send_request(sensor_type, sequence_id, frame_id)
+        """Fetch data for a specific sensor, one request at a time per connection.
+
+        The latency and size of the response are recorded by the quality controller.
+        """
+        async with self.get_connection(sensor_type).sem:
+            start = time.perf_counter()
+            result['data'] = await self.send_request(sensor_type, sequence_id, frame_id, options)
+            self.quality.record(sensor_type, len(result['data']), time.perf_counter() - start)
 
 
 _client_manager = ClientManager()
 
 
-async def connect_client(ip: str, port: int) -> None:
-    """Establish a client connection."""
-    await _client_manager.connect(ip, port)
+async def connect_client(
+    ip: str,
+    port: int,
+    max_message_size: int = MAX_MESSAGE_SIZE,
+    routes: dict[str, str] | None = None,
+) -> None:
+    """Establish the client connections, see ClientManager.connect.
+
+    Args:
+        ip: the server address.
+        port: the server port.
+        max_message_size: the largest message in bytes.
+        routes: the name of the connection of every sensor type, see ClientManager.
+    """
+    if routes is not None:
+        _client_manager.set_routes(routes)
+    await _client_manager.connect(ip, port, max_message_size)
 
 
 async def disconnect_client() -> None:
@@ -95,46 +537,75 @@ async def disconnect_client() -> None:
     await _client_manager.disconnect()
 
 
-CAMERA2_SHAPE = (370, 1226, 3)  # resolution for camera2
-CAMERA3_SHAPE = (370, 1226, 3)  # resolution for camera3
-LIDAR_POINT_DIM = 3
-LIDAR_LABEL_DIM = 1
+def get_quality_controller() -> QualityController:
+    """Get the quality controller that measures the responses of the client."""
+    return _client_manager.quality
+
+
+async def subscribe(
+    sequence_id: int,
+    start_frame: int,
+    fps: float,
+    sensors: list[str],
+    options: dict[str, RequestOptions] | None = None,
+) -> Subscription:
+    """Let the server push the frames of a sequence at a rate, see ClientManager.subscribe."""
+    return await _client_manager.subscribe(sequence_id, start_frame, fps, sensors, options)
+
+
+CAMERA2_SHAPE = CAMERA_SHAPE  # full resolution for camera2
+CAMERA3_SHAPE = CAMERA_SHAPE  # full resolution for camera3
 VOXEL_SHAPE = (256, 256, 32)
 FOV_MASK_SHAPE = (2097152,)  # (256, 256, 32)
 T_VELO_2_CAM_SHAPE = (4, 4)
 TRAJECTORY_DIM = 3
 
 
-def decode_camera2_data(raw_data: bytes) -> NDArray[np.uint8]:
+def decode_camera_data(
+    raw_data: BytesLike, shape: tuple[int, int, int], out: NDArray[np.uint8] | None = None
+) -> NDArray[np.uint8]:
+    """Decode raw bytes into a BGR image, optionally straight into a preallocated buffer.
+
+    Args:
+        raw_data: the bz2 compressed image.
+        shape: the (height, width, channels) of the image.
+        out: C-contiguous uint8 buffer of the given shape that is reused for every frame.
+    """
+    if out is None:
+        return np.frombuffer(bz2.decompress(raw_data), dtype=np.uint8).reshape(shape)
+    if out.shape != shape or not out.flags.c_contiguous:
+        msg = f'Camera buffer must be C-contiguous with shape {shape}, got {out.shape}'
+        raise ValueError(msg)
+    with bz2.BZ2File(io.BytesIO(raw_data)) as stream:
+        num_bytes = stream.readinto(out.data.cast('B'))
+    if num_bytes != out.nbytes:
+        msg = f'Camera frame has {num_bytes} bytes, expected {out.nbytes}'
+        raise ValueError(msg)
+    return out
+
+
+def decode_camera2_data(
+    raw_data: BytesLike, out: NDArray[np.uint8] | None = None
+) -> NDArray[np.uint8]:
     """Decode raw bytes into a numpy array for camera2."""
-    decompressed_data = bz2.decompress(raw_data)
-    return np.frombuffer(decompressed_data, dtype=np.uint8).reshape(CAMERA2_SHAPE)
+    return decode_camera_data(raw_data, CAMERA2_SHAPE, out)
 
 
-def decode_camera3_data(raw_data: bytes) -> NDArray[np.uint8]:
+def decode_camera3_data(
+    raw_data: BytesLike, out: NDArray[np.uint8] | None = None
+) -> NDArray[np.uint8]:
     """Decode raw bytes into a numpy array for camera3."""
-    decompressed_data = bz2.decompress(raw_data)
-    return np.frombuffer(decompressed_data, dtype=np.uint8).reshape(CAMERA3_SHAPE)
+    return decode_camera_data(raw_data, CAMERA3_SHAPE, out)
 
 
-def decode_lidar_data(raw_data: bytes) -> tuple[NDArray[np.float32], NDArray[np.float32]]:
-    """Decode raw bytes into point cloud and labels."""
-    decompressed_data = gzip.decompress(raw_data)
-    print(f'Raw lidar data length: {len(raw_data)}')
-    print(f"Occurrences of b'__SPLIT__': {raw_data.count(b'__SPLIT__')}")
-    split_data = decompressed_data.split(b'__SPLIT__')
-    print(f'Split data length: {len(split_data)}')
-    if len(split_data) != 2:
-        msg = f'Unexpected data format. Expected 2 parts, got {len(split_data)}.'
-        raise ValueError(msg)
-    lidar_pc_bytes, label_bytes = split_data
-    lidar_pc = np.frombuffer(lidar_pc_bytes, dtype=np.float32).reshape(-1, LIDAR_POINT_DIM)
-    labels = np.frombuffer(label_bytes, dtype=np.float32).reshape(-1, LIDAR_LABEL_DIM)
+def decode_lidar_data(raw_data: BytesLike) -> tuple[NDArray[np.float32], NDArray[np.uint16]]:
+    """Decode raw bytes into point cloud (N, 3) and uint16 semantic labels (N,)."""
+    lidar_pc, labels, _ = decode_lidar(raw_data)
     return lidar_pc, labels
 
 
 def decode_voxel_message(
-    raw_data: bytes,
+    raw_data: BytesLike,
 ) -> tuple[NDArray[np.uint8], NDArray[np.bool_], NDArray[np.float64]]:
     """Decode raw bytes into voxel data, fov_mask, and cam_pose."""
     decompressed_data = gzip.decompress(raw_data)
@@ -149,45 +620,261 @@ def decode_voxel_message(
     return voxel, fov_mask, t_velo_2_cam
 
 
-def decode_trajectory_data(raw_data: bytes) -> NDArray[np.float64]:
+def decode_trajectory_data(raw_data: BytesLike) -> NDArray[np.float64]:
     """Decode raw bytes into a numpy array for trajectory."""
     return np.frombuffer(raw_data, dtype=np.float64).reshape(TRAJECTORY_DIM)
 
 
-async def get_camera2_data(sequence_id: int, frame_id: int) -> NDArray[np.uint8]:
-    """Fetch and decode camera2 data."""
-    result: dict[str, bytes] = {}
-    await _client_manager.get_data('camera2', sequence_id, frame_id, result)
-    return decode_camera2_data(result['data'])
-
-
-async def get_camera3_data(sequence_id: int, frame_id: int) -> NDArray[np.uint8]:
-    """Fetch and decode camera3 data."""
-    result: dict[str, bytes] = {}
-    await _client_manager.get_data('camera3', sequence_id, frame_id, result)
-    return decode_camera3_data(result['data'])
+async def get_camera_data(
+    sensor_type: str,
+    sequence_id: int,
+    frame_id: int,
+    out: NDArray[np.uint8] | None = None,
+    size: tuple[int, int] | None = None,
+) -> NDArray[np.uint8]:
+    """Fetch and decode a camera image, resized on the server to fit the display size.
+
+    Args:
+        sensor_type: 'camera2' or 'camera3'.
+        sequence_id: the sequence id.
+        frame_id: the frame id.
+        out: buffer to decode into, its shape must match get_camera_shape(*size).
+        size: the (width, height) of the display in pixel, the full image size if None.
+    """
+    shape = get_camera_shape(*size) if size else CAMERA_SHAPE
+    options: RequestOptions | None = None
+    if shape != CAMERA_SHAPE:
+        options = {'width': shape[1], 'height': shape[0]}
+    result: dict[str, BytesLike] = {}
+    await _client_manager.get_data(sensor_type, sequence_id, frame_id, result, options)
+    return decode_camera_data(result['data'], shape, out)
+
+
+async def get_camera2_data(
+    sequence_id: int,
+    frame_id: int,
+    out: NDArray[np.uint8] | None = None,
+    size: tuple[int, int] | None = None,
+) -> NDArray[np.uint8]:
+    """Fetch and decode camera2 data, into ``out`` if given, see get_camera_data."""
+    return await get_camera_data('camera2', sequence_id, frame_id, out, size)
+
+
+async def get_camera3_data(
+    sequence_id: int,
+    frame_id: int,
+    out: NDArray[np.uint8] | None = None,
+    size: tuple[int, int] | None = None,
+) -> NDArray[np.uint8]:
+    """Fetch and decode camera3 data, into ``out`` if given, see get_camera_data."""
+    return await get_camera_data('camera3', sequence_id, frame_id, out, size)
+
+
+async def decode_stereo_data(
+    raw_data: BytesLike, out: tuple[NDArray[np.uint8], NDArray[np.uint8]] | None = None
+) -> tuple[NDArray[np.uint8], NDArray[np.uint8]]:
+    """Decode a message created by ``encode_stereo``, decompressing in worker threads.
+
+    The separately compressed images are decompressed in parallel, bz2 releases the GIL.
+
+    Args:
+        raw_data: the stereo message.
+        out: buffers of the left and right image to decode into.
+
+    Returns:
+        image_2: the left BGR image.
+        image_3: the right BGR image.
+    """
+    header, parts = decode_message(raw_data)
+    shape_values = header.get('shape')
+    if not isinstance(shape_values, list) or len(shape_values) != 3:
+        msg = f'Unexpected stereo message format: {header}'
+        raise ValueError(msg)
+    shape = (int(shape_values[0]), int(shape_values[1]), int(shape_values[2]))
+    if header.get('layout') == 'side_by_side' and len(parts) == 1:
+        both = await asyncio.to_thread(
+            decode_camera_data, parts[0], (shape[0], 2 * shape[1], shape[2])
+        )
+        image_2, image_3 = both[:, : shape[1]], both[:, shape[1] :]
+        if out is None:
+            return image_2, image_3
+        for image, buffer in zip((image_2, image_3), out, strict=True):
+            if buffer.shape != shape:
+                msg = f'Camera buffer must have shape {shape}, got {buffer.shape}'
+                raise ValueError(msg)
+            buffer[:] = image
+        return out
+    if header.get('layout') != 'pair' or len(parts) != 2:
+        msg = f'Unexpected stereo message format: {header}'
+        raise ValueError(msg)
+    buffers = out or (None, None)
+    image_2, image_3 = await asyncio.gather(
+        *(
+            asyncio.to_thread(decode_camera_data, part, shape, buffer)
+            for part, buffer in zip(parts, buffers, strict=True)
+        )
+    )
+    return image_2, image_3
+
+
+async def get_stereo_data(
+    sequence_id: int,
+    frame_id: int,
+    out: tuple[NDArray[np.uint8], NDArray[np.uint8]] | None = None,
+    size: tuple[int, int] | None = None,
+    layout: str = 'pair',
+) -> tuple[NDArray[np.uint8], NDArray[np.uint8]]:
+    """Fetch the images of camera2 and camera3 with one request.
+
+    Args:
+        sequence_id: the sequence id.
+        frame_id: the frame id.
+        out: buffers of the left and right image to decode into.
+        size: the (width, height) of the display in pixel, the full image size if None.
+        layout: 'pair' for two images that are decoded in parallel, 'side_by_side' for one image
+            of twice the width.
+
+    Returns:
+        image_2: the left BGR image.
+        image_3: the right BGR image.
+    """
+    shape = get_camera_shape(*size) if size else CAMERA_SHAPE
+    options: RequestOptions = {'layout': layout}
+    if shape != CAMERA_SHAPE:
+        options.update({'width': shape[1], 'height': shape[0]})
+    result: dict[str, BytesLike] = {}
+    await _client_manager.get_data('stereo', sequence_id, frame_id, result, options)
+    return await decode_stereo_data(result['data'], out)
+
+
+async def get_thumbnail_data(
+    sequence_id: int, step: int = THUMBNAIL_STEP, width: int = THUMBNAIL_WIDTH
+) -> ThumbnailAtlas:
+    """Fetch the thumbnail atlas of a sequence, one small image per step frames of camera2.
+
+    Args:
+        sequence_id: the sequence id.
+        step: the number of frames between two thumbnails.
+        width: the width of one thumbnail in pixel.
+
+    Returns:
+        atlas: the JPEG atlas and its layout.
+    """
+    options: RequestOptions = {'step': step, 'width': width}
+    result: dict[str, BytesLike] = {}
+    await _client_manager.get_data('thumbnails', sequence_id, 0, result, options)
+    return decode_thumbnails(result['data'])
 
 
 async def get_lidar_data(
-    sequence_id: int, frame_id: int
-) -> tuple[NDArray[np.float32], NDArray[np.float32]]:
-    """Fetch and decode lidar data."""
-    result: dict[str, bytes] = {}
-    await _client_manager.get_data('lidar', sequence_id, frame_id, result)
+    sequence_id: int,
+    frame_id: int,
+    encoding: str = 'raw',
+    resolution: float = LIDAR_RESOLUTION,
+    subsample: int = 1,
+) -> tuple[NDArray[np.float32], NDArray[np.uint16]]:
+    """Fetch and decode lidar data.
+
+    Args:
+        sequence_id: the sequence id.
+        frame_id: the frame id.
+        encoding: 'raw' for float32 positions, 'quantized' for Morton sorted int16 positions,
+            which is 2-4x smaller on the wire.
+        resolution: the quantization step in meter, only used by the 'quantized' encoding.
+        subsample: only every n-th point is sent.
+
+    Returns:
+        lidar_pc: (N, 3) point positions.
+        labels: (N,) uint16 semantic labels.
+    """
+    result: dict[str, BytesLike] = {}
+    options: RequestOptions = {'encoding': encoding}
+    if encoding == 'quantized':
+        options['resolution'] = resolution
+    if subsample > 1:
+        options['subsample'] = subsample
+    await _client_manager.get_data('lidar', sequence_id, frame_id, result, options)
     return decode_lidar_data(result['data'])
 
 
+async def get_lidar_instance_data(
+    sequence_id: int, frame_id: int, encoding: str = 'raw'
+) -> tuple[NDArray[np.float32], NDArray[np.uint16], NDArray[np.uint16]]:
+    """Fetch and decode lidar data together with the uint16 instance ids of the points."""
+    result: dict[str, BytesLike] = {}
+    options: RequestOptions = {'encoding': encoding, 'instances': 1}
+    await _client_manager.get_data('lidar', sequence_id, frame_id, result, options)
+    lidar_pc, labels, instances = decode_lidar(result['data'])
+    if instances is None:
+        msg = 'Server did not send instance ids.'
+        raise ValueError(msg)
+    return lidar_pc, labels, instances
+
+
 async def get_voxel_data(
-    sequence_id: int, frame_id: int
+    sequence_id: int, frame_id: int, encoding: str = 'dense'
 ) -> tuple[NDArray[np.uint8], NDArray[np.bool_], NDArray[np.float64]]:
-    """Fetch and decode voxel data (including fov_mask and cam_pose)."""
-    result: dict[str, bytes] = {}
+    """Fetch and decode voxel data (including fov_mask and cam_pose).
+
+    Args:
+        sequence_id: the sequence id.
+        frame_id: the frame id.
+        encoding: 'dense' for the full grid, 'rle' for the run-length encoded grid, which is
+            much cheaper to compress on the server and expands with numpy on the client.
+    """
+    result: dict[str, BytesLike] = {}
+    if encoding == 'rle':
+        await _client_manager.get_data('voxel', sequence_id, frame_id, result, {'encoding': 'rle'})
+        return decode_voxel_rle(result['data'])
     await _client_manager.get_data('voxel', sequence_id, frame_id, result)
     return decode_voxel_message(result['data'])
 
 
+async def get_voxel_geometry(
+    sequence_id: int, frame_id: int
+) -> tuple[VoxelGeometry, NDArray[np.float64]]:
+    """Fetch the render geometry of the occupied voxels, extracted on the server.
+
+    Returns:
+        geometry: the occupied voxel centres and class ids, split by the camera FOV.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+    """
+    result: dict[str, BytesLike] = {}
+    await _client_manager.get_data('voxel', sequence_id, frame_id, result, {'encoding': 'geometry'})
+    return decode_voxel_geometry(result['data'])
+
+
+async def get_voxel_mesh(sequence_id: int, frame_id: int) -> tuple[VoxelMesh, NDArray[np.float64]]:
+    """Fetch the greedy meshed surface of the voxel grid, extracted and cached on the server.
+
+    Returns:
+        mesh: the quad mesh of the visible voxel faces, relative to the grid origin.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+    """
+    result: dict[str, BytesLike] = {}
+    await _client_manager.get_data('voxel', sequence_id, frame_id, result, {'encoding': 'mesh'})
+    return decode_voxel_mesh(result['data'])
+
+
+async def get_scene_map(
+    sequence_id: int, frame_id: int
+) -> tuple[VoxelGeometry, NDArray[np.float64]]:
+    """Fetch the surface of the lidar scans fused up to a frame, encoded like a voxel grid.
+
+    The server keeps the map of every client, so only the scans since the last request of this
+    client are fused. A request before the last fused frame rebuilds the map.
+
+    Returns:
+        geometry: the occupied voxel centres and class ids of the map, split by the camera FOV.
+        t_map_2_cam: (4, 4) transformation from the map to the camera of the frame.
+    """
+    result: dict[str, BytesLike] = {}
+    await _client_manager.get_data('map', sequence_id, frame_id, result, {'encoding': 'geometry'})
+    return decode_voxel_geometry(result['data'])
+
+
 async def get_trajectory_data(sequence_id: int, frame_id: int) -> NDArray[np.float64]:
     """Fetch and decode trajectory data."""
-    result: dict[str, bytes] = {}
+    result: dict[str, BytesLike] = {}
     await _client_manager.get_data('trajectory', sequence_id, frame_id, result)
     return decode_trajectory_data(result['data'])
@@ -0,0 +1,665 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Compact wire encodings shared by the server and the client.
+
+Messages built here carry a small JSON header in front of the binary parts, so that the
+receiver knows the layout and dtypes of the payload without relying on hard-coded shapes.
+"""
+
+import bz2
+import gzip
+import json
+from collections.abc import Iterator
+from concurrent.futures import Executor
+from functools import partial
+from math import ceil
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from sensorium.data_processing.camera.thumbnails import ThumbnailAtlas
+from sensorium.data_processing.voxel_process.voxel_geometry import (
+    VOXEL_SIZE,
+    VoxelGeometry,
+    get_occupied_indices,
+    grid_indices_to_centres,
+)
+from sensorium.data_processing.voxel_process.voxel_mesh import (
+    VoxelMesh,
+    VoxelSurface,
+    extract_voxel_surface,
+    surface_to_mesh,
+)
+
+Header = dict[str, str | int | float | list[int] | list[float] | list[str]]
+# Received messages, a response that is streamed in chunks is reassembled in a bytearray
+BytesLike = bytes | bytearray | memoryview
+
+HEADER_LENGTH_BYTES = 4
+LIDAR_RESOLUTION = 0.01  # 1 cm quantization step, covers +-327 m with int16
+_INT16_LIMIT = np.iinfo(np.int16).max
+MAX_MESSAGE_SIZE = 8_388_608  # websocket message limit of both sides, in bytes
+CHUNK_SIZE = 1_048_576  # larger responses are streamed in chunks of this size, in bytes
+CHUNK_OFFSET_BYTES = 8  # every chunk starts with the offset of its data in the response
+CAMERA_SHAPE = (370, 1226, 3)  # KITTI images are cropped to the smallest image size
+
+
+class StreamFrame(NamedTuple):
+    """The responses of the subscribed sensors of a frame, pushed by the server.
+
+    A frame that could not be created carries the error instead of the responses.
+    """
+
+    seq_id: int
+    frame_id: int
+    data: dict[str, memoryview]
+    error: str = ''
+
+
+def get_camera_shape(width: int | None = None, height: int | None = None) -> tuple[int, int, int]:
+    """Get the shape of a camera image fitted into a display size.
+
+    The image keeps its aspect ratio and is never scaled up, so the server and the client agree
+    on the shape of a resized image without sending it. The shape is the largest whose width is
+    derived from its height, so a shape fitted into its own size stays the same, e.g. when the
+    client requests the size of its frame buffer and the server fits it again.
+
+    Args:
+        width: the display width in pixel, the full image width if None or 0.
+        height: the display height in pixel, the full image height if None or 0.
+
+    Returns:
+        shape: the (height, width, channels) of the resized image.
+    """
+    full_height, full_width, channels = CAMERA_SHAPE
+    width = min(width or full_width, full_width)
+    fitted_height = min(height or full_height, full_height, ceil(width * full_height / full_width))
+    # The width of a height is rounded, so the estimate can be one pixel too high
+    while fitted_height > 1 and round(fitted_height * full_width / full_height) > width:
+        fitted_height -= 1
+    fitted_height = max(1, fitted_height)
+    fitted_width = min(width, round(fitted_height * full_width / full_height))
+    return fitted_height, max(1, fitted_width), channels
+
+
+def encode_message(header: Header, parts: list[bytes]) -> bytes:
+    """Pack a JSON header and binary parts into a single message.
+
+    Layout: ``<header length (uint32, little endian)><json header><part 0><part 1>...``.
+    The byte size of every part is stored in the header under ``sizes``.
+
+    Args:
+        header: meta data describing the parts.
+        parts: the binary payloads.
+
+    Returns:
+        message: the packed message.
+    """
+    header = {**header, 'sizes': [len(part) for part in parts]}
+    header_bytes = json.dumps(header).encode()
+    return b''.join(
+        [len(header_bytes).to_bytes(HEADER_LENGTH_BYTES, 'little'), header_bytes, *parts]
+    )
+
+
+def announce_chunks(size: int, chunk_size: int = CHUNK_SIZE) -> str:
+    """Create the text message that is sent before the chunks of a streamed message.
+
+    The receiver preallocates the message from the announced size.
+
+    Args:
+        size: the size of the streamed message.
+        chunk_size: the maximum data size of one chunk.
+
+    Returns:
+        announcement: JSON text {'chunked': <size>, 'chunks': <number of chunks>}.
+    """
+    if chunk_size < 1:
+        msg = f'Chunk size must be positive, got {chunk_size}'
+        raise ValueError(msg)
+    return json.dumps({'chunked': size, 'chunks': -(-size // chunk_size)})
+
+
+def iter_chunks(message: bytes, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Split a message into chunks ``<offset (uint64, little endian)><data>``, one at a time.
+
+    Only one chunk is copied at a time, so streaming does not duplicate the message.
+    """
+    view = memoryview(message)
+    for offset in range(0, len(view), chunk_size):
+        yield b''.join(
+            [offset.to_bytes(CHUNK_OFFSET_BYTES, 'little'), view[offset : offset + chunk_size]]
+        )
+
+
+def get_chunked_size(announcement: str) -> int | None:
+    """Get the message size of a chunk announcement, None for any other text message."""
+    try:
+        return int(json.loads(announcement)['chunked'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def encode_error(error: str) -> str:
+    """Encode the error of a failed request as the JSON text {'error': <error>}."""
+    return json.dumps({'error': error})
+
+
+def get_response_error(message: str) -> str | None:
+    """Get the error of an error response, None for any other text message."""
+    try:
+        return str(json.loads(message)['error'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def write_chunk(buffer: bytearray, chunk: bytes) -> int:
+    """Copy the data of a chunk to its offset in the preallocated message.
+
+    Returns:
+        size: the number of bytes written.
+    """
+    view = memoryview(chunk)
+    offset = int.from_bytes(view[:CHUNK_OFFSET_BYTES], 'little')
+    data = view[CHUNK_OFFSET_BYTES:]
+    if offset + len(data) > len(buffer):
+        msg = f'Chunk at offset {offset} of {len(data)} bytes exceeds the message size'
+        raise ValueError(msg)
+    buffer[offset : offset + len(data)] = data
+    return len(data)
+
+
+def decode_message(message: BytesLike) -> tuple[Header, list[memoryview]]:
+    """Unpack a message created by ``encode_message`` without copying the parts.
+
+    Args:
+        message: the packed message.
+
+    Returns:
+        header: the JSON header.
+        parts: zero-copy views on the binary payloads.
+    """
+    view = memoryview(message)
+    header_length = int.from_bytes(view[:HEADER_LENGTH_BYTES], 'little')
+    header_end = HEADER_LENGTH_BYTES + header_length
+    header: Header = json.loads(bytes(view[HEADER_LENGTH_BYTES:header_end]))
+    sizes = header['sizes']
+    if not isinstance(sizes, list) or sum(int(size) for size in sizes) != len(view) - header_end:
+        msg = 'Unexpected message format. Part sizes do not match the message length.'
+        raise ValueError(msg)
+
+    parts = []
+    offset = header_end
+    for size in sizes:
+        parts.append(view[offset : offset + int(size)])
+        offset += int(size)
+    return header, parts
+
+
+def _spread_bits(values: NDArray[np.uint64]) -> NDArray[np.uint64]:
+    """Insert two zero bits between each of the lower 21 bits of the values."""
+    values = values & np.uint64(0x1FFFFF)
+    values = (values | values << np.uint64(32)) & np.uint64(0x1F00000000FFFF)
+    values = (values | values << np.uint64(16)) & np.uint64(0x1F0000FF0000FF)
+    values = (values | values << np.uint64(8)) & np.uint64(0x100F00F00F00F00F)
+    values = (values | values << np.uint64(4)) & np.uint64(0x10C30C30C30C30C3)
+    return (values | values << np.uint64(2)) & np.uint64(0x1249249249249249)
+
+
+def morton_order(quantized: NDArray[np.int16]) -> NDArray[np.intp]:
+    """Return the permutation that sorts quantized points along a Morton (Z-order) curve.
+
+    Neighbouring points in space end up close to each other in memory, which keeps the
+    deltas between consecutive points small and makes them compress well.
+
+    Args:
+        quantized: (N, 3) quantized point coordinates.
+
+    Returns:
+        order: (N,) indices sorting the points by their Morton code.
+    """
+    unsigned = (quantized.astype(np.int32) - np.iinfo(np.int16).min).astype(np.uint64)
+    codes = (
+        _spread_bits(unsigned[:, 0])
+        | _spread_bits(unsigned[:, 1]) << np.uint64(1)
+        | _spread_bits(unsigned[:, 2]) << np.uint64(2)
+    )
+    return np.argsort(codes, kind='stable')
+
+
+def split_lidar_labels(
+    labels: NDArray[np.uint32] | NDArray[np.uint16], num_points: int
+) -> tuple[NDArray[np.uint16], NDArray[np.uint16]]:
+    """Split SemanticKITTI labels into uint16 semantic and instance ids.
+
+    The lower 16 bits of a SemanticKITTI label hold the semantic class, the upper 16 bits the
+    instance id. If the number of labels does not match the number of points (e.g. the server
+    fell back to its buffer memory), all points are returned as unlabeled.
+
+    Args:
+        labels: (N,) SemanticKITTI labels.
+        num_points: the number of points the labels belong to.
+
+    Returns:
+        semantic: (N,) uint16 semantic class ids.
+        instance: (N,) uint16 instance ids.
+    """
+    labels = np.asarray(labels).reshape(-1).astype(np.uint32)
+    if labels.shape[0] != num_points:
+        labels = np.zeros(num_points, dtype=np.uint32)
+    return (labels & 0xFFFF).astype(np.uint16), (labels >> 16).astype(np.uint16)
+
+
+def encode_lidar(
+    points: NDArray[np.float32],
+    labels: NDArray[np.uint32] | NDArray[np.uint16],
+    encoding: str = 'raw',
+    resolution: float = LIDAR_RESOLUTION,
+    *,
+    instances: bool = False,
+) -> bytes:
+    """Encode a point cloud and its labels into a gzip compressed lidar message.
+
+    With the 'raw' encoding the positions are sent as float32. With the 'quantized' encoding
+    coordinates are quantized to ``resolution`` meters, clipped to the int16 range, sorted
+    along a Morton curve and delta coded with wrap-around int16 arithmetic, so decoding is
+    lossless up to the quantization step. Labels are always sent as uint16 semantic ids, and
+    optionally as uint16 instance ids. The dtypes are stored in the header.
+
+    Args:
+        points: (N, 3) point coordinates in meter.
+        labels: (N,) SemanticKITTI labels.
+        encoding: 'raw' or 'quantized'.
+        resolution: the quantization step in meter.
+        instances: whether to send the instance ids as well.
+
+    Returns:
+        message: the gzip compressed message.
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    semantic, instance = split_lidar_labels(labels, points.shape[0])
+    header: Header = {
+        'encoding': encoding,
+        'num_points': int(points.shape[0]),
+        'label_dtype': 'uint16',
+    }
+
+    if encoding == 'raw':
+        position_bytes = points.tobytes()
+        header['point_dtype'] = 'float32'
+    elif encoding == 'quantized':
+        quantized = np.clip(np.rint(points / resolution), -_INT16_LIMIT, _INT16_LIMIT).astype(
+            np.int16
+        )
+        order = morton_order(quantized)
+        # Planar layout (x..., y..., z...) keeps similar bytes together for gzip.
+        planar = np.ascontiguousarray(quantized[order].T)
+        position_bytes = np.diff(planar, axis=1, prepend=np.zeros((3, 1), dtype=np.int16)).tobytes()
+        semantic, instance = semantic[order], instance[order]
+        header['point_dtype'] = 'int16'
+        header['resolution'] = resolution
+    else:
+        msg = f'Unknown lidar encoding: {encoding}'
+        raise ValueError(msg)
+
+    parts = [position_bytes, semantic.tobytes()]
+    if instances:
+        parts.append(instance.tobytes())
+        header['instance_dtype'] = 'uint16'
+    return gzip.compress(encode_message(header, parts), compresslevel=6)
+
+
+def decode_lidar(
+    raw_data: BytesLike,
+) -> tuple[NDArray[np.float32], NDArray[np.uint16], NDArray[np.uint16] | None]:
+    """Decode a message created by ``encode_lidar``.
+
+    Args:
+        raw_data: the gzip compressed message.
+
+    Returns:
+        points: (N, 3) point coordinates in meter.
+        labels: (N,) semantic labels.
+        instances: (N,) instance ids, or None if they were not requested.
+    """
+    header, parts = decode_message(gzip.decompress(raw_data))
+    num_points = int(header['num_points'])  # type: ignore[arg-type]
+    if len(parts) not in (2, 3):
+        msg = f'Unexpected lidar message format. Expected 2 or 3 parts, got {len(parts)}.'
+        raise ValueError(msg)
+
+    if header['encoding'] == 'raw':
+        points = np.frombuffer(parts[0], dtype=np.dtype(str(header['point_dtype'])))
+        points = points.reshape(num_points, 3).astype(np.float32, copy=False)
+    elif header['encoding'] == 'quantized':
+        deltas = np.frombuffer(parts[0], dtype=np.int16).reshape(3, num_points)
+        planar = np.cumsum(deltas, axis=1, dtype=np.int16)
+        resolution = float(header['resolution'])  # type: ignore[arg-type]
+        points = planar.T.astype(np.float32) * np.float32(resolution)
+    else:
+        msg = f'Unknown lidar encoding: {header["encoding"]}'
+        raise ValueError(msg)
+
+    labels = np.frombuffer(parts[1], dtype=np.dtype(str(header['label_dtype'])))
+    instances = None
+    if len(parts) == 3:
+        instances = np.frombuffer(parts[2], dtype=np.dtype(str(header['instance_dtype'])))
+    return points, labels, instances
+
+
+def run_length_encode(
+    values: NDArray[np.uint8] | NDArray[np.bool_],
+) -> tuple[NDArray[np.uint8], NDArray[np.uint32]]:
+    """Run-length encode a flattened array with vectorized numpy.
+
+    Args:
+        values: the array to encode, flattened in C order.
+
+    Returns:
+        run_values: (R,) the value of each run.
+        run_lengths: (R,) the number of elements in each run.
+    """
+    flat = np.asarray(values).reshape(-1).view(np.uint8)
+    if flat.size == 0:
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint32)
+    starts = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    run_lengths = np.diff(np.append(starts, flat.size)).astype(np.uint32)
+    return flat[starts], run_lengths
+
+
+def run_length_decode(
+    run_values: NDArray[np.uint8], run_lengths: NDArray[np.uint32]
+) -> NDArray[np.uint8]:
+    """Expand runs created by ``run_length_encode`` back into a flat array."""
+    return np.repeat(run_values, run_lengths)
+
+
+def encode_voxel_rle(
+    voxel: NDArray[np.uint8],
+    fov_mask: NDArray[np.bool_],
+    t_velo_2_cam: NDArray[np.float64],
+) -> bytes:
+    """Encode a voxel message with the voxel grid and FOV mask run-length encoded.
+
+    Most of a SemanticKITTI grid is empty or unknown, so the runs are a fraction of the dense
+    grid and gzip has far less data to work on.
+
+    Args:
+        voxel: (256, 256, 32) uint8 semantic voxel grid.
+        fov_mask: (N,) bool mask of the voxels inside the camera FOV.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+
+    Returns:
+        message: the gzip compressed message.
+    """
+    voxel_values, voxel_lengths = run_length_encode(voxel)
+    fov_values, fov_lengths = run_length_encode(fov_mask)
+    header: Header = {
+        'encoding': 'rle',
+        'voxel_shape': list(voxel.shape),
+        'fov_mask_shape': list(fov_mask.shape),
+    }
+    parts = [
+        voxel_values.tobytes(),
+        voxel_lengths.tobytes(),
+        fov_values.tobytes(),
+        fov_lengths.tobytes(),
+        np.asarray(t_velo_2_cam, dtype=np.float64).tobytes(),
+    ]
+    return gzip.compress(encode_message(header, parts), compresslevel=6)
+
+
+def decode_voxel_rle(
+    raw_data: BytesLike,
+) -> tuple[NDArray[np.uint8], NDArray[np.bool_], NDArray[np.float64]]:
+    """Decode a message created by ``encode_voxel_rle``.
+
+    Args:
+        raw_data: the gzip compressed message.
+
+    Returns:
+        voxel: the uint8 semantic voxel grid.
+        fov_mask: the bool FOV mask.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+    """
+    header, parts = decode_message(gzip.decompress(raw_data))
+    if header.get('encoding') != 'rle' or len(parts) != 5:
+        msg = f'Unexpected voxel message format: {header}'
+        raise ValueError(msg)
+    voxel_shape = tuple(int(dim) for dim in header['voxel_shape'])  # type: ignore[union-attr]
+    fov_mask_shape = tuple(int(dim) for dim in header['fov_mask_shape'])  # type: ignore[union-attr]
+
+    voxel = run_length_decode(
+        np.frombuffer(parts[0], dtype=np.uint8), np.frombuffer(parts[1], dtype=np.uint32)
+    ).reshape(voxel_shape)
+    fov_mask = (
+        run_length_decode(
+            np.frombuffer(parts[2], dtype=np.uint8), np.frombuffer(parts[3], dtype=np.uint32)
+        )
+        .view(np.bool_)
+        .reshape(fov_mask_shape)
+    )
+    t_velo_2_cam = np.frombuffer(parts[4], dtype=np.float64).reshape(4, 4)
+    return voxel, fov_mask, t_velo_2_cam
+
+
+def encode_voxel_geometry(
+    voxel: NDArray[np.uint8],
+    fov_mask: NDArray[np.bool_],
+    t_velo_2_cam: NDArray[np.float64],
+    voxel_size: float = VOXEL_SIZE,
+) -> bytes:
+    """Encode only the occupied voxels of a grid, split by the camera FOV.
+
+    Every occupied voxel is sent as its integer grid index and class id, which the client
+    turns into render-ready centre coordinates with a single vectorized multiply-add.
+
+    Args:
+        voxel: (X, Y, Z) uint8 semantic voxel grid.
+        fov_mask: (X * Y * Z,) bool mask of the voxels inside the camera FOV.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+        voxel_size: the size of the voxel in meter.
+
+    Returns:
+        message: the gzip compressed message.
+    """
+    index_dtype = np.uint8 if max(voxel.shape) <= 256 else np.uint16
+    flat = voxel.reshape(-1)
+    parts = []
+    for indices in get_occupied_indices(voxel, fov_mask):
+        grid_indices = np.stack(np.unravel_index(indices, voxel.shape), axis=1)
+        parts += [grid_indices.astype(index_dtype).tobytes(), flat[indices].tobytes()]
+    parts.append(np.asarray(t_velo_2_cam, dtype=np.float64).tobytes())
+    header: Header = {
+        'encoding': 'geometry',
+        'voxel_size': voxel_size,
+        'index_dtype': np.dtype(index_dtype).name,
+    }
+    return gzip.compress(encode_message(header, parts), compresslevel=6)
+
+
+def decode_voxel_geometry(raw_data: BytesLike) -> tuple[VoxelGeometry, NDArray[np.float64]]:
+    """Decode a message created by ``encode_voxel_geometry``.
+
+    Args:
+        raw_data: the gzip compressed message.
+
+    Returns:
+        geometry: the occupied voxel centres and class ids, split by the camera FOV.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+    """
+    header, parts = decode_message(gzip.decompress(raw_data))
+    if header.get('encoding') != 'geometry' or len(parts) != 5:
+        msg = f'Unexpected voxel message format: {header}'
+        raise ValueError(msg)
+    index_dtype = np.dtype(str(header['index_dtype']))
+    voxel_size = float(header['voxel_size'])  # type: ignore[arg-type]
+
+    fov_indices = np.frombuffer(parts[0], dtype=index_dtype).reshape(-1, 3)
+    outfov_indices = np.frombuffer(parts[2], dtype=index_dtype).reshape(-1, 3)
+    geometry = VoxelGeometry(
+        fov_centres=grid_indices_to_centres(fov_indices, voxel_size),
+        fov_labels=np.frombuffer(parts[1], dtype=np.uint8),
+        outfov_centres=grid_indices_to_centres(outfov_indices, voxel_size),
+        outfov_labels=np.frombuffer(parts[3], dtype=np.uint8),
+    )
+    t_velo_2_cam = np.frombuffer(parts[4], dtype=np.float64).reshape(4, 4)
+    return geometry, t_velo_2_cam
+
+
+def encode_voxel_mesh(
+    voxel: NDArray[np.uint8],
+    fov_mask: NDArray[np.bool_],
+    t_velo_2_cam: NDArray[np.float64],
+    voxel_size: float = VOXEL_SIZE,
+) -> bytes:
+    """Encode the visible surface of a voxel grid as greedy merged rectangles.
+
+    Args:
+        voxel: (X, Y, Z) uint8 semantic voxel grid.
+        fov_mask: (X * Y * Z,) bool mask of the voxels inside the camera FOV.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+        voxel_size: the size of the voxel in meter.
+
+    Returns:
+        message: the gzip compressed message.
+    """
+    surface = extract_voxel_surface(voxel, fov_mask)
+    parts = [
+        surface.directions.tobytes(),
+        surface.cells.tobytes(),
+        surface.extents.tobytes(),
+        surface.labels.tobytes(),
+        surface.in_fov.tobytes(),
+        np.asarray(t_velo_2_cam, dtype=np.float64).tobytes(),
+    ]
+    header: Header = {'encoding': 'mesh', 'voxel_size': voxel_size}
+    return gzip.compress(encode_message(header, parts), compresslevel=6)
+
+
+def decode_voxel_mesh(raw_data: BytesLike) -> tuple[VoxelMesh, NDArray[np.float64]]:
+    """Decode a message created by ``encode_voxel_mesh`` into a render-ready quad mesh.
+
+    Args:
+        raw_data: the gzip compressed message.
+
+    Returns:
+        mesh: the quad mesh of the visible voxel faces, relative to the grid origin.
+        t_velo_2_cam: (4, 4) transformation from lidar to camera.
+    """
+    header, parts = decode_message(gzip.decompress(raw_data))
+    if header.get('encoding') != 'mesh' or len(parts) != 6:
+        msg = f'Unexpected voxel message format: {header}'
+        raise ValueError(msg)
+    surface = VoxelSurface(
+        directions=np.frombuffer(parts[0], dtype=np.uint8),
+        cells=np.frombuffer(parts[1], dtype=np.uint16).reshape(-1, 3),
+        extents=np.frombuffer(parts[2], dtype=np.uint16).reshape(-1, 2),
+        labels=np.frombuffer(parts[3], dtype=np.uint8),
+        in_fov=np.frombuffer(parts[4], dtype=np.bool_),
+    )
+    mesh = surface_to_mesh(surface, float(header['voxel_size']))  # type: ignore[arg-type]
+    t_velo_2_cam = np.frombuffer(parts[5], dtype=np.float64).reshape(4, 4)
+    return mesh, t_velo_2_cam
+
+
+def encode_stereo(
+    image_2: NDArray[np.uint8],
+    image_3: NDArray[np.uint8],
+    *,
+    side_by_side: bool = False,
+    executor: Executor | None = None,
+    compresslevel: int = 9,
+) -> bytes:
+    """Pack the images of both cameras into one message.
+
+    The images are bz2 compressed separately, so both can be (de)compressed in parallel, or as
+    one side-by-side image with the left camera in the left half.
+
+    Args:
+        image_2: (H, W, 3) left BGR image.
+        image_3: (H, W, 3) right BGR image of the same shape.
+        side_by_side: whether to send one image of twice the width.
+        executor: thread pool to compress the separate images concurrently.
+        compresslevel: the bz2 level from 1 (fastest) to 9 (smallest).
+
+    Returns:
+        message: the packed message.
+    """
+    if image_2.shape != image_3.shape:
+        msg = f'Stereo images must have the same shape, got {image_2.shape} and {image_3.shape}'
+        raise ValueError(msg)
+    if side_by_side:
+        parts = [bz2.compress(np.hstack([image_2, image_3]).tobytes(), compresslevel)]
+    else:
+        images = [np.ascontiguousarray(image).tobytes() for image in (image_2, image_3)]
+        compress = partial(bz2.compress, compresslevel=compresslevel)
+        parts = list((executor.map if executor else map)(compress, images))
+    header: Header = {
+        'encoding': 'stereo',
+        'layout': 'side_by_side' if side_by_side else 'pair',
+        'shape': list(image_2.shape),
+    }
+    return encode_message(header, parts)
+
+
+def encode_thumbnails(atlas: ThumbnailAtlas) -> bytes:
+    """Pack a JPEG thumbnail atlas and its layout into one message."""
+    header: Header = {
+        'encoding': 'thumbnails',
+        'step': atlas.step,
+        'num_thumbnails': atlas.num_thumbnails,
+        'columns': atlas.columns,
+    }
+    return encode_message(header, [atlas.image])
+
+
+def decode_thumbnails(raw_data: BytesLike) -> ThumbnailAtlas:
+    """Decode a message created by ``encode_thumbnails``, the atlas stays JPEG encoded."""
+    header, parts = decode_message(raw_data)
+    if header.get('encoding') != 'thumbnails' or len(parts) != 1:
+        msg = f'Unexpected thumbnail message format: {header}'
+        raise ValueError(msg)
+    return ThumbnailAtlas(
+        image=bytes(parts[0]),
+        step=int(header['step']),  # type: ignore[arg-type]
+        num_thumbnails=int(header['num_thumbnails']),  # type: ignore[arg-type]
+        columns=int(header['columns']),  # type: ignore[arg-type]
+    )
+
+
+def encode_stream_frame(
+    seq_id: int, frame_id: int, responses: dict[str, bytes], error: str = ''
+) -> bytes:
+    """Pack the responses of the subscribed sensors of a frame into one pushed message."""
+    header: Header = {
+        'encoding': 'stream_frame',
+        'seq_id': seq_id,
+        'frame_id': frame_id,
+        'sensors': list(responses),
+    }
+    if error:
+        header['error'] = error
+    return encode_message(header, list(responses.values()))
+
+
+def decode_stream_frame(raw_data: BytesLike) -> StreamFrame:
+    """Decode a message created by ``encode_stream_frame`` without copying the responses."""
+    header, parts = decode_message(raw_data)
+    sensors = header.get('sensors')
+    if (
+        header.get('encoding') != 'stream_frame'
+        or not isinstance(sensors, list)
+        or len(sensors) != len(parts)
+    ):
+        msg = f'Unexpected stream frame format: {header}'
+        raise ValueError(msg)
+    return StreamFrame(
+        seq_id=int(header['seq_id']),  # type: ignore[arg-type]
+        frame_id=int(header['frame_id']),  # type: ignore[arg-type]
+        data=dict(zip((str(sensor) for sensor in sensors), parts, strict=True)),
+        error=str(header.get('error', '')),
+    )
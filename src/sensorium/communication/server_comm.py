@@ -7,53 +7,740 @@ import asyncio
 import bz2
 import gzip
 import json
-from collections.abc import Callable
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import NamedTuple
 
+import cv2
 import numpy as np
 import websockets
 import yaml
+from cv2.typing import MatLike
+from numpy.typing import NDArray
 from websockets.legacy.server import WebSocketServerProtocol
 
-from sensorium.data_processing.engine.backend_engine import BackendEngine
+from sensorium.communication.encoding import (
+    CAMERA_SHAPE,
+    CHUNK_OFFSET_BYTES,
+    CHUNK_SIZE,
+    LIDAR_RESOLUTION,
+    MAX_MESSAGE_SIZE,
+    announce_chunks,
+    encode_error,
+    encode_lidar,
+    encode_stereo,
+    encode_stream_frame,
+    encode_thumbnails,
+    encode_voxel_geometry,
+    encode_voxel_mesh,
+    encode_voxel_rle,
+    get_camera_shape,
+    iter_chunks,
+)
+from sensorium.data_processing.camera.thumbnails import THUMBNAIL_STEP, THUMBNAIL_WIDTH
+from sensorium.data_processing.engine.backend_engine import STATIC_DATA_CACHE_SIZE, BackendEngine
+from sensorium.data_processing.voxel_process.scene_map import MAP_STRIDE
+from sensorium.engine.playback import PlaybackScheduler
 
 connected_clients: list[WebSocketServerProtocol] = []
+# Tasks that run on their own, referenced until they are done so they are not garbage collected
+background_tasks: set[asyncio.Future[None]] = set()
+
+# Compact voxel encodings, the legacy dense '__SPLIT__' message is used for any other value
+VOXEL_ENCODERS = {'rle': encode_voxel_rle, 'geometry': encode_voxel_geometry}
+VOXEL_MESH_CACHE_SIZE = 32  # meshed voxel frames kept on the server
+CAMERA_CACHE_SIZE = 64  # resized camera images kept on the server
+CAMERA_IMAGE_KEYS = {'camera2': 'image_2', 'camera3': 'image_3'}
+# Unsent bytes of a subscribed client above which the next pushed frame is dropped
+STREAM_BUFFER_SIZE = 262_144
+# Compresses the second image of a stereo response while the first is compressed
+stereo_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='stereo')
+
+DEFAULT_CONFIG_PATH = Path('configs') / 'sensorium.yaml'
+# bz2 level of the camera images, lower levels compress faster at a slightly larger size
+COMPRESSION_LEVEL = 9
+
+
+class ServerConfig(NamedTuple):
+    """The settings of the server, see backend_engine and communication in sensorium.yaml."""
+
+    data_dir: str
+    cache_dir: str | None = None
+    max_message_size: int = MAX_MESSAGE_SIZE
+    chunk_size: int = CHUNK_SIZE
+    stream_buffer_size: int = STREAM_BUFFER_SIZE
+    static_data_cache_size: int = STATIC_DATA_CACHE_SIZE
+    compression_level: int = COMPRESSION_LEVEL
+    map_stride: int = MAP_STRIDE
+
+
+def load_server_config(config_path: Path | None = None) -> ServerConfig:
+    """Read the server settings of a config file, by default configs/sensorium.yaml."""
+    with (config_path or Path.cwd() / DEFAULT_CONFIG_PATH).open() as stream:
+        config = yaml.safe_load(stream)
+    backend = config['backend_engine']
+    communication = config.get('communication', {})
+    return ServerConfig(
+        data_dir=backend['data_dir'],
+        cache_dir=backend.get('cache_dir'),
+        max_message_size=int(communication.get('max_message_size', MAX_MESSAGE_SIZE)),
+        chunk_size=int(communication.get('chunk_size', CHUNK_SIZE)),
+        stream_buffer_size=int(communication.get('stream_buffer_size', STREAM_BUFFER_SIZE)),
+        static_data_cache_size=int(backend.get('static_data_cache_size', STATIC_DATA_CACHE_SIZE)),
+        compression_level=int(communication.get('compression_level', COMPRESSION_LEVEL)),
+        map_stride=int(backend.get('map_stride', MAP_STRIDE)),
+    )
+
+
+class ServerContext:
+    """The config and the backend engine of the server, both loaded on first use.
+
+    Importing this module neither reads a config file nor touches the data, so the headless
+    server can apply its command line options first, see sensorium.server.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty context."""
+        self._config: ServerConfig | None = None
+        self._backend_engine: BackendEngine | None = None
+
+    def configure(self, config: ServerConfig) -> None:
+        """Use the settings instead of the config file, the backend engine is created anew.
+
+        The cached responses are dropped, since they were created from the previous data.
+        """
+        self._config = config
+        self._backend_engine = None
+        voxel_mesh_cache.clear()
+        camera_cache.clear()
+
+    @property
+    def config(self) -> ServerConfig:
+        """The settings, read from the config file of the working directory if not set."""
+        if self._config is None:
+            self._config = load_server_config()
+        return self._config
+
+    @property
+    def backend_engine(self) -> BackendEngine:
+        """The backend engine that loads the data of the configured data directory."""
+        if self._backend_engine is None:
+            self._backend_engine = BackendEngine(
+                data_dir=self.config.data_dir, cache_dir=self.config.cache_dir
+            )
+            self._backend_engine.static_data_cache_size = self.config.static_data_cache_size
+            self._backend_engine.map_stride = self.config.map_stride
+        return self._backend_engine
+
+
+_server_context = ServerContext()
+
+
+def configure_server(config: ServerConfig) -> None:
+    """Set the server settings, before the first client connects."""
+    _server_context.configure(config)
 
-config_path = Path.cwd() / 'configs' / 'sensorium.yaml'
-with Path(config_path).open() as stream:
-    backend_config = yaml.safe_load(stream)
-backend_engine = BackendEngine(data_dir=backend_config['backend_engine']['data_dir'])
+
+def get_server_config() -> ServerConfig:
+    """Get the server settings."""
+    return _server_context.config
+
+
+def get_backend_engine() -> BackendEngine:
+    """Get the backend engine that answers the requests of all clients."""
+    return _server_context.backend_engine
 
 
 async def handle_client(websocket: WebSocketServerProtocol) -> None:
-    """Handle client connections and data requests."""
+    """Handle client connections and data requests.
+
+    The requests are answered in order by a worker task, so this loop keeps reading while a
+    response is computed. Every connection computes its responses on its own thread, so a small
+    request on one connection does not wait for a slow one on another, e.g. a thumbnail atlas.
+    A message ``{'cancel': <request_id>}`` marks a request as superseded: unless its response
+    was already sent, an empty response is sent instead of the data. Messages
+    ``{'control': <command>, ...}`` control the frames pushed to the client, see FrameStream.
+    """
     connected_clients.append(websocket)
+    requests: asyncio.Queue[str | bytes] = asyncio.Queue()
+    cancelled: set[int] = set()
+    # Responses and pushed frames share the connection, a chunked message must not be split
+    send_lock = asyncio.Lock()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='request')
+    stream = FrameStream(websocket, send_lock, executor)
+    worker = asyncio.create_task(
+        answer_requests(websocket, requests, cancelled, send_lock, executor)
+    )
+    worker.add_done_callback(partial(close_after_failure, websocket))
     try:
         async for message in websocket:
-            try:
-                print(f'Received: {message.decode() if isinstance(message, bytes) else message}')
-                request = json.loads(message)
+            print(f'Received: {message.decode() if isinstance(message, bytes) else message}')
+            request_id = get_cancelled_request_id(message)
+            if request_id is not None:
+                cancelled.add(request_id)
+            elif not await stream.handle_message(message):
+                await requests.put(message)
+    finally:
+        worker.cancel()
+        stream.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+        get_backend_engine().release_client(id(websocket))
+        connected_clients.remove(websocket)
+        print('Client disconnected.')
+
+
+def get_cancelled_request_id(message: str | bytes) -> int | None:
+    """Get the request id of a cancel message, None for any other message."""
+    try:
+        request = json.loads(message)
+        return int(request['cancel'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+async def answer_requests(
+    websocket: WebSocketServerProtocol,
+    requests: asyncio.Queue[str | bytes],
+    cancelled: set[int],
+    send_lock: asyncio.Lock,
+    executor: Executor,
+) -> None:
+    """Answer the queued requests of a client in order, skipping the cancelled ones.
+
+    The responses are computed on the executor of the connection, off the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await requests.get()
+        try:
+            request = json.loads(message)
+            request_id = request.get('request_id')
+            if request_id in cancelled:
+                response = b''
+            else:
                 sensor_type = request.get('sensor_type')
                 seq_id = int(request.get('seq_id', -1))
                 frame_id = int(request.get('frame_id', -1))
+                options = request.get('options', {})
+                response = await loop.run_in_executor(
+                    executor,
+                    create_response,
+                    sensor_type,
+                    seq_id,
+                    frame_id,
+                    options,
+                    id(websocket),
+                )
+                if request_id in cancelled:
+                    response = b''
+            if isinstance(request_id, int):
+                # Cancel messages that arrived after their response was sent are obsolete now
+                cancelled.difference_update([i for i in cancelled if i <= request_id])
+            # The client announces its message limit, the chunks must fit with their offset
+            client_max_size = int(request.get('max_size', MAX_MESSAGE_SIZE))
+            async with send_lock:
+                await send_response(websocket, response, get_chunk_size(client_max_size))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            await send_error(websocket, send_lock, f'Invalid request: {e!s}')
+        except Exception as e:  # noqa: BLE001
+            # A failing request, e.g. of a missing sequence, must not stop answering the others
+            await send_error(websocket, send_lock, f'Request failed: {e!s}')
+
+
+async def send_error(
+    websocket: WebSocketServerProtocol, send_lock: asyncio.Lock, error: str
+) -> None:
+    """Send an error message as the response of a request."""
+    async with send_lock:
+        await websocket.send(encode_error(error))
+
+
+def close_after_failure(websocket: WebSocketServerProtocol, worker: asyncio.Task[None]) -> None:
+    """Close the connection of a client whose requests are not answered anymore.
+
+    Otherwise the client would wait forever for the responses of its queued requests.
+    """
+    if worker.cancelled() or worker.exception() is None:
+        return
+    print(f'Stopped answering the requests of a client: {worker.exception()!s}')
+    closing = asyncio.ensure_future(websocket.close(code=1011, reason='Internal server error'))
+    background_tasks.add(closing)
+    closing.add_done_callback(background_tasks.discard)
+
+
+def get_chunk_size(client_max_size: int) -> int:
+    """Get the chunk size of the responses, a chunk must fit the client limit with its offset."""
+    return min(get_server_config().chunk_size, client_max_size - CHUNK_OFFSET_BYTES)
+
+
+def get_write_buffer_size(websocket: WebSocketServerProtocol) -> int:
+    """Get the number of bytes that are sent to a client but not yet taken by its socket."""
+    transport = getattr(websocket, 'transport', None)
+    return 0 if transport is None else int(transport.get_write_buffer_size())
+
+
+class FrameStream:
+    """Pushes the frames of a subscription to one client at the subscribed rate.
+
+    During playback the client subscribes once instead of requesting every sensor of every
+    frame. The frames are paced on wall-clock time by a PlaybackScheduler with the 'drop'
+    policy, so frames whose time passed while a frame was created or sent are skipped. A frame
+    is also dropped while the client has not taken the previous frames from the socket.
+
+    The control messages are ``{'control': <command>, ...}`` with the commands
+
+    - 'subscribe' with 'seq_id', 'frame_id', 'fps', 'sensors', the request 'options' per sensor
+      and the 'max_size' of a message,
+    - 'pause', 'resume', 'seek' with 'frame_id', 'rate' with 'fps' and 'unsubscribe'.
+
+    Every frame is sent as one message created by ``encode_stream_frame``. A frame that cannot be
+    created, e.g. after the last pose of the sequence, is sent with the error and pauses the
+    stream.
+    """
+
+    def __init__(
+        self, websocket: WebSocketServerProtocol, send_lock: asyncio.Lock, executor: Executor
+    ) -> None:
+        """Initialize an idle stream of a client connection, creating its frames on executor."""
+        self.websocket = websocket
+        self.send_lock = send_lock
+        self.executor = executor
+        self.seq_id = 0
+        self.frame_id = 0
+        self.sensors: list[str] = []
+        self.options: dict[str, dict[str, str | int | float]] = {}
+        self.max_chunk_size = get_server_config().chunk_size
+        self.scheduler = PlaybackScheduler(1.0, policy='drop')
+        self.dropped = 0  # frames dropped for a full socket buffer
+        self._running = asyncio.Event()
+        self._seeks = 0  # a seek while a frame is sent must not be advanced past
+        self._task: asyncio.Task[None] | None = None
+
+    async def handle_message(self, message: str | bytes) -> bool:
+        """Apply a control message.
+
+        Returns:
+            handled: whether the message was a control message, False for a data request.
+        """
+        try:
+            request = json.loads(message)
+            command = request['control']
+        except (ValueError, KeyError, TypeError):
+            return False
+        error = ''
+        try:
+            if command == 'subscribe':
+                self.subscribe(
+                    int(request['seq_id']),
+                    int(request['frame_id']),
+                    fps=float(request['fps']),
+                    sensors=[str(sensor) for sensor in request['sensors']],
+                    options=dict(request.get('options', {})),
+                    max_size=int(request.get('max_size', MAX_MESSAGE_SIZE)),
+                )
+            elif command == 'pause':
+                self._running.clear()
+            elif command == 'resume':
+                self.scheduler.start()
+                self._running.set()
+            elif command == 'seek':
+                self.seek(int(request['frame_id']))
+            elif command == 'rate':
+                self.scheduler.set_frame_time(get_frame_time(float(request['fps'])))
+            elif command == 'unsubscribe':
+                self.close()
+            else:
+                error = f'Unknown stream command: {command}'
+        except (ValueError, KeyError, TypeError) as e:
+            error = f'Invalid control: {e!s}'
+        if error:
+            async with self.send_lock:
+                await self.websocket.send(
+                    encode_stream_frame(self.seq_id, self.frame_id, {}, error)
+                )
+        return True
+
+    def subscribe(  # noqa: PLR0913
+        self,
+        seq_id: int,
+        frame_id: int,
+        *,
+        fps: float,
+        sensors: list[str],
+        options: dict[str, dict[str, str | int | float]],
+        max_size: int = MAX_MESSAGE_SIZE,
+    ) -> None:
+        """Start pushing the frames of a sequence from a frame on, replacing a subscription."""
+        frame_time = get_frame_time(fps)
+        self.close()
+        self.seq_id = seq_id
+        self.frame_id = frame_id
+        self.sensors = sensors
+        self.options = options
+        self.max_chunk_size = get_chunk_size(max_size)
+        self.scheduler.frame_time = frame_time
+        self.scheduler.start()
+        self.dropped = 0
+        self._running.set()
+        self._task = asyncio.create_task(self.run())
+
+    def seek(self, frame_id: int) -> None:
+        """Continue the stream at a frame, which is due now."""
+        self.frame_id = frame_id
+        self._seeks += 1
+        self.scheduler.start()
+
+    def close(self) -> None:
+        """Stop pushing frames."""
+        self._running.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        """Push the due frames until the stream is closed."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._running.wait()
+            await asyncio.sleep(self.scheduler.wait_time())
+            if not self._running.is_set():
+                continue  # paused while waiting
+            seeks = self._seeks
+            frame_id = self.frame_id
+            if get_write_buffer_size(self.websocket) > get_server_config().stream_buffer_size:
+                self.dropped += 1
+                print(f'Client is not keeping up, dropped frame {frame_id}')
+            else:
+                try:
+                    message = await loop.run_in_executor(
+                        self.executor,
+                        create_stream_frame,
+                        self.seq_id,
+                        frame_id,
+                        self.sensors,
+                        self.options,
+                        id(self.websocket),
+                    )
+                except Exception as e:  # noqa: BLE001
+                    # Stay at the frame, e.g. the end of the sequence, until a seek or resume
+                    self._running.clear()
+                    async with self.send_lock:
+                        await self.websocket.send(
+                            encode_stream_frame(self.seq_id, frame_id, {}, str(e))
+                        )
+                    continue
+                async with self.send_lock:
+                    await send_response(self.websocket, message, self.max_chunk_size)
+            step = self.scheduler.frame_shown()
+            if seeks == self._seeks:
+                self.frame_id = frame_id + step
+
+
+def get_frame_time(fps: float) -> float:
+    """Get the time between two pushed frames in seconds."""
+    if fps <= 0:
+        msg = f'Stream rate must be positive, got {fps} fps'
+        raise ValueError(msg)
+    return 1 / fps
+
+
+def create_stream_frame(
+    seq_id: int,
+    frame_id: int,
+    sensors: list[str],
+    options: dict[str, dict[str, str | int | float]],
+    client_id: int | None = None,
+) -> bytes:
+    """Create the responses of the subscribed sensors of a frame as one message.
+
+    Raises:
+        ValueError: if the frame is after the end of the sequence. The backend engine would
+            send the buffered data of the last frame instead.
+    """
+    num_frames = get_num_frames(seq_id)
+    if frame_id >= num_frames:
+        msg = f'End of sequence {seq_id}, its last frame is {num_frames - 1}'
+        raise ValueError(msg)
+    responses = {
+        sensor: create_response(sensor, seq_id, frame_id, options.get(sensor), client_id)
+        for sensor in sensors
+    }
+    return encode_stream_frame(seq_id, frame_id, responses)
+
+
+def get_num_frames(seq_id: int) -> int:
+    """Get the number of frames of a sequence, i.e. of its poses."""
+    poses = get_backend_engine().get_static_data(seq_id)['poses']
+    return len(poses)
+
+
+async def send_response(
+    websocket: WebSocketServerProtocol, response: bytes, max_chunk_size: int = CHUNK_SIZE
+) -> None:
+    """Send a response as one message, or stream it in chunks if it is larger than a chunk.
+
+    A streamed response is announced by a text message with its size, followed by the binary
+    chunks with their offset in the response, see ``announce_chunks`` and ``iter_chunks``.
+    """
+    if len(response) <= max_chunk_size:
+        await websocket.send(response)
+        return
+    await websocket.send(announce_chunks(len(response), max_chunk_size))
+    for chunk in iter_chunks(response, max_chunk_size):
+        await websocket.send(chunk)
+
+
+class ResponseCache:
+    """The responses of the most recently requested frames, shared by all clients.
+
+    Unlike functools.lru_cache, the caller decides whether a response is stored, so a response
+    created from the buffer memory of a client is not served to the other clients.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Initialize an empty cache of at most maxsize responses."""
+        self.maxsize = maxsize
+        self._responses: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()  # the connections create their responses in parallel
+
+    def __len__(self) -> int:
+        """Get the number of cached responses."""
+        return len(self._responses)
+
+    def get(self, key: Hashable) -> bytes | None:
+        """Get a cached response, None if it is not cached."""
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            return response
+
+    def put(self, key: Hashable, response: bytes) -> None:
+        """Store a response, the least recently used one is dropped."""
+        with self._lock:
+            self._responses[key] = response
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.maxsize:
+                self._responses.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all responses."""
+        with self._lock:
+            self._responses.clear()
+
+
+voxel_mesh_cache = ResponseCache(VOXEL_MESH_CACHE_SIZE)
+camera_cache = ResponseCache(CAMERA_CACHE_SIZE)
+
+
+def create_voxel_mesh_response(seq_id: int, frame_id: int, client_id: int | None = None) -> bytes:
+    """Create the greedy meshed voxel surface of a frame.
+
+    The result is cached per frame, since the voxel ground truth of a frame never changes and the
+    meshing is the most expensive step of a voxel response. A cached response is sent without
+    loading the frame, so it does not update the buffer memory of the client.
+
+    Args:
+        seq_id: the sequence id.
+        frame_id: the frame id.
+        client_id: the client whose buffer memory replaces a missing voxel grid. Such a
+            response is not cached.
+    """
+    response = voxel_mesh_cache.get((seq_id, frame_id))
+    if response is not None:
+        return response
+    engine = get_backend_engine()
+    voxel, buffered = engine.load_voxel(seq_id, frame_id, client_id=client_id)
+    static_data = engine.get_static_data(seq_id)
+    response = encode_voxel_mesh(
+        voxel,
+        np.asarray(static_data['fov_mask'], dtype=np.bool_),
+        np.asarray(static_data['t_velo_2_cam'], dtype=np.float64),
+    )
+    if not buffered:
+        voxel_mesh_cache.put((seq_id, frame_id), response)
+    return response
+
+
+def resize_camera_image(
+    image: MatLike, shape: tuple[int, int, int] = CAMERA_SHAPE
+) -> NDArray[np.uint8]:
+    """Crop the image to the full camera shape and resize it with area averaging if needed."""
+    cropped = np.asarray(image[: CAMERA_SHAPE[0], : CAMERA_SHAPE[1]], dtype=np.uint8)
+    if shape == CAMERA_SHAPE:
+        return cropped
+    height, width, _ = shape
+    return np.asarray(
+        cv2.resize(cropped, (width, height), interpolation=cv2.INTER_AREA), dtype=np.uint8
+    )
 
-                response = create_response(sensor_type, seq_id, frame_id)
-                await websocket.send(response)
-            except (ValueError, KeyError, TypeError) as e:
-                error_msg = {'error': f'Invalid request: {e!s}'}
-                await websocket.send(error_msg)
-    finally:
-        connected_clients.remove(websocket)
-        print('Client disconnected.')
+
+def create_resized_camera_response(
+    sensor_type: str,
+    seq_id: int,
+    frame_id: int,
+    shape: tuple[int, int, int],
+    client_id: int | None = None,
+) -> bytes:
+    """Create the camera image of a frame, resized to the display size of the client.
+
+    The result is cached per frame and size, so a frame that is shown again, e.g. while the
+    playback is paused, is only resized and compressed once. A cached response is sent without
+    loading the frame, so it does not update the buffer memory of the client.
+
+    Args:
+        sensor_type: 'camera2' or 'camera3'.
+        seq_id: the sequence id.
+        frame_id: the frame id.
+        shape: the (height, width, channels) of the resized image, see get_camera_shape.
+        client_id: the client whose buffer memory replaces a missing image. Such a response
+            is not cached.
+    """
+    key = (sensor_type, seq_id, frame_id, shape)
+    response = camera_cache.get(key)
+    if response is not None:
+        return response
+    image, buffered = get_backend_engine().load_image(
+        seq_id, frame_id, CAMERA_IMAGE_KEYS[sensor_type], client_id=client_id
+    )
+    if isinstance(image, np.ndarray):
+        resized = resize_camera_image(np.asarray(image, dtype=np.uint8), shape)
+        response = bz2.compress(
+            np.ascontiguousarray(resized).tobytes(),
+            compresslevel=get_server_config().compression_level,
+        )
+        if not buffered:
+            camera_cache.put(key, response)
+        return response
+    msg = f'Invalid data type for {CAMERA_IMAGE_KEYS[sensor_type]}'
+    raise ValueError(msg)
 
 
-def create_response(sensor_type: str, seq_id: int, frame_id: int) -> bytes:  # noqa: C901
-    """Fetch and format data from BackendEngine as raw bytes."""
+def create_stereo_response(
+    seq_id: int,
+    frame_id: int,
+    options: dict[str, str | int | float],
+    client_id: int | None = None,
+) -> bytes:
+    """Create one message with the images of both cameras.
+
+    Only the two images are loaded, concurrently, instead of all sensors of the frame.
+
+    Args:
+        seq_id: the sequence id.
+        frame_id: the frame id.
+        options: the display size {'width': 613, 'height': 185} and the layout
+            {'layout': 'side_by_side'} of the images, see encode_stereo.
+        client_id: the client whose buffer memory replaces missing images.
+    """
+    image_2, image_3 = get_backend_engine().load_images(seq_id, frame_id, client_id=client_id)
+    if isinstance(image_2, np.ndarray) and isinstance(image_3, np.ndarray):
+        shape = get_camera_shape(int(options.get('width', 0)), int(options.get('height', 0)))
+        return encode_stereo(
+            resize_camera_image(image_2, shape),
+            resize_camera_image(image_3, shape),
+            side_by_side=options.get('layout') == 'side_by_side',
+            executor=stereo_executor,
+            compresslevel=get_server_config().compression_level,
+        )
+    msg = 'Invalid data type for image_2 or image_3'
+    raise ValueError(msg)
+
+
+def create_thumbnail_response(seq_id: int, options: dict[str, str | int | float]) -> bytes:
+    """Create the thumbnail atlas of a sequence for previews while scrubbing.
+
+    The atlas is built once per sequence and cached on disk by the backend engine.
+
+    Args:
+        seq_id: the sequence id.
+        options: the frames between two thumbnails {'step': 10} and the thumbnail width
+            {'width': 160}.
+    """
+    try:
+        atlas = get_backend_engine().load_thumbnails(
+            seq_id,
+            step=int(options.get('step', THUMBNAIL_STEP)),
+            width=int(options.get('width', THUMBNAIL_WIDTH)),
+        )
+    except FileNotFoundError as e:
+        msg = f'No thumbnails for sequence {seq_id}: {e!s}'
+        raise ValueError(msg) from e
+    return encode_thumbnails(atlas)
+
+
+def create_scene_map_response(
+    seq_id: int,
+    frame_id: int,
+    options: dict[str, str | int | float],
+    client_id: int | None = None,
+) -> bytes:
+    """Create the surface of the lidar scans fused up to a frame.
+
+    The map of a sequence and client is updated incrementally, see
+    BackendEngine.process_scene_map, and encoded like a voxel grid whose transformation to the
+    camera is the one of the frame.
+
+    Args:
+        seq_id: the sequence id.
+        frame_id: the frame id.
+        options: the voxel encoding {'encoding': 'geometry'}, 'rle', 'geometry' or 'mesh'.
+        client_id: the client whose scene map is updated.
+    """
+    data = get_backend_engine().process_scene_map(seq_id, frame_id, client_id=client_id)
+    voxel = np.asarray(data['voxel'], dtype=np.uint8)
+    fov_mask = np.asarray(data['fov_mask'], dtype=np.bool_)
+    t_map_2_cam = np.asarray(data['t_velo_2_cam'], dtype=np.float64)
+    encoding = str(options.get('encoding', 'geometry'))
+    if encoding == 'mesh':
+        return encode_voxel_mesh(voxel, fov_mask, t_map_2_cam)
+    if encoding not in VOXEL_ENCODERS:
+        msg = f'Unknown scene map encoding: {encoding}'
+        raise ValueError(msg)
+    return VOXEL_ENCODERS[encoding](voxel, fov_mask, t_map_2_cam)
+
+
+def create_response(  # noqa: C901, PLR0911, PLR0912, PLR0915
+    sensor_type: str,
+    seq_id: int,
+    frame_id: int,
+    options: dict[str, str | int | float] | None = None,
+    client_id: int | None = None,
+) -> bytes:
+    """Fetch and format data from BackendEngine as raw bytes.
+
+    Args:
+        sensor_type: the requested sensor.
+        seq_id: the sequence id.
+        frame_id: the frame id.
+        options: optional encoding parameters of the request, e.g. {'encoding': 'quantized'}
+            and {'subsample': 2} of a point cloud or the display size
+            {'width': 613, 'height': 185} of a camera image.
+        client_id: the client whose buffer memory replaces missing files.
+    """
+    options = options or {}
     print(
         f'Processing request for sensor type: {sensor_type}, '
         f'seq_id: {seq_id}, frame_id: {frame_id}'
     )
-    data = backend_engine.process(seq_id, frame_id)
+    if sensor_type == 'voxel' and options.get('encoding') == 'mesh':
+        return create_voxel_mesh_response(seq_id, frame_id, client_id)
+    if sensor_type == 'stereo':
+        return create_stereo_response(seq_id, frame_id, options, client_id)
+    if sensor_type == 'thumbnails':
+        return create_thumbnail_response(seq_id, options)
+    if sensor_type == 'map':
+        return create_scene_map_response(seq_id, frame_id, options, client_id)
+    if sensor_type in CAMERA_IMAGE_KEYS:
+        shape = get_camera_shape(int(options.get('width', 0)), int(options.get('height', 0)))
+        if shape != CAMERA_SHAPE:
+            return create_resized_camera_response(sensor_type, seq_id, frame_id, shape, client_id)
+    data = get_backend_engine().process(seq_id, frame_id, client_id=client_id)
 
     try:
         if sensor_type == 'camera2':
@@ -61,7 +748,9 @@ def create_response(sensor_type: str, seq_id: int, frame_id: int) -> bytes:  # n
 
             if isinstance(image_2, np.ndarray):
                 image_2 = image_2[:370, :1226, :]
-                return bz2.compress(image_2.tobytes())
+                return bz2.compress(
+                    image_2.tobytes(), compresslevel=get_server_config().compression_level
+                )
             msg = 'Invalid data type for image_2'
             raise ValueError(msg)
 
@@ -70,7 +759,9 @@ def create_response(sensor_type: str, seq_id: int, frame_id: int) -> bytes:  # n
 
             if isinstance(image_3, np.ndarray):
                 image_3 = image_3[:370, :1226, :]
-                return bz2.compress(image_3.tobytes())
+                return bz2.compress(
+                    image_3.tobytes(), compresslevel=get_server_config().compression_level
+                )
             msg = 'Invalid data type for image_3'
             raise ValueError(msg)
 
@@ -78,7 +769,14 @@ def create_response(sensor_type: str, seq_id: int, frame_id: int) -> bytes:  # n
             lidar_pc = data.get('lidar_pc')
             pc_labels = data.get('lidar_pc_labels')
             if isinstance(lidar_pc, np.ndarray) and isinstance(pc_labels, np.ndarray):
-                return gzip.compress(lidar_pc.tobytes() + b'__SPLIT__' + pc_labels.tobytes())
+                subsample = max(1, int(options.get('subsample', 1)))
+                return encode_lidar(
+                    np.asarray(lidar_pc[::subsample], dtype=np.float32),
+                    np.asarray(pc_labels[::subsample], dtype=np.uint32),
+                    encoding=str(options.get('encoding', 'raw')),
+                    resolution=float(options.get('resolution', LIDAR_RESOLUTION)),
+                    instances=bool(options.get('instances', False)),
+                )
             msg = 'Invalid data type for lidar_pc or lidar_pc_labels'
             raise ValueError(msg)
 
@@ -91,6 +789,13 @@ def create_response(sensor_type: str, seq_id: int, frame_id: int) -> bytes:  # n
                 and isinstance(fov_mask, np.ndarray)
                 and isinstance(t_velo_2_cam, np.ndarray)
             ):
+                encoder = VOXEL_ENCODERS.get(str(options.get('encoding', 'dense')))
+                if encoder is not None:
+                    return encoder(
+                        np.asarray(voxel, dtype=np.uint8),
+                        np.asarray(fov_mask, dtype=np.bool_),
+                        np.asarray(t_velo_2_cam, dtype=np.float64),
+                    )
                 combined = (
                     voxel.tobytes()
                     + b'__SPLIT__'
@@ -117,12 +822,29 @@ def create_response(sensor_type: str, seq_id: int, frame_id: int) -> bytes:  # n
     raise ValueError(msg)
 
 
-async def start_server(port: int, stop_event: asyncio.Event) -> None:
-    """Start the WebSocket server."""
-    print(f'Starting server on ws://localhost:{port}')
-    server = await websockets.serve(handle_client, 'localhost', port, max_size=2_097_152)  # type: ignore[arg-type]
+async def start_server(
+    port: int, stop_event: asyncio.Event, *, host: str = 'localhost', reuse_port: bool = False
+) -> None:
+    """Start the WebSocket server.
+
+    Args:
+        port: the port to listen on.
+        stop_event: the server stops when it is set.
+        host: the address to listen on.
+        reuse_port: let several worker processes listen on the port, see sensorium.server.
+    """
+    print(f'Starting server on ws://{host}:{port}')
+    server = await websockets.serve(
+        handle_client,  # type: ignore[arg-type]
+        host,
+        port,
+        max_size=get_server_config().max_message_size,
+        reuse_port=reuse_port,
+    )
 
     try:
+        # Clients can connect meanwhile, a request that needs a kernel waits for its compilation
+        await asyncio.get_running_loop().run_in_executor(None, warm_up_backend)
         await stop_event.wait()
     finally:
         server.close()
@@ -130,6 +852,13 @@ async def start_server(port: int, stop_event: asyncio.Event) -> None:
         print('Server stopped.')
 
 
+def warm_up_backend() -> None:
+    """Compile the kernels of the backend engine before the first request needs them."""
+    start_time = time.perf_counter()
+    get_backend_engine().warm_up()
+    print(f'Backend engine warmed up in {time.perf_counter() - start_time:.2f} s')
+
+
 async def stop_server(stop_event: asyncio.Event) -> None:
     """Stop the WebSocket server."""
     stop_event.set()
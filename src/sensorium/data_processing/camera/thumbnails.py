@@ -0,0 +1,158 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Thumbnail atlas of a camera sequence, used to preview frames while scrubbing.
+
+Every ``step``-th image of a sequence is downscaled and tiled row by row into one atlas image.
+The atlas is stored as a JPEG file, so it is built once per sequence and then only read.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+THUMBNAIL_STEP = 10  # every 10th frame, i.e. one thumbnail per second of a 10 Hz sequence
+THUMBNAIL_WIDTH = 160  # in pixel, the height follows from the aspect ratio of the images
+THUMBNAIL_COLUMNS = 20
+THUMBNAIL_QUALITY = 80  # JPEG quality of the atlas
+THUMBNAIL_WORKERS = 4  # OpenCV releases the GIL while decoding and resizing
+
+
+class ThumbnailAtlas(NamedTuple):
+    """A JPEG atlas of thumbnails and the layout to find the thumbnail of a frame."""
+
+    image: bytes
+    step: int
+    num_thumbnails: int
+    columns: int
+
+    @property
+    def rows(self) -> int:
+        """The number of thumbnail rows of the atlas."""
+        return math.ceil(self.num_thumbnails / self.columns)
+
+    def thumbnail_index(self, frame_id: int) -> int:
+        """Get the index of the thumbnail that is closest to a frame."""
+        return min(max(round(frame_id / self.step), 0), self.num_thumbnails - 1)
+
+    def tile(self, frame_id: int, atlas_size: tuple[int, int]) -> tuple[int, int, int, int]:
+        """Get the rectangle of the thumbnail of a frame in the decoded atlas.
+
+        Args:
+            frame_id: the frame to preview.
+            atlas_size: (width, height) of the decoded atlas in pixel.
+
+        Returns:
+            rect: (x, y, width, height) of the thumbnail in pixel.
+        """
+        width = atlas_size[0] // self.columns
+        height = atlas_size[1] // self.rows
+        row, column = divmod(self.thumbnail_index(frame_id), self.columns)
+        return column * width, row * height, width, height
+
+
+def get_thumbnail_frames(image_dir: Path, step: int = THUMBNAIL_STEP) -> list[Path]:
+    """Get the image files of every step-th frame of a camera directory."""
+    if step < 1:
+        msg = f'Thumbnail step must be positive, got {step}'
+        raise ValueError(msg)
+    return sorted(image_dir.glob('*.png'))[::step]
+
+
+def build_thumbnail_atlas(
+    image_paths: list[Path],
+    width: int = THUMBNAIL_WIDTH,
+    columns: int = THUMBNAIL_COLUMNS,
+) -> NDArray[np.uint8]:
+    """Downscale the images and tile them row by row into one BGR image.
+
+    The thumbnail height follows from the first image. Unreadable images leave a black tile.
+
+    Args:
+        image_paths: the images in the order of the thumbnails.
+        width: the width of one thumbnail in pixel.
+        columns: the number of thumbnails per row.
+
+    Returns:
+        atlas: (rows * height, columns * width, 3) BGR image.
+    """
+    if not image_paths:
+        msg = 'No images to build a thumbnail atlas from'
+        raise ValueError(msg)
+    first = cv2.imread(str(image_paths[0]), cv2.IMREAD_COLOR)
+    if first is None:
+        msg = f'Cannot read image {image_paths[0]}'
+        raise ValueError(msg)
+    height = max(1, round(width * first.shape[0] / first.shape[1]))
+    rows = math.ceil(len(image_paths) / columns)
+    atlas = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+
+    def load_thumbnail(path: Path) -> NDArray[np.uint8] | None:
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        return np.asarray(
+            cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA), dtype=np.uint8
+        )
+
+    with ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS) as executor:
+        for index, thumbnail in enumerate(executor.map(load_thumbnail, image_paths)):
+            if thumbnail is not None:
+                row, column = divmod(index, columns)
+                atlas[row * height : (row + 1) * height, column * width : (column + 1) * width] = (
+                    thumbnail
+                )
+    return atlas
+
+
+def load_thumbnail_atlas(
+    image_dir: Path,
+    cache_file: Path,
+    step: int = THUMBNAIL_STEP,
+    width: int = THUMBNAIL_WIDTH,
+) -> ThumbnailAtlas:
+    """Read the thumbnail atlas of a camera directory from the cache, or build and cache it.
+
+    The cached atlas is rebuilt when the image directory changed after it was written.
+
+    Args:
+        image_dir: the directory of the camera images, e.g. sequences/00/image_2.
+        cache_file: the JPEG file of the cached atlas.
+        step: the number of frames between two thumbnails.
+        width: the width of one thumbnail in pixel.
+
+    Returns:
+        atlas: the JPEG atlas and its layout.
+    """
+    image_paths = get_thumbnail_frames(image_dir, step)
+    if not image_paths:
+        msg = f'No camera images found in {image_dir}'
+        raise FileNotFoundError(msg)
+
+    if cache_file.exists() and cache_file.stat().st_mtime >= image_dir.stat().st_mtime:
+        image = cache_file.read_bytes()
+    else:
+        atlas = build_thumbnail_atlas(image_paths, width)
+        quality = [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY]
+        success, encoded = cv2.imencode('.jpg', atlas, quality)
+        if not success:
+            msg = f'Cannot encode the thumbnail atlas of {image_dir}'
+            raise ValueError(msg)
+        image = encoded.tobytes()
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file first, so a concurrent reader never sees a partial atlas.
+        with NamedTemporaryFile(dir=cache_file.parent, suffix='.tmp', delete=False) as temp_file:
+            temp_path = Path(temp_file.name)
+            try:
+                temp_file.write(image)
+            except BaseException:
+                temp_path.unlink(missing_ok=True)
+                raise
+        temp_path.replace(cache_file)
+    return ThumbnailAtlas(image, step, len(image_paths), THUMBNAIL_COLUMNS)
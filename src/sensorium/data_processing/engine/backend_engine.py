@@ -3,6 +3,9 @@
 
 """Main engine for data processing which call unit loader functions."""
 
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -12,25 +15,65 @@ from numpy.typing import NDArray
 
 import sensorium.data_processing.utils.io_data as semkitti_io
 from sensorium.data_processing.camera.camera import load_single_img
+from sensorium.data_processing.camera.thumbnails import (
+    THUMBNAIL_STEP,
+    THUMBNAIL_WIDTH,
+    ThumbnailAtlas,
+    load_thumbnail_atlas,
+)
 from sensorium.data_processing.lidar_pointcloud.point_cloud import (
     read_labels_and_colors,
     read_point_cloud,
 )
 from sensorium.data_processing.trajectory.traj import get_framepos_from_list, parse_poses
+from sensorium.data_processing.voxel_process.scene_map import (
+    MAP_STRIDE,
+    SceneMap,
+    warm_up_integrate_scan,
+)
 from sensorium.data_processing.voxel_process.ssc_voxel_loader import (
     load_ssc_voxel,
     read_calib,
     vox2pix,
+    warm_up_vox2pix,
 )
+from sensorium.data_processing.voxel_process.voxel_geometry import VOX_ORIGIN
+
+STATIC_DATA_CACHE_SIZE = 8  # sequences whose static data is kept, e.g. one per client
+SCENE_MAP_CACHE_SIZE = 2  # fused scene maps that are kept, about 70 MB each
+
+StaticData = dict[str, str | list[NDArray[np.float64]] | NDArray[np.float64] | NDArray[np.bool_]]
+# The last loaded data of every sensor, sent instead of the data of a missing file
+BufferMemory = dict[str, object]
+# A scene map is fused per sequence and client, None is the client of the calls without one
+SceneMapKey = tuple[str, int | None]
+
+
+def create_buffer_memory() -> BufferMemory:
+    """Create the initial buffer memory. Don't use None to avoid type checking error."""
+    return {
+        'image_2': np.zeros((1,), dtype=np.uint8),
+        'image_3': np.zeros((1,), dtype=np.uint8),
+        'lidar_pc': np.zeros((3,), dtype=np.float32),
+        'lidar_label': np.zeros((1,), dtype=np.uint32),
+        'lidar_label_colors': np.zeros((4, 1), dtype=np.uint8),
+        'trajectory': np.zeros((3, 1), dtype=np.float64),
+    }
 
 
 class BackendEngine:
-    """Main engine for data processing which call unit loaders and unit processors."""
+    """Main engine for data processing which call unit loaders and unit processors.
+
+    The engine can be called from several threads, e.g. one per client connection of the
+    server. The caches shared by the calls, i.e. the static data, the scene maps and the
+    thumbnail atlases, are locked; loading the data of a frame is not.
+    """
 
     def __init__(
         self,
         data_dir: str,
         *,
+        cache_dir: str | None = None,
         verbose: bool = False,
         # **kwargs: dict,  # In case using config file to build the object
     ) -> None:
@@ -38,10 +81,13 @@ class BackendEngine:
 
         Args:
             data_dir: the kitti root directory from which path to individual data type is formed.
+            cache_dir: directory of the data derived once per sequence, e.g. the thumbnail
+                atlases. Defaults to 'cache' in the working directory.
             verbose: whether to print debug messages.
         """
         # @Danit: Import and use the real loaders
         self.data_dir = data_dir
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.cwd() / 'cache'
         self.verbose = verbose
 
         # @Danit: Declare all meta data attributes
@@ -60,20 +106,76 @@ class BackendEngine:
         self.problem_load_trajectory = False
         self.problem_load_voxel = False
 
-        # Initialize buffer memory. Don't use None to avoid type checking error.
-        self.buf_mem = {
-            'image_2': np.zeros((1,), dtype=np.uint8),
-            'image_3': np.zeros((1,), dtype=np.uint8),
-            'lidar_pc': np.zeros((3,), dtype=np.float32),
-            'lidar_label': np.zeros((1,), dtype=np.uint32),
-            'lidar_label_colors': np.zeros((4, 1), dtype=np.uint8),
-            'trajectory': np.zeros((3, 1), dtype=np.float64),
-        }
+        # Loads the second camera image while the calling thread loads the first one
+        self._image_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image_loader')
+
+        # Buffer memory of the calls without a client, and of every client of the server, so
+        # a client never gets the fallback data of a frame another client loaded
+        self.buf_mem = create_buffer_memory()
+        self.client_buf_mem: dict[int, BufferMemory] = {}
+
+        # Static data of the most recently used sequences, the least recently used is evicted
+        self.static_data: OrderedDict[str, StaticData] = OrderedDict()
+        self.static_data_cache_size = STATIC_DATA_CACHE_SIZE
+        self._static_data_lock = threading.Lock()
+
+        # Scene maps of the most recently used sequences and clients, fused incrementally per
+        # request, so clients at different positions of a sequence do not reset each other's map
+        self.scene_maps: OrderedDict[SceneMapKey, SceneMap] = OrderedDict()
+        self.map_stride = MAP_STRIDE
+        # FOV mask of every scene map with the map to camera transformation it was computed for
+        self.scene_map_fov_masks: dict[SceneMapKey, tuple[bytes, NDArray[np.bool_]]] = {}
+        self._scene_map_lock = threading.Lock()
+        # Builds an atlas once, while the frames of the other calls are loaded meanwhile
+        self._thumbnail_lock = threading.Lock()
+
+        # Loaded from the config file on first use
+        self._remap_lut: NDArray[np.int32] | None = None
+
+    def get_buffer_memory(self, client_id: int | None = None) -> BufferMemory:
+        """Get the buffer memory of a client, created on its first request."""
+        if client_id is None:
+            return self.buf_mem
+        return self.client_buf_mem.setdefault(client_id, create_buffer_memory())
+
+    def release_client(self, client_id: int) -> None:
+        """Drop the buffer memory and the scene maps of a client that disconnected."""
+        self.client_buf_mem.pop(client_id, None)
+        with self._scene_map_lock:
+            for key in [key for key in self.scene_maps if key[1] == client_id]:
+                del self.scene_maps[key]
+                self.scene_map_fov_masks.pop(key, None)
+
+    def get_static_data(self, sequence_id: int | str) -> StaticData:
+        """Get the static data of a sequence, processed on the first request of the sequence.
+
+        The static data of the least recently used sequence is dropped when more than
+        static_data_cache_size sequences are used, so clients on different sequences do not
+        reprocess it on every request.
+        """
+        sequence_id = f'{int(sequence_id):02d}'
+        with self._static_data_lock:
+            static_data = self.static_data.get(sequence_id)
+            if static_data is None:
+                if self.verbose:
+                    print('Will send data from buffer memory if file of current frame not found')
+                    print(f'Processing static data for sequence {sequence_id} ...')
+                static_data = self.process_static_data(sequence_id=sequence_id)
+                self.static_data[sequence_id] = static_data
+                while len(self.static_data) > self.static_data_cache_size:
+                    self.static_data.popitem(last=False)
+            self.static_data.move_to_end(sequence_id)
+        return static_data
+
+    def warm_up(self) -> None:
+        """Compile the kernels of the static data and the scene map before the first request."""
+        warm_up_vox2pix()
+        warm_up_integrate_scan()
 
     def process_static_data(
         self,
         sequence_id: int | str,
-    ) -> dict[str, str | list[NDArray[np.float64]] | NDArray[np.float64] | NDArray[np.bool_]]:
+    ) -> StaticData:
         """Process the data that takes long time, but only needs to be done once every sequence."""
         # Meta data
         sequence_id = f'{int(sequence_id):02d}'  # 2 digits, from 1 to '01'
@@ -106,13 +208,128 @@ class BackendEngine:
             'sequence_id': sequence_id,
             'fov_mask': fov_mask,
             't_velo_2_cam': t_velo_2_cam,
+            'cam_k': cam_k,
             'poses': poses,
         }
 
+    def get_scene_map(self, sequence_id: int | str, client_id: int | None = None) -> SceneMap:
+        """Get the scene map of a sequence and client, the least recently used one is dropped.
+
+        Every client has its own map, since a map is reset when a frame before its last fused
+        frame is requested. Only SCENE_MAP_CACHE_SIZE maps are kept, so more clients than that
+        rebuild their maps in turn. The maps are used by process_scene_map, which holds the
+        scene map lock.
+        """
+        key = (f'{int(sequence_id):02d}', client_id)
+        scene_map = self.scene_maps.get(key)
+        if scene_map is None or scene_map.stride != self.map_stride:
+            scene_map = SceneMap(
+                self.get_static_data(key[0])['poses'],  # type: ignore[arg-type]
+                stride=self.map_stride,
+            )
+            self.scene_maps[key] = scene_map
+            while len(self.scene_maps) > SCENE_MAP_CACHE_SIZE:
+                self.scene_map_fov_masks.pop(self.scene_maps.popitem(last=False)[0], None)
+        self.scene_maps.move_to_end(key)
+        return scene_map
+
+    def get_scene_map_fov_mask(
+        self, sequence_id: str, t_map_2_cam: NDArray[np.float64], client_id: int | None = None
+    ) -> NDArray[np.bool_]:
+        """Get the FOV mask of the scene map of a sequence and client seen from a camera pose.
+
+        The mask is only computed again when the transformation changed, e.g. not when the
+        same frame is requested again, since vox2pix takes longer than fusing a scan.
+        """
+        cached = self.scene_map_fov_masks.get((sequence_id, client_id))
+        key = t_map_2_cam.tobytes()
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        _, fov_mask, _ = vox2pix(
+            t_map_2_cam,
+            np.asarray(self.get_static_data(sequence_id)['cam_k']),
+            VOX_ORIGIN,
+            self.img_shape,
+            self.scene_size,
+        )
+        self.scene_map_fov_masks[sequence_id, client_id] = (key, fov_mask)
+        return fov_mask
+
+    def get_remap_lut(self) -> NDArray[np.int32]:
+        """Get the lookup table of the SemanticKITTI classes, loaded on first use."""
+        if self._remap_lut is None:
+            self._remap_lut = semkitti_io.get_remap_lut(
+                str(Path(Path.cwd()) / 'configs' / 'vox_semantic_kitti.yaml')
+            )
+        return self._remap_lut
+
+    def process_scene_map(
+        self, sequence_id: int | str, frame_id: int | str, *, client_id: int | None = None
+    ) -> dict[str, str | NDArray[np.uint8] | NDArray[np.float64] | NDArray[np.bool_]]:
+        """Fuse the lidar scans up to a frame into the scene map of its sequence.
+
+        Only the scans since the last request of the client for the sequence are fused, see
+        SceneMap and get_scene_map. The result has the keys of the voxel data of process, so it
+        is encoded like a voxel grid.
+
+        Args:
+            sequence_id: the id of the sequence folder
+            frame_id: The id of the frame up to which the scans are fused.
+            client_id: the client whose scene map is updated.
+
+        Returns:
+            data: the surface of the map as 'voxel', its 'fov_mask' and the transformation
+            from the map to the camera of the frame as 't_velo_2_cam'.
+        """
+        sequence_id = f'{int(sequence_id):02d}'
+        static_data = self.get_static_data(sequence_id)
+        remap_lut = self.get_remap_lut()
+        # The scene maps are fused in place, one call at a time
+        with self._scene_map_lock:
+            scene_map = self.get_scene_map(sequence_id, client_id)
+            for fused_frame_id in scene_map.get_frames_to_fuse(int(frame_id)):
+                scan, labels = self._load_scan(sequence_id, f'{fused_frame_id:06d}')
+                if labels is not None:
+                    labels = remap_lut[labels & 0xFFFF].astype(np.uint8)
+                scene_map.integrate(fused_frame_id, scan, labels)
+
+            t_map_2_cam = np.asarray(static_data['t_velo_2_cam']) @ scene_map.get_map_2_velo(
+                int(frame_id)
+            )
+            fov_mask = self.get_scene_map_fov_mask(sequence_id, t_map_2_cam, client_id)
+            voxel = scene_map.get_voxel()
+        return {
+            'frame_id': f'{int(frame_id):06d}',
+            'sequence_id': sequence_id,
+            'voxel': voxel,
+            'fov_mask': fov_mask,
+            't_velo_2_cam': t_map_2_cam,
+        }
+
+    def _load_scan(
+        self, sequence_id: str, frame_id: str
+    ) -> tuple[NDArray[np.float32] | None, NDArray[np.uint32] | None]:
+        """Load the lidar scan and its labels, None if missing.
+
+        The buffer memory is not used, a scan of another frame would be fused at a wrong pose.
+        """
+        sequence_path = Path(self.data_dir) / 'sequences' / sequence_id
+        try:
+            scan = read_point_cloud(str(sequence_path / 'velodyne' / f'{frame_id}.bin'))
+        except FileNotFoundError:
+            return None, None
+        try:
+            labels, _ = read_labels_and_colors(str(sequence_path / 'labels' / f'{frame_id}.label'))
+        except FileNotFoundError:
+            return scan, None
+        return scan, labels
+
     def process(
         self,
         sequence_id: int | str,
         frame_id: int | str,
+        *,
+        client_id: int | None = None,
     ) -> dict[
         str,
         (
@@ -131,6 +348,8 @@ class BackendEngine:
         Args:
             sequence_id: the id of the sequence folder
             frame_id: The id of the frame to be processed.
+            client_id: the client whose buffer memory replaces missing files, see
+                get_buffer_memory.
 
         Returns:
             data: data dict to be passed to COMM with keys <sensor_name> and value <sensor_data>
@@ -140,40 +359,32 @@ class BackendEngine:
         start_frame_id = str(frame_id)
         start_frame_id = f'{frame_id:06d}'  # 6 digits, from 4070 to '004070'
         sequence_id = f'{int(sequence_id):02d}'  # 2 digits, from 1 to '01'
-
-        # If the sequence_id is changed or static data is not available, reprocess static data
-        try:
-            is_seq_id_equal = sequence_id == self.static_data['sequence_id']  # type: ignore[has-type]
-        except AttributeError:
-            is_seq_id_equal = False
-
-        if not is_seq_id_equal:
-            if self.verbose:
-                print('Will send data from buffer memory if file of current frame not found')
-                print(f'Processing static data for sequence {sequence_id} at frame {frame_id} ...')
-            self.static_data = self.process_static_data(sequence_id=sequence_id)
+        static_data = self.get_static_data(sequence_id)
+        buf_mem = self.get_buffer_memory(client_id)
 
         # Load the image
-        image_2_frame, image_3_frame = self._check_and_load_images(sequence_id, start_frame_id)
+        image_2_frame, image_3_frame = self._check_and_load_images(
+            sequence_id, start_frame_id, buf_mem
+        )
 
         # Load the lidar point cloud and panoptic ground truth
         lidar_pc, pc_labels, pc_label_colors = self._check_and_load_lidar(
-            sequence_id, start_frame_id
+            sequence_id, start_frame_id, buf_mem
         )
 
         # Load the trajectory
         try:
             trajectory_data_dict = get_framepos_from_list(
-                self.static_data['poses'],  # type: ignore[arg-type]
+                static_data['poses'],  # type: ignore[arg-type]
                 int(start_frame_id),
             )
             xyz = np.array(
                 [trajectory_data_dict['x'], trajectory_data_dict['y'], trajectory_data_dict['z']]
             )
-            self.buf_mem['trajectory'] = xyz
+            buf_mem['trajectory'] = xyz
         except IndexError:
             self.problem_load_trajectory = True
-            xyz = np.asarray(self.buf_mem['trajectory'])
+            xyz = np.asarray(buf_mem['trajectory'])
 
         if self.verbose:
             print(f"""
@@ -182,25 +393,10 @@ class BackendEngine:
             """)
 
         # Load the voxel
-        sequence_path = str(Path(self.data_dir) / 'sequences')
         # Check if frame_id is divisible by 5
         try:
-            self._check_arguments(frame_id=start_frame_id)
-            # If yes, load the voxel
-            try:  # Check if config file exists and load the voxel
-                voxel_data = load_ssc_voxel(
-                    sequence_path,
-                    sequence_id,
-                    start_frame_id,
-                    semkitti_io.get_remap_lut(
-                        str(Path(Path.cwd()) / 'configs' / 'vox_semantic_kitti.yaml')
-                    ),
-                )
-                self.buf_mem['voxel'] = voxel_data
-            except FileNotFoundError:
-                self.problem_load_voxel = True
-                voxel_data = np.asarray(self.buf_mem['voxel'])
-
+            voxel_data: NDArray[np.uint8] | None
+            voxel_data, _ = self._check_and_load_voxel(sequence_id, start_frame_id, buf_mem)
         except ValueError:
             # If no, assign None to voxel_related data
             voxel_data = None
@@ -224,38 +420,117 @@ class BackendEngine:
             'voxel': voxel_data,
             # NOTE: type: ignore[dict-item] might be required since process_static_data
             # has different item types
-            'fov_mask': self.static_data['fov_mask'],  # type: ignore[dict-item]
-            't_velo_2_cam': self.static_data['t_velo_2_cam'],  # type: ignore[dict-item]
+            'fov_mask': static_data['fov_mask'],  # type: ignore[dict-item]
+            't_velo_2_cam': static_data['t_velo_2_cam'],  # type: ignore[dict-item]
         }
 
+    def load_images(
+        self, sequence_id: int | str, frame_id: int | str, *, client_id: int | None = None
+    ) -> tuple[MatLike | None, MatLike | None]:
+        """Load only the two camera images of a frame, e.g. for a stereo request.
+
+        Args:
+            sequence_id: the id of the sequence folder
+            frame_id: The id of the frame to be processed.
+            client_id: the client whose buffer memory replaces missing files.
+
+        Returns:
+            image_2: the left camera image.
+            image_3: the right camera image.
+        """
+        return self._check_and_load_images(
+            f'{int(sequence_id):02d}', f'{int(frame_id):06d}', self.get_buffer_memory(client_id)
+        )
+
+    def load_image(
+        self,
+        sequence_id: int | str,
+        frame_id: int | str,
+        camera: str,
+        *,
+        client_id: int | None = None,
+    ) -> tuple[MatLike, bool]:
+        """Load the image of one camera of a frame, e.g. to resize it.
+
+        Args:
+            sequence_id: the id of the sequence folder
+            frame_id: The id of the frame to be processed.
+            camera: 'image_2' or 'image_3'.
+            client_id: the client whose buffer memory replaces a missing image.
+
+        Returns:
+            image: the camera image.
+            buffered: whether the image is missing and was replaced by the buffer memory.
+        """
+        sequence_id = f'{int(sequence_id):02d}'
+        frame_id = f'{int(frame_id):06d}'
+        image_path = Path(self.data_dir) / 'sequences' / sequence_id / camera / f'{frame_id}.png'
+        buffered = not image_path.exists()
+        image = self._check_and_load_image(
+            camera, sequence_id, frame_id, self.get_buffer_memory(client_id)
+        )
+        return image, buffered
+
+    def load_voxel(
+        self, sequence_id: int | str, frame_id: int | str, *, client_id: int | None = None
+    ) -> tuple[NDArray[np.uint8], bool]:
+        """Load the voxel grid of a frame, e.g. to mesh it.
+
+        Args:
+            sequence_id: the id of the sequence folder
+            frame_id: The id of the frame to be processed, a multiple of 5.
+            client_id: the client whose buffer memory replaces a missing voxel grid.
+
+        Returns:
+            voxel: the semantic voxel grid.
+            buffered: whether the voxel grid is missing and was replaced by the buffer memory.
+
+        Raises:
+            ValueError: if the frame has no voxel grid.
+        """
+        return self._check_and_load_voxel(
+            f'{int(sequence_id):02d}', f'{int(frame_id):06d}', self.get_buffer_memory(client_id)
+        )
+
+    def load_thumbnails(
+        self,
+        sequence_id: int | str,
+        step: int = THUMBNAIL_STEP,
+        width: int = THUMBNAIL_WIDTH,
+    ) -> ThumbnailAtlas:
+        """Load the thumbnail atlas of the left camera of a sequence, built on the first call.
+
+        Args:
+            sequence_id: the id of the sequence folder
+            step: the number of frames between two thumbnails.
+            width: the width of one thumbnail in pixel.
+
+        Returns:
+            atlas: the JPEG atlas and its layout.
+        """
+        sequence_id = f'{int(sequence_id):02d}'
+        image_dir = Path(self.data_dir) / 'sequences' / sequence_id / 'image_2'
+        cache_file = self.cache_dir / f'thumbnails_{sequence_id}_step{step}_w{width}.jpg'
+        with self._thumbnail_lock:
+            return load_thumbnail_atlas(image_dir, cache_file, step, width)
+
     def _check_and_load_images(
         self,
         sequence_id: str,
         frame_id: str,
+        buf_mem: BufferMemory | None = None,
     ) -> tuple[MatLike | None, MatLike | None]:
         """Check if the image file exists, and load the image if yes.
 
-        Otherwise, use buffer memory.
+        Otherwise, use buffer memory, by default the one without a client. Both images are
+        loaded concurrently, since OpenCV releases the GIL while decoding the PNG files.
         """
-        # Load the image
-        image_2_dir = Path(self.data_dir) / 'sequences' / sequence_id / 'image_2'
-        image_3_dir = Path(self.data_dir) / 'sequences' / sequence_id / 'image_3'
-        # Check if the image file exists. If yes, load the image and update buffer.
-        # If no, use buffer memory.
-        # NOTE: try-except does not work since opencv only issue warning, but not error
-        if (Path(image_2_dir) / f'{frame_id}.png').exists():
-            image_2_frame = load_single_img(str(image_2_dir), frame_id)
-            self.buf_mem['image_2'] = image_2_frame
-        else:
-            self.problem_load_cam_2 = True
-            image_2_frame = np.asarray(self.buf_mem['image_2'])
-
-        if (Path(image_3_dir) / f'{frame_id}.png').exists():
-            image_3_frame = load_single_img(str(image_3_dir), frame_id)
-            self.buf_mem['image_3'] = image_3_frame
-        else:
-            self.problem_load_cam_3 = True
-            image_3_frame = np.asarray(self.buf_mem['image_3'])
+        buf_mem = self.buf_mem if buf_mem is None else buf_mem
+        future_image_2 = self._image_pool.submit(
+            self._check_and_load_image, 'image_2', sequence_id, frame_id, buf_mem
+        )
+        image_3_frame = self._check_and_load_image('image_3', sequence_id, frame_id, buf_mem)
+        image_2_frame = future_image_2.result()
 
         if self.verbose:
             print(f"""
@@ -264,15 +539,64 @@ class BackendEngine:
             """)
         return image_2_frame, image_3_frame
 
+    def _check_and_load_image(
+        self, camera: str, sequence_id: str, frame_id: str, buf_mem: BufferMemory
+    ) -> MatLike:
+        """Load the image of one camera, 'image_2' or 'image_3', or use buffer memory.
+
+        Every camera only writes its own buffer entry and flag, so the cameras can be loaded
+        from different threads.
+        """
+        image_dir = Path(self.data_dir) / 'sequences' / sequence_id / camera
+        # NOTE: try-except does not work since opencv only issue warning, but not error
+        if (image_dir / f'{frame_id}.png').exists():
+            image_frame = load_single_img(str(image_dir), frame_id)
+            buf_mem[camera] = image_frame
+            return image_frame
+
+        if camera == 'image_2':
+            self.problem_load_cam_2 = True
+        else:
+            self.problem_load_cam_3 = True
+        return np.asarray(buf_mem[camera])
+
+    def _check_and_load_voxel(
+        self, sequence_id: str, frame_id: str, buf_mem: BufferMemory
+    ) -> tuple[NDArray[np.uint8], bool]:
+        """Check if the voxel file exists, and load the voxel if yes, or use buffer memory.
+
+        Returns:
+            voxel: the semantic voxel grid.
+            buffered: whether the voxel grid was taken from the buffer memory.
+
+        Raises:
+            ValueError: if the frame has no voxel grid, i.e. is not a multiple of 5.
+        """
+        self._check_arguments(frame_id=frame_id)
+        try:  # Check if config file exists and load the voxel
+            voxel_data = load_ssc_voxel(
+                str(Path(self.data_dir) / 'sequences'),
+                sequence_id,
+                frame_id,
+                self.get_remap_lut(),
+            )
+        except FileNotFoundError:
+            self.problem_load_voxel = True
+            return np.asarray(buf_mem['voxel'], dtype=np.uint8), True
+        buf_mem['voxel'] = voxel_data
+        return voxel_data, False
+
     def _check_and_load_lidar(
         self,
         sequence_id: str,
         frame_id: str,
+        buf_mem: BufferMemory | None = None,
     ) -> tuple[NDArray[np.float32], NDArray[np.uint32], NDArray[np.uint8]]:
         """Check if the lidar file exists, and load the lidar if yes.
 
-        Otherwise, use buffer memory.
+        Otherwise, use buffer memory, by default the one without a client.
         """
+        buf_mem = self.buf_mem if buf_mem is None else buf_mem
         lidar_pc_path = str(
             Path(self.data_dir) / 'sequences' / sequence_id / 'velodyne' / f'{frame_id}.bin'
         )
@@ -282,18 +606,18 @@ class BackendEngine:
         # Check if the file exists. If not, use buffer memory.
         try:
             lidar_pc = read_point_cloud(lidar_pc_path)
-            self.buf_mem['lidar_pc'] = lidar_pc
+            buf_mem['lidar_pc'] = lidar_pc
         except FileNotFoundError:
             self.problem_load_lidar_pc = True
-            lidar_pc = np.asarray(self.buf_mem['lidar_pc'])
+            lidar_pc = np.asarray(buf_mem['lidar_pc'])
         try:
             pc_labels, pc_label_colors = read_labels_and_colors(lidar_label_path)
-            self.buf_mem['lidar_label'] = pc_labels
-            self.buf_mem['lidar_label_colors'] = pc_label_colors
+            buf_mem['lidar_label'] = pc_labels
+            buf_mem['lidar_label_colors'] = pc_label_colors
         except FileNotFoundError:
             self.problem_load_lidar_label = True
-            pc_labels = np.asarray(self.buf_mem['lidar_label'])
-            pc_label_colors = np.asarray(self.buf_mem['lidar_label_colors'])
+            pc_labels = np.asarray(buf_mem['lidar_label'])
+            pc_label_colors = np.asarray(buf_mem['lidar_label_colors'])
         if self.verbose:
             print(f"""
             pc frame {frame_id} loaded successfully: {not self.problem_load_lidar_pc}
@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 """Pointcloud Server Functions."""
 
+from functools import cache
+
 import numpy as np
 from numpy.typing import NDArray
 
@@ -83,6 +85,20 @@ def get_cmap() -> dict[int, list[int]]:
     }
 
 
+@cache
+def get_color_lut() -> NDArray[np.uint8]:
+    """Returns the color map as a lookup table indexed by the uint16 semantic label.
+
+    Returns:
+        np.ndarray: A (65536, 3) array of BGR colors, black for labels missing in the color map.
+        The table is built once and shared, so it must not be modified.
+    """
+    lut = np.zeros((np.iinfo(np.uint16).max + 1, 3), dtype=np.uint8)
+    for label, color in get_cmap().items():
+        lut[label] = color
+    return lut
+
+
 def read_labels_and_colors(path: str) -> tuple[NDArray[np.uint32], NDArray[np.uint8]]:
     """Reads .label file and returns the label IDs and their corresponding colors.
 
@@ -95,9 +111,8 @@ def read_labels_and_colors(path: str) -> tuple[NDArray[np.uint32], NDArray[np.ui
              - label_colors (np.ndarray): A numpy array of the corresponding BGR colors.
     """
     labels = np.fromfile(path, dtype=np.uint32)  # Read labels as uint32
-    cmap = get_cmap()  # Retrieve the color map as a dictionary
 
-    # Map labels to colors, defaulting to black `[0, 0, 0]` if label is missing
-    label_colors = np.array([cmap.get(label, [0, 0, 0]) for label in labels], dtype=np.uint8)
+    # Map the semantic part (lower 16 bits) to colors, black `[0, 0, 0]` if label is missing
+    label_colors = get_color_lut()[labels & 0xFFFF]
 
     return labels, label_colors  # Return labels and their BGR color values
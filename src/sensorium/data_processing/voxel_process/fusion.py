@@ -12,17 +12,139 @@ r"""Adapted from https://github.com/andyzeng/tsdf-fusion-python/blob/master/fusi
 }
 
 Code adapted from Symphonies. Remove GPU C++ code.
+
+The projection kernels are compiled with numba and cached on disk. Without numba, or with the
+environment variable SENSORIUM_NUMBA=0, the vectorized numpy versions are used instead.
+
+Instead of RGB-D images, integrate_scan fuses lidar scans: the scan is projected to a range
+image, and the signed distance of a voxel is the measured range of its pixel minus the range of
+the voxel centre, like the depth difference of a voxel in tsdf-fusion-python.
 """
 
+import os
+from collections.abc import Callable
+from typing import TypeVar
+
 import numpy as np
-from numba import njit, prange
 from numpy.typing import NDArray
 
+USE_NUMBA = os.environ.get('SENSORIUM_NUMBA', '1') != '0'
+if USE_NUMBA:
+    try:
+        from numba import njit, prange
+    except ImportError:
+        USE_NUMBA = False
+
+Kernel = TypeVar('Kernel')
+
+LIDAR_FOV = (-25.0, 3.0)  # vertical field of view in degree, of the Velodyne HDL-64E of KITTI
+RANGE_IMAGE_SHAPE = (64, 2048)  # one row per laser, about 0.18 degree per column
+
+
+def vox2world_numpy(
+    vol_origin: NDArray[np.float64],
+    vox_coords: NDArray[np.float32],
+    vox_size: float,
+    offsets: tuple[float, float, float] = (0.5, 0.5, 0.5),
+) -> NDArray[np.float32]:
+    """Convert voxel grid coordinates to world coordinates, like TSDFVolume.vox2world."""
+    # Rounded to float32 first and computed in float64, like the numba kernel
+    origin = vol_origin.astype(np.float32).astype(np.float64)
+    coords = vox_coords.astype(np.float32).astype(np.float64)
+    world = origin + vox_size * coords + vox_size * np.asarray(offsets, dtype=np.float64)
+    return np.astype(world, np.float32)
+
+
+def cam2pix_numpy(cam_pts: NDArray[np.float32], intr: NDArray[np.float64]) -> NDArray[np.int64]:
+    """Convert camera coordinates to pixel coordinates, like TSDFVolume.cam2pix."""
+    intr = intr.astype(np.float32)
+    fx, fy = intr[0, 0], intr[1, 1]
+    cx, cy = intr[0, 2], intr[1, 2]
+    pix = np.empty((cam_pts.shape[0], 2), dtype=np.int64)
+    pix[:, 0] = np.round(cam_pts[:, 0] * fx / cam_pts[:, 2] + cx)
+    pix[:, 1] = np.round(cam_pts[:, 1] * fy / cam_pts[:, 2] + cy)
+    return pix
+
+
+def lidar2pix_numpy(
+    velo_pts: NDArray[np.float32],
+    fov: tuple[float, float] = LIDAR_FOV,
+    shape: tuple[int, int] = RANGE_IMAGE_SHAPE,
+) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+    """Convert lidar coordinates to range image pixels and ranges, like TSDFVolume.lidar2pix."""
+    fov_down, fov_up = np.radians(fov[0]), np.radians(fov[1])
+    pts = velo_pts.astype(np.float64)
+    ranges = np.sqrt(np.sum(pts**2, axis=1))
+    pitch = np.arcsin(np.divide(pts[:, 2], ranges, out=np.zeros_like(ranges), where=ranges > 0))
+    yaw = np.arctan2(pts[:, 1], pts[:, 0])
+    pix = np.empty((velo_pts.shape[0], 2), dtype=np.int64)
+    pix[:, 0] = np.floor((fov_up - pitch) / (fov_up - fov_down) * shape[0])
+    pix[:, 1] = np.floor(0.5 * (1 - yaw / np.pi) * shape[1]).astype(np.int64) % shape[1]
+    return pix, np.astype(ranges, np.float32)
+
+
+def integrate_tsdf_numpy(
+    tsdf_vol: NDArray[np.float32],
+    dist: NDArray[np.float32],
+    w_old: NDArray[np.float32],
+    obs_weight: float,
+) -> tuple[NDArray[np.float32], NDArray[np.float32]]:
+    """Update the TSDF with the weighted running average, like TSDFVolume.integrate_tsdf."""
+    w_new = np.astype(w_old + np.float32(obs_weight), np.float32)
+    tsdf_vol_int = (w_old * tsdf_vol + np.float32(obs_weight) * dist) / w_new
+    return np.astype(tsdf_vol_int, np.float32), w_new
+
+
+def create_range_image(
+    velo_pts: NDArray[np.float32],
+    labels: NDArray[np.uint8] | None = None,
+    fov: tuple[float, float] = LIDAR_FOV,
+    shape: tuple[int, int] = RANGE_IMAGE_SHAPE,
+) -> tuple[NDArray[np.float32], NDArray[np.uint8] | None]:
+    """Project a lidar scan to a range image, keeping the nearest point of every pixel.
+
+    Args:
+        velo_pts: (N, 3) points in lidar coordinates.
+        labels: (N,) class ids of the points.
+        fov: the vertical field of view (down, up) in degree.
+        shape: the (rows, columns) of the range image.
+
+    Returns:
+        range_image: the range of every pixel in meter, 0 where there is no point.
+        label_image: the class id of every pixel, None without labels.
+    """
+    # A contiguous copy, e.g. of the points without intensity, so the kernel is compiled once
+    pix, ranges = TSDFVolume.lidar2pix(np.ascontiguousarray(velo_pts, dtype=np.float32), fov, shape)
+    valid = (pix[:, 0] >= 0) & (pix[:, 0] < shape[0]) & (ranges > 0)
+    # Sorted by descending range, so the nearest point of a pixel is written last
+    order = np.flatnonzero(valid)[np.argsort(-ranges[valid], kind='stable')]
+    rows, cols = pix[order, 0], pix[order, 1]
+    range_image = np.zeros(shape, dtype=np.float32)
+    range_image[rows, cols] = ranges[order]
+    if labels is None:
+        return range_image, None
+    label_image = np.zeros(shape, dtype=np.uint8)
+    label_image[rows, cols] = labels[order]
+    return range_image, label_image
+
+
+def parallel_kernel(fallback: Kernel) -> Callable[[Kernel], Kernel]:
+    """Compile a kernel with numba in parallel and cache it on disk, or use the fallback."""
+
+    def compile_kernel(kernel: Kernel) -> Kernel:
+        if not USE_NUMBA:
+            return fallback
+        return njit(parallel=True, cache=True)(kernel)  # type: ignore[no-any-return]
+
+    return compile_kernel
+
 
 class TSDFVolume:
-    """Volumetric TSDF Fusion of RGB-D Images."""
+    """Volumetric TSDF Fusion of RGB-D Images and lidar scans."""
 
-    def __init__(self, vol_bnds: NDArray[np.float32], voxel_size: float) -> None:
+    def __init__(
+        self, vol_bnds: NDArray[np.float32] | NDArray[np.float64], voxel_size: float
+    ) -> None:
         """Constructor.
 
         Args:
@@ -30,7 +152,7 @@ class TSDFVolume:
             xyz bounds (min/max) in meters.
           voxel_size (float): The volume discretization in meters.
         """
-        vol_bnds = np.asarray(vol_bnds)
+        vol_bnds = np.asarray(vol_bnds, dtype=np.float64)
         assert vol_bnds.shape == (3, 2), '[!] `vol_bnds` should be of shape (3, 2).'
 
         # Define voxel volume parameters
@@ -64,8 +186,94 @@ class TSDFVolume:
             .T
         )
 
+    def integrate_scan(
+        self,
+        velo_pts: NDArray[np.float32],
+        velo_pose: NDArray[np.float64],
+        labels: NDArray[np.uint8] | None = None,
+        obs_weight: float = 1.0,
+    ) -> None:
+        """Integrate a lidar scan.
+
+        Args:
+          velo_pts (ndarray): An (N, 3) lidar scan in lidar coordinates.
+          velo_pose (ndarray): The (4, 4) pose of the lidar in the coordinates of the volume.
+          labels (ndarray): The (N,) class ids of the points, the colour volume keeps the last
+            class id observed near the surface of a voxel.
+          obs_weight (float): The weight to assign for the current observation.
+        """
+        range_image, label_image = create_range_image(velo_pts, labels)
+
+        # Convert voxel grid coordinates to lidar coordinates
+        world_pts = self.vox2world(
+            self._vol_origin.astype(np.float64), self.vox_coords, self._voxel_size
+        )
+        velo_vox = rigid_transform(world_pts, np.linalg.inv(velo_pose))
+
+        # Project the voxel centres to the range image and read the measured range
+        pix, vox_range = self.lidar2pix(velo_vox, LIDAR_FOV, RANGE_IMAGE_SHAPE)
+        pix_row, pix_col = pix[:, 0], pix[:, 1]
+        valid_pix = (pix_row >= 0) & (pix_row < RANGE_IMAGE_SHAPE[0])
+        depth_val = np.zeros(len(pix), dtype=np.float32)
+        depth_val[valid_pix] = range_image[pix_row[valid_pix], pix_col[valid_pix]]
+
+        # Integrate TSDF
+        depth_diff = depth_val - vox_range
+        valid_pts = (depth_val > 0) & (depth_diff >= -self._trunc_margin)
+        dist = np.minimum(1, depth_diff / self._trunc_margin)
+        valid_vox_x, valid_vox_y, valid_vox_z = self.vox_coords[valid_pts].T
+        w_old = self._weight_vol_cpu[valid_vox_x, valid_vox_y, valid_vox_z]
+        tsdf_vals = self._tsdf_vol_cpu[valid_vox_x, valid_vox_y, valid_vox_z]
+        valid_dist = dist[valid_pts]
+        tsdf_vol_new, w_new = self.integrate_tsdf(tsdf_vals, valid_dist, w_old, obs_weight)
+        self._weight_vol_cpu[valid_vox_x, valid_vox_y, valid_vox_z] = w_new
+        self._tsdf_vol_cpu[valid_vox_x, valid_vox_y, valid_vox_z] = tsdf_vol_new
+
+        # Integrate the class ids of the voxels inside the truncation band
+        if label_image is not None:
+            near = np.abs(valid_dist) < 1
+            self._color_vol_cpu[valid_vox_x[near], valid_vox_y[near], valid_vox_z[near]] = (
+                label_image[pix_row[valid_pts][near], pix_col[valid_pts][near]]
+            )
+
+    def shift(self, offset: NDArray[np.int64]) -> None:
+        """Move the volume by whole voxels, e.g. to keep a rolling volume around the sensor.
+
+        The voxels that leave the volume are dropped, the voxels that enter it are unobserved.
+
+        Args:
+          offset (ndarray): The (3,) number of voxels to move along x, y and z.
+        """
+        for axis, steps in enumerate(int(step) for step in offset):
+            if steps == 0:
+                continue
+            for vol in (self._tsdf_vol_cpu, self._weight_vol_cpu, self._color_vol_cpu):
+                vol[...] = np.roll(vol, -steps, axis=axis)
+                entered = np.moveaxis(vol, axis, 0)  # a view with the shifted axis first
+                if steps > 0:
+                    entered[-steps:] = 0
+                else:
+                    entered[:-steps] = 0
+        self._vol_bnds = self._vol_bnds + (np.asarray(offset) * self._voxel_size)[:, None]
+        self._vol_origin = self._vol_bnds[:, 0].copy(order='C').astype(np.float32)
+
+    @property
+    def vol_origin(self) -> NDArray[np.float32]:
+        """The world coordinates of the corner of the voxel at index (0, 0, 0)."""
+        return self._vol_origin
+
+    def get_volume(self) -> tuple[NDArray[np.float32], NDArray[np.float32]]:
+        """Get the TSDF volume and the colour volume."""
+        return self._tsdf_vol_cpu, self._color_vol_cpu
+
+    def get_surface(self) -> NDArray[np.bool_]:
+        """Get the mask of the observed voxels closer to the surface than half a voxel."""
+        return (self._weight_vol_cpu > 0) & (
+            np.abs(self._tsdf_vol_cpu) * self._trunc_margin < self._voxel_size / 2
+        )
+
     @staticmethod
-    @njit(parallel=True)  # type: ignore[misc]
+    @parallel_kernel(vox2world_numpy)
     def vox2world(
         vol_origin: NDArray[np.float64],
         vox_coords: NDArray[np.float32],
@@ -82,7 +290,7 @@ class TSDFVolume:
         return cam_pts
 
     @staticmethod
-    @njit(parallel=True)  # type: ignore[misc]
+    @parallel_kernel(cam2pix_numpy)
     def cam2pix(
         cam_pts: NDArray[np.float32],
         intr: NDArray[np.float64],
@@ -97,6 +305,43 @@ class TSDFVolume:
             pix[i, 1] = int(np.round((cam_pts[i, 1] * fy / cam_pts[i, 2]) + cy))
         return pix
 
+    @staticmethod
+    @parallel_kernel(lidar2pix_numpy)
+    def lidar2pix(
+        velo_pts: NDArray[np.float32],
+        fov: tuple[float, float] = LIDAR_FOV,
+        shape: tuple[int, int] = RANGE_IMAGE_SHAPE,
+    ) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+        """Convert lidar coordinates to range image pixel coordinates and ranges."""
+        fov_down, fov_up = np.radians(fov[0]), np.radians(fov[1])
+        pix = np.empty((velo_pts.shape[0], 2), dtype=np.int64)
+        ranges = np.empty(velo_pts.shape[0], dtype=np.float32)
+        for i in prange(velo_pts.shape[0]):
+            x, y, z = float(velo_pts[i, 0]), float(velo_pts[i, 1]), float(velo_pts[i, 2])
+            point_range = np.sqrt(x * x + y * y + z * z)
+            pitch = np.arcsin(z / point_range) if point_range > 0 else 0.0
+            yaw = np.arctan2(y, x)
+            pix[i, 0] = int(np.floor((fov_up - pitch) / (fov_up - fov_down) * shape[0]))
+            pix[i, 1] = int(np.floor(0.5 * (1 - yaw / np.pi) * shape[1])) % shape[1]
+            ranges[i] = point_range
+        return pix, ranges
+
+    @staticmethod
+    @parallel_kernel(integrate_tsdf_numpy)
+    def integrate_tsdf(
+        tsdf_vol: NDArray[np.float32],
+        dist: NDArray[np.float32],
+        w_old: NDArray[np.float32],
+        obs_weight: float,
+    ) -> tuple[NDArray[np.float32], NDArray[np.float32]]:
+        """Integrate the TSDF volume."""
+        tsdf_vol_int = np.empty_like(tsdf_vol, dtype=np.float32)
+        w_new = np.empty_like(w_old, dtype=np.float32)
+        for i in prange(len(tsdf_vol)):
+            w_new[i] = w_old[i] + obs_weight
+            tsdf_vol_int[i] = (w_old[i] * tsdf_vol[i] + obs_weight * dist[i]) / w_new[i]
+        return tsdf_vol_int, w_new
+
 
 def rigid_transform(
     xyz: NDArray[np.float32],
@@ -0,0 +1,160 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Rolling TSDF map of a sequence, fused from its lidar scans posed with the trajectory.
+
+The map is a TSDFVolume of the size of a SemanticKITTI scene, axis-aligned in the lidar
+coordinates of the first frame and centred on the car. When the car moves further than a quarter
+of the scene from the centre, the volume is shifted by whole voxels, so the part behind the car
+drops out and the map keeps its size on sequences of several kilometres.
+
+Every stride-th scan is fused. The scans are fused incrementally: a later frame only fuses the
+scans since the last fused frame, while a seek backwards or far ahead rebuilds the map from the
+last max_scans scans before the frame.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from sensorium.data_processing.voxel_process.voxel_geometry import VOX_ORIGIN, VOXEL_SIZE
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+    from sensorium.data_processing.voxel_process.fusion import TSDFVolume
+
+MAP_STRIDE = 5  # frames between two fused scans, the frames of the SemanticKITTI voxels
+MAP_MAX_SCANS = 10  # scans fused to rebuild the map, e.g. after a seek
+SCENE_SIZE = (51.2, 51.2, 6.4)  # in meter, for SemanticKITTI
+# Class id of the surfaces without a semantic label, e.g. of the test sequences: other-ground
+UNLABELED_SURFACE_CLASS = 12
+
+
+class SceneMap:
+    """Rolling TSDF map of the lidar scans of one sequence."""
+
+    def __init__(
+        self,
+        poses: list[NDArray[np.float64]],
+        *,
+        stride: int = MAP_STRIDE,
+        max_scans: int = MAP_MAX_SCANS,
+        voxel_size: float = VOXEL_SIZE,
+        scene_size: tuple[float, float, float] = SCENE_SIZE,
+    ) -> None:
+        """Initialize an empty map.
+
+        Args:
+            poses: the (4, 4) lidar pose of every frame, see parse_poses.
+            stride: the number of frames between two fused scans.
+            max_scans: the number of scans fused to rebuild the map.
+            voxel_size: the size of the voxel in meter.
+            scene_size: the size of the map in meter.
+        """
+        self.poses = poses
+        self.stride = stride
+        self.max_scans = max_scans
+        self.voxel_size = voxel_size
+        self.scene_size = scene_size
+        self.volume: TSDFVolume | None = None
+        self.frame_id: int | None = None  # the last fused frame
+
+    def reset(self) -> None:
+        """Drop all fused scans."""
+        self.volume = None
+        self.frame_id = None
+
+    def get_frames_to_fuse(self, frame_id: int) -> range:
+        """Get the frames whose scans are missing in the map of a frame.
+
+        The map is reset if it cannot be updated incrementally, i.e. the frame is before the
+        last fused frame or more than max_scans scans after it.
+        """
+        last = min(frame_id, len(self.poses) - 1)
+        last -= last % self.stride
+        first = max(0, last - (self.max_scans - 1) * self.stride)
+        if self.frame_id is None or not first - self.stride <= self.frame_id <= last:
+            self.reset()
+            return range(first, last + 1, self.stride)
+        return range(self.frame_id + self.stride, last + 1, self.stride)
+
+    def integrate(
+        self,
+        frame_id: int,
+        velo_pts: NDArray[np.float32] | None,
+        labels: NDArray[np.uint8] | None = None,
+    ) -> None:
+        """Fuse the scan of a frame, a missing scan is skipped.
+
+        Args:
+            frame_id: the frame of the scan.
+            velo_pts: (N, 3) points in lidar coordinates, None if the scan is missing.
+            labels: (N,) class ids of the points, 0 is unlabeled.
+        """
+        if velo_pts is not None:
+            pose = self.poses[frame_id]
+            volume = self.follow(pose[:3, 3])
+            volume.integrate_scan(velo_pts, pose, labels)
+        self.frame_id = frame_id
+
+    def get_bounds(self, position: NDArray[np.float64]) -> NDArray[np.float64]:
+        """Get the (3, 2) bounds of a map around the lidar position.
+
+        The map is centred horizontally and has the height of a SemanticKITTI scene.
+        """
+        half_size = np.array(self.scene_size) / 2
+        centre = position + np.array((0, 0, VOX_ORIGIN[2] + half_size[2]))
+        return np.stack([centre - half_size, centre + half_size], axis=1)
+
+    def follow(self, position: NDArray[np.float64]) -> TSDFVolume:
+        """Get the volume, created around the lidar position or shifted to it if needed."""
+        vol_bnds = self.get_bounds(position)
+        if self.volume is None:
+            # Imported here, so numba is only loaded when the first scan is fused
+            from sensorium.data_processing.voxel_process.fusion import (  # noqa: PLC0415
+                TSDFVolume,
+            )
+
+            self.volume = TSDFVolume(vol_bnds, self.voxel_size)
+            return self.volume
+        offset = vol_bnds[:, 0] - self.volume.vol_origin
+        if np.linalg.norm(offset[:2]) > self.scene_size[0] / 4:
+            self.volume.shift(np.round(offset / self.voxel_size).astype(np.int64))
+        return self.volume
+
+    def get_voxel(self) -> NDArray[np.uint8]:
+        """Get the surface of the map as semantic voxel grid, 0 is empty."""
+        if self.volume is None:
+            dims = tuple(round(size / self.voxel_size) for size in self.scene_size)
+            return np.zeros(dims, dtype=np.uint8)
+        surface = self.volume.get_surface()
+        labels = self.volume.get_volume()[1].astype(np.uint8)
+        labels[labels == 0] = UNLABELED_SURFACE_CLASS
+        return np.where(surface, labels, np.uint8(0))
+
+    def get_map_2_velo(self, frame_id: int) -> NDArray[np.float64]:
+        """Get the transformation from the map to the lidar of a frame.
+
+        The map coordinates are placed like a SemanticKITTI voxel grid, i.e. with the corner of
+        the map at VOX_ORIGIN, so the voxel renderers and get_camera_frustum can be used.
+        """
+        pose = self.poses[min(frame_id, len(self.poses) - 1)]
+        if self.volume is None:
+            map_origin = self.get_bounds(pose[:3, 3])[:, 0]
+        else:
+            map_origin = self.volume.vol_origin.astype(np.float64)
+        map_2_world = np.identity(4)
+        map_2_world[:3, 3] = map_origin - VOX_ORIGIN
+        return np.linalg.inv(pose) @ map_2_world
+
+
+def warm_up_integrate_scan() -> None:
+    """Compile the kernels of TSDFVolume.integrate_scan on a map of one voxel.
+
+    The arrays are created like the ones of a scan, its labels and a pose, see warm_up_vox2pix.
+    """
+    scene_map = SceneMap([np.identity(4)], scene_size=(VOXEL_SIZE, VOXEL_SIZE, VOXEL_SIZE))
+    scene_map.integrate(0, np.ones((1, 3), dtype=np.float32), np.ones(1, dtype=np.uint8))
@@ -14,8 +14,6 @@ from numpy.typing import NDArray
 
 import sensorium.data_processing.utils.io_data as semkitti_io
 
-from . import fusion
-
 
 def load_ssc_voxel(
     sequence_path: str,
@@ -104,6 +102,9 @@ def vox2pix(
         pix_z: (N,)
             Voxels' distance to the sensor in meter
     """
+    # Imported here, so numba is only loaded when the first FOV mask is computed
+    from . import fusion  # noqa: PLC0415
+
     # Set the meta data
     vox_size = 0.2
     # Compute the x, y, z bounding of the scene in meter
@@ -139,3 +140,14 @@ def vox2pix(
     ).astype(np.bool_)
 
     return projected_pix, fov_mask, pix_z
+
+
+def warm_up_vox2pix() -> None:
+    """Compile the kernels of vox2pix on a tiny scene in front of the camera.
+
+    numba compiles a kernel for the argument types and memory layouts of its first call, so the
+    arrays are created like the ones of a calibration file. After the first run the kernels are
+    loaded from the numba disk cache instead of being compiled.
+    """
+    cam_k = np.eye(3, 4)[:3, :3]  # a slice of the projection matrix, like read_calib
+    vox2pix(np.identity(4), cam_k, np.array((0.0, 0.0, 1.0)), (1, 1), (0.4, 0.4, 0.4))
@@ -0,0 +1,132 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Extraction of the render geometry of a semantic voxel grid.
+
+Only occupied voxels (class 1 to 254) are rendered, split into voxels inside and outside the
+camera FOV. This module is free of any visualization dependency so that the server can run it.
+"""
+
+from functools import cache
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+VOXEL_SIZE = 0.2  # in meter, for SemanticKITTI
+VOX_ORIGIN = np.array([0, -25.6, -2])  # lidar coordinates of the grid corner, for SemanticKITTI
+
+
+class VoxelGeometry(NamedTuple):
+    """Occupied voxel centres and class ids, split by the camera FOV."""
+
+    fov_centres: NDArray[np.float32]
+    fov_labels: NDArray[np.uint8]
+    outfov_centres: NDArray[np.float32]
+    outfov_labels: NDArray[np.uint8]
+
+
+@cache
+def get_grid_coords(dims: tuple[int, int, int], resolution: float) -> NDArray[np.float32]:
+    """Get the centre coordinates of all voxels of a grid, computed once per grid layout.
+
+    Args:
+        dims: the dimensions of the grid (x, y, z), i.e. (256, 256, 32)
+        resolution: the size of the voxel
+
+    Returns:
+        coords_grid: (X * Y * Z, 3) read-only centre coordinates, in the C order of the grid
+    """
+    indices = np.indices(dims, dtype=np.float32).reshape(3, -1).T
+    coords_grid = indices * np.float32(resolution) + np.float32(resolution / 2)
+    coords_grid.flags.writeable = False
+    return coords_grid
+
+
+def grid_indices_to_centres(
+    indices: NDArray[np.uint8], resolution: float = VOXEL_SIZE
+) -> NDArray[np.float32]:
+    """Convert (N, 3) integer voxel indices to (N, 3) voxel centre coordinates."""
+    return indices.astype(np.float32) * np.float32(resolution) + np.float32(resolution / 2)
+
+
+def get_occupied_indices(
+    voxel: NDArray[np.uint8], fov_mask: NDArray[np.bool_]
+) -> tuple[NDArray[np.intp], NDArray[np.intp]]:
+    """Get the flat indices of occupied voxels inside and outside the camera FOV.
+
+    Args:
+        voxel: (X, Y, Z) semantic voxel grid, 0 is empty and 255 is unknown.
+        fov_mask: (X * Y * Z,) mask of the voxels inside the camera FOV.
+
+    Returns:
+        fov_indices: flat indices of the occupied voxels inside the FOV.
+        outfov_indices: flat indices of the occupied voxels outside the FOV.
+    """
+    flat = voxel.reshape(-1)
+    occupied = (flat > 0) & (flat < 255)
+    fov_mask = fov_mask.reshape(-1)
+    return np.flatnonzero(occupied & fov_mask), np.flatnonzero(occupied & ~fov_mask)
+
+
+def extract_voxel_geometry(
+    voxel: NDArray[np.uint8],
+    fov_mask: NDArray[np.bool_],
+    voxel_size: float = VOXEL_SIZE,
+) -> VoxelGeometry:
+    """Extract the centres and class ids of the occupied voxels, split by the camera FOV.
+
+    Args:
+        voxel: (X, Y, Z) semantic voxel grid.
+        fov_mask: (X * Y * Z,) mask of the voxels inside the camera FOV.
+        voxel_size: the size of the voxel in meter.
+
+    Returns:
+        geometry: the voxel centres relative to the grid origin and their class ids.
+    """
+    dims = (int(voxel.shape[0]), int(voxel.shape[1]), int(voxel.shape[2]))
+    coords_grid = get_grid_coords(dims, voxel_size)
+    flat = voxel.reshape(-1)
+    fov_indices, outfov_indices = get_occupied_indices(voxel, fov_mask)
+    return VoxelGeometry(
+        fov_centres=coords_grid[fov_indices],
+        fov_labels=flat[fov_indices],
+        outfov_centres=coords_grid[outfov_indices],
+        outfov_labels=flat[outfov_indices],
+    )
+
+
+def get_camera_frustum(
+    cam_pose: NDArray[np.float32] | NDArray[np.float64], vox_origin: NDArray[np.float32]
+) -> tuple[NDArray[np.float64], NDArray[np.float64], NDArray[np.float64]]:
+    """Compute the vertices of the mesh representing the camera, relative to the voxel origin.
+
+    Args:
+        cam_pose: the camera's extrinsic matrix relative to lidar
+        vox_origin: the origin coordinate of the voxel
+
+    Returns:
+        x, y, z: the coordinates of the 5 vertices of the camera frustum
+    """
+    img_size = (1220, 370)  # for SemanticKITTI dataset.
+    f = 707.0912  # for SemanticKITTI dataset.
+    d = 7  # 7m - determine the size of the mesh representing the camera
+
+    x = d * img_size[0] / (2 * f)
+    y = d * img_size[1] / (2 * f)
+    tri_points = np.array(
+        [
+            [0, 0, 0],
+            [x, y, d],
+            [-x, y, d],
+            [-x, -y, d],
+            [x, -y, d],
+        ]
+    )
+    tri_points = np.hstack([tri_points, np.ones((5, 1))])
+    tri_points = (np.linalg.inv(cam_pose) @ tri_points.T).T
+    return (
+        tri_points[:, 0] - vox_origin[0],
+        tri_points[:, 1] - vox_origin[1],
+        tri_points[:, 2] - vox_origin[2],
+    )
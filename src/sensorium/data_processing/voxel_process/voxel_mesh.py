@@ -0,0 +1,290 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Surface extraction of a semantic voxel grid.
+
+Only the faces between an occupied voxel (class 1 to 254) and an empty or unknown voxel are
+visible. ``extract_voxel_surface`` merges neighbouring visible faces of the same class and FOV
+side into rectangles with greedy meshing, and ``surface_to_mesh`` expands the rectangles into a
+quad mesh that any renderer can upload. Like voxel_geometry, this module is free of any
+visualization dependency so that the server can run it.
+
+numba is only imported when the first surface is extracted, since importing it takes longer
+than importing the rest of the server. Without numba, or with the environment variable
+SENSORIUM_NUMBA=0, the vectorized numpy version of the greedy meshing is used instead.
+"""
+
+from collections.abc import Callable
+from functools import cache
+from typing import NamedTuple, cast
+
+import numpy as np
+from numpy.typing import NDArray
+
+from sensorium.data_processing.voxel_process.voxel_geometry import VOXEL_SIZE, VoxelGeometry
+
+# Outward normal and corners of the 6 faces of the unit cube, counter-clockwise seen from outside
+FACE_NORMALS = np.array(
+    [[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1]], dtype=np.intp
+)
+FACE_CORNERS = np.array(
+    [
+        [[1, 0, 0], [1, 1, 0], [1, 1, 1], [1, 0, 1]],
+        [[0, 0, 0], [0, 0, 1], [0, 1, 1], [0, 1, 0]],
+        [[0, 1, 0], [0, 1, 1], [1, 1, 1], [1, 1, 0]],
+        [[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1]],
+        [[0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]],
+        [[0, 0, 0], [0, 1, 0], [1, 1, 0], [1, 0, 0]],
+    ],
+    dtype=np.float32,
+)
+
+
+class VoxelSurface(NamedTuple):
+    """Visible voxel faces merged into axis aligned rectangles, in grid units.
+
+    A rectangle covers the faces of the voxels from ``cells`` to ``cells + extents - 1`` along
+    the two axes orthogonal to ``FACE_NORMALS[directions]``; its extent along the normal is 1.
+    """
+
+    directions: NDArray[np.uint8]
+    cells: NDArray[np.uint16]
+    extents: NDArray[np.uint16]
+    labels: NDArray[np.uint8]
+    in_fov: NDArray[np.bool_]
+
+
+class VoxelMesh(NamedTuple):
+    """Quad mesh of the visible voxel faces, with 4 vertices and one class id per quad."""
+
+    positions: NDArray[np.float32]
+    normals: NDArray[np.float32]
+    indices: NDArray[np.uint32]
+    labels: NDArray[np.uint8]
+    in_fov: NDArray[np.bool_]
+
+
+GreedyRectangles = Callable[[NDArray[np.int16], int], NDArray[np.int32]]
+
+
+def greedy_rectangles(slices: NDArray[np.int16], max_rectangles: int) -> NDArray[np.int32]:
+    """Merge equal non-zero cells of every 2D slice into rectangles.
+
+    Every rectangle is grown along the second axis first, then along the first axis as long as
+    the whole row matches.
+
+    Args:
+        slices: (S, U, V) keys of the visible faces, 0 where there is no face.
+        max_rectangles: upper bound of the number of rectangles, i.e. the number of faces.
+
+    Returns:
+        rectangles: (N, 6) slice, u, v, extent along u, extent along v and key.
+    """
+    return compile_greedy_rectangles()(slices, max_rectangles)
+
+
+@cache
+def compile_greedy_rectangles() -> GreedyRectangles:
+    """Compile the greedy meshing on first use, the machine code is cached on disk by numba."""
+    # Imported here, so numba is only loaded when the first surface is extracted
+    from sensorium.data_processing.voxel_process.fusion import USE_NUMBA  # noqa: PLC0415
+
+    if not USE_NUMBA:
+        return greedy_rectangles_numpy
+    from numba import njit  # noqa: PLC0415
+
+    return cast('GreedyRectangles', njit(cache=True)(_greedy_rectangles))
+
+
+def greedy_rectangles_numpy(slices: NDArray[np.int16], max_rectangles: int) -> NDArray[np.int32]:
+    """Merge equal non-zero cells of every 2D slice into rectangles, like greedy_rectangles.
+
+    The cells are merged into runs along the second axis first, then runs of the same start,
+    length and key in consecutive rows are merged. The rectangles cover the same faces as the
+    ones of greedy_rectangles, but they may be split differently.
+    """
+    del max_rectangles
+    _, size_u, size_v = slices.shape
+    # A zero after every row, so a run never continues in the next row
+    keys = np.pad(slices.reshape(-1, size_v), ((0, 0), (0, 1))).ravel()
+    run_starts = np.flatnonzero(np.diff(keys, prepend=np.int16(0)) != 0)
+    run_lengths = np.diff(run_starts, append=len(keys))
+    non_empty = keys[run_starts] != 0
+    run_starts, run_lengths = run_starts[non_empty], run_lengths[non_empty]
+    run_keys = keys[run_starts]
+    rows, run_v = np.divmod(run_starts, size_v + 1)
+    run_s, run_u = np.divmod(rows, size_u)
+
+    # Equal runs next to each other along u are sorted after each other
+    order = np.lexsort((run_u, run_keys, run_lengths, run_v, run_s))
+    runs = np.stack([run_s, run_u, run_v, run_lengths, run_keys], axis=1)[order]
+    continues = np.zeros(len(runs), dtype=np.bool_)
+    continues[1:] = np.all(runs[1:, [0, 2, 3, 4]] == runs[:-1, [0, 2, 3, 4]], axis=1) & (
+        runs[1:, 1] == runs[:-1, 1] + 1
+    )
+    first_runs = np.flatnonzero(~continues)
+    extents_u = np.diff(first_runs, append=len(runs))
+
+    rectangles = np.empty((len(first_runs), 6), dtype=np.int32)
+    rectangles[:, [0, 1, 2, 4, 5]] = runs[first_runs]
+    rectangles[:, 3] = extents_u
+    return rectangles
+
+
+def _greedy_rectangles(slices: NDArray[np.int16], max_rectangles: int) -> NDArray[np.int32]:
+    """The greedy meshing of greedy_rectangles, compiled with numba."""
+    num_slices, size_u, size_v = slices.shape
+    rectangles = np.empty((max_rectangles, 6), dtype=np.int32)
+    done = np.zeros((size_u, size_v), dtype=np.bool_)
+    count = 0
+    for s in range(num_slices):
+        done[:] = False
+        for u in range(size_u):
+            for v in range(size_v):
+                key = slices[s, u, v]
+                if key == 0 or done[u, v]:
+                    continue
+                extent_v = 1
+                while (
+                    v + extent_v < size_v
+                    and slices[s, u, v + extent_v] == key
+                    and not done[u, v + extent_v]
+                ):
+                    extent_v += 1
+                extent_u = 1
+                while u + extent_u < size_u:
+                    row_matches = True
+                    for k in range(v, v + extent_v):
+                        if slices[s, u + extent_u, k] != key or done[u + extent_u, k]:
+                            row_matches = False
+                            break
+                    if not row_matches:
+                        break
+                    extent_u += 1
+                done[u : u + extent_u, v : v + extent_v] = True
+                rectangles[count, 0] = s
+                rectangles[count, 1] = u
+                rectangles[count, 2] = v
+                rectangles[count, 3] = extent_u
+                rectangles[count, 4] = extent_v
+                rectangles[count, 5] = key
+                count += 1
+    return rectangles[:count]
+
+
+def extract_voxel_surface(voxel: NDArray[np.uint8], fov_mask: NDArray[np.bool_]) -> VoxelSurface:
+    """Extract the visible faces of the occupied voxels, merged by class and FOV side.
+
+    Args:
+        voxel: (X, Y, Z) semantic voxel grid, 0 is empty and 255 is unknown.
+        fov_mask: (X * Y * Z,) mask of the voxels inside the camera FOV.
+
+    Returns:
+        surface: the merged rectangles of the visible faces.
+    """
+    occupied = (voxel > 0) & (voxel < 255)
+    # Merge key: the class id, offset by 256 outside the FOV, 0 for empty voxels
+    keys = np.where(occupied, voxel.astype(np.int16), np.int16(0))
+    keys[occupied & ~fov_mask.reshape(voxel.shape)] += 256
+    padded = np.pad(occupied, 1)
+
+    directions, cells, extents, face_keys = [], [], [], []
+    for direction, normal in enumerate(FACE_NORMALS):
+        axis = int(np.flatnonzero(normal)[0])
+        neighbour = padded[
+            1 + normal[0] : padded.shape[0] - 1 + normal[0],
+            1 + normal[1] : padded.shape[1] - 1 + normal[1],
+            1 + normal[2] : padded.shape[2] - 1 + normal[2],
+        ]
+        visible_keys = np.where(neighbour, np.int16(0), keys)
+        # The slice axis goes first, the two other axes keep their order
+        slices = np.ascontiguousarray(np.moveaxis(visible_keys, axis, 0))
+        rectangles = greedy_rectangles(slices, int(np.count_nonzero(slices)))
+
+        other_axes = [a for a in range(3) if a != axis]
+        rectangle_cells = np.empty((len(rectangles), 3), dtype=np.uint16)
+        rectangle_cells[:, axis] = rectangles[:, 0]
+        rectangle_cells[:, other_axes] = rectangles[:, 1:3]
+        directions.append(np.full(len(rectangles), direction, dtype=np.uint8))
+        cells.append(rectangle_cells)
+        extents.append(rectangles[:, 3:5].astype(np.uint16))
+        face_keys.append(rectangles[:, 5])
+
+    merged_keys = np.concatenate(face_keys)
+    return VoxelSurface(
+        directions=np.concatenate(directions),
+        cells=np.concatenate(cells),
+        extents=np.concatenate(extents),
+        labels=(merged_keys % 256).astype(np.uint8),
+        in_fov=merged_keys < 256,
+    )
+
+
+def surface_to_mesh(surface: VoxelSurface, voxel_size: float = VOXEL_SIZE) -> VoxelMesh:
+    """Expand the rectangles of a voxel surface into a quad mesh in meter.
+
+    Args:
+        surface: the merged rectangles of the visible faces.
+        voxel_size: the size of the voxel in meter.
+
+    Returns:
+        mesh: 4 vertices per rectangle, relative to the grid origin.
+    """
+    directions = surface.directions.astype(np.intp)
+    corners = FACE_CORNERS[directions]  # (F, 4, 3) unit cube face corners
+    # Stretch the unit face over the extents along its two in-plane axes
+    scale = np.ones((len(directions), 3), dtype=np.float32)
+    for direction, normal in enumerate(FACE_NORMALS):
+        other_axes = np.flatnonzero(normal == 0)
+        selected = directions == direction
+        scale[np.ix_(selected, other_axes)] = surface.extents[selected]
+    positions = (surface.cells[:, None, :] + corners * scale[:, None, :]) * np.float32(voxel_size)
+    normals = np.repeat(FACE_NORMALS[directions].astype(np.float32), 4, axis=0)
+    return VoxelMesh(
+        positions=positions.reshape(-1, 3).astype(np.float32),
+        normals=normals,
+        indices=np.arange(len(directions) * 4, dtype=np.uint32).reshape(-1, 4),
+        labels=surface.labels,
+        in_fov=surface.in_fov,
+    )
+
+
+def build_voxel_mesh(geometry: VoxelGeometry, voxel_size: float = VOXEL_SIZE) -> VoxelMesh:
+    """Build a quad mesh of the voxel faces that are not hidden by a neighbouring voxel.
+
+    Used when only the voxel centres are available; the faces are culled but not merged.
+
+    Args:
+        geometry: the occupied voxel centres and class ids, split by the camera FOV.
+        voxel_size: the size of the voxel in meter.
+
+    Returns:
+        mesh: 4 vertices and one class id per visible voxel face.
+    """
+    centres = np.concatenate([geometry.fov_centres, geometry.outfov_centres])
+    labels = np.concatenate([geometry.fov_labels, geometry.outfov_labels])
+    in_fov = np.arange(len(centres)) < len(geometry.fov_centres)
+    grid_indices = np.rint(centres / voxel_size - 0.5).astype(np.intp)
+
+    # Occupancy grid with a border of one empty voxel, so every neighbour index is valid
+    shape = grid_indices.max(axis=0) + 3 if len(grid_indices) else np.ones(3, dtype=np.intp)
+    occupied = np.zeros(tuple(shape), dtype=np.bool_)
+    occupied[tuple((grid_indices + 1).T)] = True
+
+    positions, normals, face_labels, face_in_fov = [], [], [], []
+    for normal, corners in zip(FACE_NORMALS, FACE_CORNERS, strict=True):
+        visible = ~occupied[tuple((grid_indices + 1 + normal).T)]
+        face_corners = (grid_indices[visible, None, :] + corners) * np.float32(voxel_size)
+        positions.append(face_corners.reshape(-1, 3))
+        normals.append(np.broadcast_to(normal.astype(np.float32), (face_corners.shape[0] * 4, 3)))
+        face_labels.append(labels[visible])
+        face_in_fov.append(in_fov[visible])
+
+    num_faces = sum(len(face_positions) for face_positions in positions) // 4
+    return VoxelMesh(
+        positions=np.concatenate(positions).astype(np.float32),
+        normals=np.concatenate(normals),
+        indices=np.arange(num_faces * 4, dtype=np.uint32).reshape(-1, 4),
+        labels=np.concatenate(face_labels),
+        in_fov=np.concatenate(face_in_fov),
+    )
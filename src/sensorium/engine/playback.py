@@ -0,0 +1,109 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Wall-clock schedule of the frame playback.
+
+Frame ``k`` of a playback is due at ``start + k * frame_time``. When loading a frame takes longer
+than its slot, the scheduler either drops the frames whose time has passed, to stay in real time,
+or shows every frame and shifts the following frames, which slows the playback down.
+"""
+
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import NamedTuple
+
+PLAYBACK_POLICIES = ('drop', 'slow')
+FPS_WINDOW = 20  # number of shown frames the achieved FPS is averaged over
+
+
+class PlaybackStats(NamedTuple):
+    """Statistics of the current playback."""
+
+    shown: int
+    dropped: int
+    fps: float
+
+
+class PlaybackScheduler:
+    """Decides when the next frame is shown and how many frames playback advances."""
+
+    def __init__(
+        self,
+        frame_time: float,
+        policy: str = 'drop',
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """Initialize the scheduler, the schedule starts with start().
+
+        Args:
+            frame_time: the target time between two frames in seconds.
+            policy: 'drop' to skip late frames and keep real time, 'slow' to show every frame.
+            clock: monotonic clock in seconds.
+        """
+        self.frame_time = frame_time
+        self.policy = policy
+        self._clock = clock
+        self.start()
+
+    @property
+    def policy(self) -> str:
+        """The policy for late frames, one of PLAYBACK_POLICIES."""
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy: str) -> None:
+        if policy not in PLAYBACK_POLICIES:
+            msg = f'Unknown playback policy: {policy}, expected one of {PLAYBACK_POLICIES}'
+            raise ValueError(msg)
+        self._policy = policy
+
+    def start(self) -> None:
+        """Start a new schedule with the first frame due now."""
+        self._start = self._clock()
+        self._frame_index = 0
+        self._shown = 0
+        self._dropped = 0
+        self._shown_times: deque[float] = deque(maxlen=FPS_WINDOW)
+
+    def set_frame_time(self, frame_time: float) -> None:
+        """Change the target time between two frames without a jump of the current frame."""
+        now = self._clock()
+        self._start = now - (now - self._start) * frame_time / self.frame_time
+        self.frame_time = frame_time
+
+    def wait_time(self) -> float:
+        """Seconds until the next frame is due, 0 if it is already late."""
+        due = self._start + self._frame_index * self.frame_time
+        return max(0.0, due - self._clock())
+
+    def frame_shown(self) -> int:
+        """Record that the due frame is shown and schedule the next one.
+
+        Returns:
+            step: the number of frames the playback advances, more than 1 if frames are dropped.
+        """
+        now = self._clock()
+        self._shown += 1
+        self._shown_times.append(now)
+
+        next_index = self._frame_index + 1
+        if self._start + next_index * self.frame_time < now:
+            if self._policy == 'drop':
+                # Continue with the frame whose slot is running now
+                next_index = max(next_index, int((now - self._start) / self.frame_time))
+            else:
+                # Shift the schedule, so the next frame is due now and the later ones are not rushed
+                self._start = now - next_index * self.frame_time
+        step = next_index - self._frame_index
+        self._dropped += step - 1
+        self._frame_index = next_index
+        return step
+
+    def stats(self) -> PlaybackStats:
+        """Get the shown and dropped frames and the FPS over the last shown frames."""
+        fps = 0.0
+        if len(self._shown_times) > 1:
+            elapsed = self._shown_times[-1] - self._shown_times[0]
+            fps = (len(self._shown_times) - 1) / elapsed if elapsed > 0 else 0.0
+        return PlaybackStats(shown=self._shown, dropped=self._dropped, fps=fps)
@@ -4,6 +4,7 @@
 """Settings."""
 
 from PySide6.QtWidgets import (
+    QComboBox,
     QDialog,
     QHBoxLayout,
     QLabel,
@@ -12,6 +13,7 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
 )
 
+from sensorium.engine.playback import PLAYBACK_POLICIES
 from sensorium.engine.visualization_gui import VisualisationGui
 
 
@@ -38,6 +40,14 @@ class SettingsDialog(QDialog):
         self.settings_layout.addWidget(self.speed_label)
         self.settings_layout.addWidget(self.speed_input)
 
+        # drop: skip late frames to keep real time, slow: show every frame
+        self.policy_label = QLabel('Wiedergabe:')
+        self.policy_input = QComboBox(self)
+        self.policy_input.addItems(PLAYBACK_POLICIES)
+        self.policy_input.setCurrentText(self.visualisation.playback.policy)
+        self.settings_layout.addWidget(self.policy_label)
+        self.settings_layout.addWidget(self.policy_input)
+
         self.button_layout = QHBoxLayout()
 
         self.apply_button = QPushButton('Apply')
@@ -57,12 +67,15 @@ class SettingsDialog(QDialog):
         maxframe_int = int(maxframe)
         self.visualisation.maxframe = maxframe_int
         self.visualisation.slider.setRange(0, maxframe_int)
+        self.visualisation.thumbnails.set_range(maxframe_int)
 
         fps = self.speed_input.text()
         self.next_frame_time = int(1000 / int(fps))
         self.visualisation.next_frame_time = self.next_frame_time
         self.visualisation.fps = int(fps)
-        self.visualisation.animation_timer.setInterval(self.next_frame_time)
+        self.visualisation.playback.set_frame_time(self.next_frame_time / 1000)
+        self.visualisation.quality.target_fps = int(fps)
+        self.visualisation.playback.policy = self.policy_input.currentText()
         x = self.visualisation.framenumber
         y = self.visualisation.seq_id
         self.visualisation.frame_label.setText(f'Frame: {x}, Sequence: {y} und FPS: {int(fps)}')
@@ -0,0 +1,74 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Independent update slots of the visualization widgets.
+
+Every widget has its own slot with at most one update in flight. Frames that are requested while
+the widget is busy replace each other, and only the latest one is shown once the widget is ready,
+so a slow widget skips frames instead of delaying the other widgets. While scrubbing, a new
+request can also cancel the update in flight, so the widget does not wait for a superseded frame.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+
+class UpdateSlot:
+    """Runs the updates of one widget one at a time, the latest requested frame wins."""
+
+    def __init__(self, name: str, update: Callable[[int, int], Awaitable[None]]) -> None:
+        """Initialize an idle slot.
+
+        Args:
+            name: the name of the widget, used in error messages.
+            update: coroutine function that fetches and shows a (seq_id, frame_id).
+        """
+        self.name = name
+        self._update = update
+        self._pending: tuple[int, int] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._current: asyncio.Future[None] | None = None
+        self._superseded = False
+        self.skipped = 0
+
+    @property
+    def busy(self) -> bool:
+        """Whether an update is in flight."""
+        return self._task is not None and not self._task.done()
+
+    def request(self, seq_id: int, frame_id: int, *, cancel: bool = False) -> asyncio.Task[None]:
+        """Request to show a frame, replacing a request that has not started yet.
+
+        Args:
+            seq_id: Sequence number.
+            frame_id: Frame number.
+            cancel: also cancel the update in flight, which is superseded by this frame.
+
+        Returns:
+            task: finishes when this or a newer frame is shown.
+        """
+        if self._pending is not None:
+            self.skipped += 1
+        self._pending = (seq_id, frame_id)
+        if cancel and self._current is not None and not self._current.done():
+            self._superseded = True
+            self._current.cancel()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def _run(self) -> None:
+        """Show the pending frames until no newer frame was requested."""
+        while self._pending is not None:
+            seq_id, frame_id = self._pending
+            self._pending = None
+            self._superseded = False
+            self._current = asyncio.ensure_future(self._update(seq_id, frame_id))
+            try:
+                await self._current
+            except asyncio.CancelledError:
+                if not self._superseded:
+                    raise
+                self.skipped += 1
+            except (RuntimeError, ValueError) as e:
+                print(f'Error updating {self.name}: {e}')
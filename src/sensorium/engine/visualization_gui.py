@@ -6,6 +6,7 @@ import asyncio
 import sys
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import yaml
 from PySide6 import QtCore
@@ -22,11 +23,20 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from sensorium.communication.client_comm import get_quality_controller
 from sensorium.data_processing.engine.backend_engine import BackendEngine
-from sensorium.visualization.camera_visualization import CameraWidget
+from sensorium.engine.playback import PlaybackScheduler
+from sensorium.engine.update_slot import UpdateSlot
+from sensorium.visualization.camera_visualization import CameraWidget, show_stereo_images
 from sensorium.visualization.lidar_visualization import PointcloudVis
+from sensorium.visualization.thumbnail_strip import ThumbnailStrip
 from sensorium.visualization.trajectory_visualization import Trajectory
-from sensorium.visualization.voxel_widget import VoxelWidget
+
+if TYPE_CHECKING:
+    from sensorium.visualization.voxel_gfx_widget import VoxelGfxWidget
+    from sensorium.visualization.voxel_widget import VoxelWidget
+
+RESIZE_DEBOUNCE_MS = 200  # camera resolution is updated once the window stopped resizing
 
 
 class VisualisationGui(QMainWindow):
@@ -75,15 +85,18 @@ class VisualisationGui(QMainWindow):
         self._grid_layout()
         main_layout.addLayout(self.grid_layout)
 
+        self.thumbnails = ThumbnailStrip()
+        self.thumbnails.set_range(self.maxframe)
+        main_layout.addWidget(self.thumbnails)
+
         self.slider = QSlider(QtCore.Qt.Horizontal)  # type: ignore[attr-defined]
         self.slider.setRange(0, self.maxframe)  # type: ignore[has-type]
         self.slider.setValue(0)
         self.slider.valueChanged.connect(lambda: asyncio.create_task(self.set_frame_slider()))
+        self.slider.sliderReleased.connect(lambda: asyncio.create_task(self.set_frame_slider()))
         main_layout.addWidget(self.slider)
         main_layout.addLayout(controlbar)
 
-        self.animation_timer.stop()  # type: ignore[has-type]
-        self.loading_frame = False
         self._update_scene_lock = asyncio.Lock()
 
     def _init_variables(self) -> None:
@@ -94,7 +107,18 @@ class VisualisationGui(QMainWindow):
         self.seq_id = 0
         self.next_frame_time = int(self.config['frontend_engine']['next_frame_time'])
         self.fps = int(1000 / self.next_frame_time)
-        self.loading_frame = False
+        self.playback = PlaybackScheduler(
+            self.next_frame_time / 1000,
+            policy=self.config['frontend_engine'].get('playback_policy', 'drop'),
+        )
+        self.playback_task: asyncio.Task[None] | None = None
+        # Lowers the data quality when the responses do not keep up with the FPS
+        self.quality = get_quality_controller()
+        self.quality.enabled = bool(self.config['frontend_engine'].get('adaptive_quality', False))
+        self.quality.target_fps = self.fps
+        # (seq_id, frame_id) whose decoded data the widgets are showing
+        self.shown_frame: tuple[int, int] | None = None
+        self.thumbnail_task: asyncio.Task[None] | None = None
 
     def _setup_widgets(self) -> None:
         """Setup the widgets."""
@@ -105,6 +129,8 @@ class VisualisationGui(QMainWindow):
         self.grid_layout.addLayout(self.camera, 0, 0)
 
         self.pointcloud = PointcloudVis()
+        self.lidar_encoding = self.config['frontend_engine'].get('lidar_encoding', 'raw')
+        self.pointcloud.lidar_encoding = self.lidar_encoding
         self.grid_layout.addWidget(self.pointcloud, 0, 1)
 
         self.trajectory = Trajectory()
@@ -113,12 +139,44 @@ class VisualisationGui(QMainWindow):
         )
         self.grid_layout.addWidget(self.trajectory, 1, 0)
 
-        self.voxel = VoxelWidget()
+        self.voxel: VoxelWidget | VoxelGfxWidget
+        # Imported here, so only the stack of the configured renderer is loaded
+        if self.config['frontend_engine'].get('voxel_renderer', 'mayavi') == 'pygfx':
+            from sensorium.visualization import voxel_gfx_widget  # noqa: PLC0415
+
+            self.voxel = voxel_gfx_widget.VoxelGfxWidget()
+        else:
+            from sensorium.visualization import voxel_widget  # noqa: PLC0415
+
+            self.voxel = voxel_widget.VoxelWidget()
+        self.voxel_encoding = self.config['frontend_engine'].get('voxel_encoding', 'dense')
+        self.voxel.voxel_encoding = self.voxel_encoding
         self.grid_layout.addWidget(self.voxel, 1, 1)
 
-        self.animation_timer = QtCore.QTimer(self)
-        self.animation_timer.timeout.connect(self.timer_callback)
-        self.animation_timer.setInterval(self.next_frame_time)
+        # The widgets are looked up on every update, so they can be replaced or patched
+        self.camera_slot = UpdateSlot(
+            'camera',
+            lambda seq_id, frame_id: show_stereo_images(
+                self.camera2, self.camera3, seq_id, frame_id
+            ),
+        )
+        self.trajectory_slot = UpdateSlot(
+            'trajectory',
+            lambda seq_id, frame_id: self.trajectory.draw_line(seq_id, frame_id),  # noqa: PLW0108
+        )
+        self.pointcloud_slot = UpdateSlot(
+            'pointcloud',
+            lambda seq_id, frame_id: self.pointcloud.update_scene(seq_id, frame_id),  # noqa: PLW0108
+        )
+        self.voxel_slot = UpdateSlot(
+            'voxel',
+            lambda seq_id, frame_id: self.voxel.update_scene(seq_id, frame_id),  # noqa: PLW0108
+        )
+
+        self.resize_timer = QtCore.QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self.resize_timer.timeout.connect(self.update_display_size)
 
     async def set_frame_slider(self) -> None:
         """Sets the Frame if slider is moved."""
@@ -126,8 +184,13 @@ class VisualisationGui(QMainWindow):
         self.frame_label.setText(
             f'Frame: {self.framenumber}, Sequence: {self.seq_id} und FPS: {self.fps}'
         )
+        self.thumbnails.set_frame(self.framenumber)
+        if self.slider.isSliderDown() and self.thumbnails.has_thumbnails(self.seq_id):
+            # The thumbnail strip previews the frames until the slider is released
+            return
         if self.play_en is True:
-            await self.load_frame(self.seq_id, self.framenumber)
+            # Dragging the slider supersedes the frames that are still loading
+            await self.load_frame(self.seq_id, self.framenumber, cancel_superseded=True)
 
     def _grid_layout(self) -> None:
         """Sets the layout of the grid_layout."""
@@ -178,44 +241,76 @@ class VisualisationGui(QMainWindow):
         self.play_en = not self.play_en
         if self.play_en:
             self.button_play_stop.setText('Play')
-            self.animation_timer.stop()
+            if self.playback_task is not None:
+                self.playback_task.cancel()
+                self.playback_task = None
         else:
             self.button_play_stop.setText('Stop')
-            self.animation_timer.start()
+            self.playback_task = asyncio.create_task(self.play())
+
+    async def play(self) -> None:
+        """Show the frames at the times of the playback scheduler until the task is cancelled."""
+        self.playback.start()
+        while True:
+            await asyncio.sleep(self.playback.wait_time())
+            await self.update_scene()
+            stats = self.playback.stats()
+            quality = f', Qualität: {self.quality.level.name}' if self.quality.enabled else ''
+            self.frame_label.setText(
+                f'Frame: {self.framenumber}, Sequence: {self.seq_id} und FPS: {self.fps} '
+                f'(erreicht: {stats.fps:.1f}, verworfen: {stats.dropped}{quality})'
+            )
 
     async def update_scene(self) -> None:
-        """Ladet neue Bilder."""
+        """Ladet neue Bilder.
+
+        The frame number advances by the step of the playback scheduler, which skips the frames
+        that are already late with the 'drop' policy.
+        """
         async with self._update_scene_lock:
             await self.load_frame(self.seq_id, self.framenumber)
-            await self.update_frame(1)
-
-    async def load_frame(self, seq_id: int, frame_id: int) -> None:
-        """Ladet aktuelle Bilder."""
-        if self.loading_frame:
+            await self.update_frame(self.playback.frame_shown())
+            self.apply_quality()
+
+    def apply_quality(self) -> None:
+        """Request the next frames at the quality level picked from the measured responses."""
+        level = self.quality.level
+        self.pointcloud.lidar_encoding = level.lidar_encoding or self.lidar_encoding
+        self.pointcloud.lidar_subsample = level.lidar_subsample
+        self.voxel.voxel_encoding = level.voxel_encoding or self.voxel_encoding
+        for camera in (self.camera2, self.camera3):
+            if camera.quality_scale != level.camera_scale:
+                camera.set_quality_scale(level.camera_scale)
+
+    async def load_frame(
+        self, seq_id: int, frame_id: int, *, cancel_superseded: bool = False
+    ) -> None:
+        """Ladet aktuelle Bilder.
+
+        A frame that the widgets already show is not requested again. Every widget updates in
+        its own slot, where the latest requested frame wins. Playback waits for the cameras, the
+        trajectory and the point cloud, while the voxels, which only exist every 5th frame and
+        render slowest, are shown whenever they are ready.
+
+        With cancel_superseded, e.g. while scrubbing, the updates in flight are cancelled, so the
+        new frame is shown after one fetch instead of after all intermediate frames. Playback
+        does not cancel, otherwise the slow voxels would never be shown.
+        """
+        if (seq_id, frame_id) == self.shown_frame:
             return
-        self.loading_frame = True
+        self.shown_frame = (seq_id, frame_id)
+        if self.thumbnails.seq_id != seq_id:
+            self.thumbnail_task = asyncio.create_task(self.thumbnails.load(seq_id))
 
         print(f'[{time.time()}] process_frame started for frame {self.framenumber}')
 
-        try:
-            await asyncio.gather(
-                self.camera2.show_image(seq_id, frame_id),
-                self.camera3.show_image(seq_id, frame_id),
-                self.trajectory.draw_line(seq_id, frame_id),
-                self.pointcloud.update_scene(seq_id, frame_id),
-                self.voxel.update_scene(seq_id, frame_id),
-            )
-        except (RuntimeError, ValueError) as e:
-            print(f'Error in process_frame: {e}')
-
-        self.loading_frame = False
-
-    def timer_callback(self) -> None:
-        """Callback function for the timer."""
-        if not self._update_scene_lock.locked():
-            asyncio.create_task(self.update_scene())  # noqa: RUF006
-        else:
-            print('Update in progress; skipping new update.')
+        cancel = cancel_superseded
+        self.voxel_slot.request(seq_id, frame_id, cancel=cancel)
+        await asyncio.gather(
+            self.camera_slot.request(seq_id, frame_id, cancel=cancel),
+            self.trajectory_slot.request(seq_id, frame_id, cancel=cancel),
+            self.pointcloud_slot.request(seq_id, frame_id, cancel=cancel),
+        )
 
     def resizeEvent(self, event: QResizeEvent) -> None:  # noqa: N802
         """If Window size changes, change Widget size."""
@@ -229,9 +324,17 @@ class VisualisationGui(QMainWindow):
         self.camera3.label.setGeometry(
             0, 0, int(new_size.width() / 2), int(new_size.height() / 4 - 10)
         )
-        asyncio.create_task(self.load_frame(self.seq_id, self.framenumber))  # noqa: RUF006
+        # The labels scale the shown frames while resizing, the next frames are requested in
+        # the new size once the resizing stopped
+        self.resize_timer.start()
         return super().resizeEvent(event)
 
+    def update_display_size(self) -> None:
+        """Request the next camera images in the size of the labels, without refetching."""
+        # The server resizes the camera images to the label size before sending them
+        for camera in (self.camera2, self.camera3):
+            camera.set_display_size(camera.label.width(), camera.label.height())
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv) if not QApplication.instance() else QApplication.instance()
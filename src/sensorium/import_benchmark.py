@@ -0,0 +1,73 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the startup time of the entry points and the heavy packages they import.
+
+Every module is imported in a fresh interpreter, so the time includes all of its imports. The
+heavy packages are only expected where they are needed:
+
+- sensorium.server: no Qt, no visualization stack and no numba
+- sensorium.launch.launch: Qt, but no visualization stack and no numba until client mode
+- sensorium.engine.engine_run: the client window with the lidar and camera widgets
+
+Run with ``python -m sensorium.import_benchmark``.
+"""
+
+import json
+import subprocess
+import sys
+from typing import NamedTuple
+
+ENTRY_MODULES = (
+    'sensorium.server',
+    'sensorium.communication.client_comm',
+    'sensorium.launch.launch',
+    'sensorium.engine.engine_run',
+)
+HEAVY_PACKAGES = ('PySide6', 'qasync', 'cv2', 'numba', 'pygfx', 'wgpu', 'mayavi', 'vtk')
+NUM_REPEATS = 3
+
+
+class ImportTime(NamedTuple):
+    """The time to import a module and the heavy packages it loaded."""
+
+    module: str
+    seconds: float
+    heavy_packages: list[str]
+
+
+def measure_import(module: str) -> ImportTime:
+    """Import a module in a fresh interpreter.
+
+    Args:
+        module: the dotted name of the module.
+
+    Returns:
+        import_time: the wall time of the import and the heavy packages in sys.modules.
+    """
+    code = (
+        'import json, sys, time\n'
+        'start = time.perf_counter()\n'
+        f'import {module}\n'
+        'print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))\n'
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, '-c', code], capture_output=True, check=True, text=True
+    )
+    seconds, modules = json.loads(result.stdout.splitlines()[-1])
+    heavy_packages = [package for package in HEAVY_PACKAGES if package in modules]
+    return ImportTime(module, float(seconds), heavy_packages)
+
+
+def main() -> None:
+    """Main function."""
+    for module in ENTRY_MODULES:
+        # The fastest run is the least disturbed by the file system cache and other processes
+        import_time = min(
+            (measure_import(module) for _ in range(NUM_REPEATS)), key=lambda t: t.seconds
+        )
+        heavy_packages = ', '.join(import_time.heavy_packages) or '-'
+        print(f'{module:>36}: {import_time.seconds * 1000:7.0f} ms, loads {heavy_packages}')
+
+
+if __name__ == '__main__':
+    main()
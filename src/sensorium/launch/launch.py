@@ -22,7 +22,6 @@ from qasync import QEventLoop  # type: ignore[import-untyped]
 
 from sensorium.communication.client_comm import connect_client, disconnect_client
 from sensorium.communication.server_comm import get_server_control_functions
-from sensorium.engine.engine_run import MainWindow
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
@@ -189,6 +188,9 @@ class LaunchWindow(QMainWindow):
     def open_engine(self) -> None:
         """Launch the engine GUI."""
         self.log('Opening engine...')
+        # Imported here, so the visualization stacks are only loaded in client mode
+        from sensorium.engine.engine_run import MainWindow  # noqa: PLC0415
+
         self.main_window = MainWindow()
         self.main_window.show()
 
@@ -1,16 +1,145 @@
 # Copyright 2024  Projektpraktikum Python.
 # SPDX-License-Identifier: Apache-2.0
-"""Server executable entry point."""
+"""Server executable entry point.
+
+The server runs without the launch window and without Qt, e.g. under a process supervisor on a
+machine without GPU. Its settings are read from the config file and overridden by the command
+line options, the data directory alone is enough to run without a config file.
+
+With ``--workers K`` it starts K processes that all listen on the same port with SO_REUSEPORT,
+and the kernel spreads the connections over them. Every worker has its own BackendEngine, so
+decoding and compressing the responses scales over the cores instead of sharing one GIL. The
+workers share the caches on disk, e.g. the thumbnail atlases, while the in-memory caches are
+per worker.
+"""
 
 from __future__ import annotations
 
-import time
+import argparse
+import asyncio
+import multiprocessing
+import socket
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from sensorium.communication.server_comm import (
+    DEFAULT_CONFIG_PATH,
+    ServerConfig,
+    configure_server,
+    load_server_config,
+    start_server,
+)
+
+if TYPE_CHECKING:
+    from multiprocessing.context import SpawnProcess
+
+DEFAULT_PORT = 8765
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line options of the server."""
+    parser = argparse.ArgumentParser(description='Serve the sensor data to the clients.')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--host', default='localhost', help='address to listen on')
+    parser.add_argument(
+        '--workers', type=int, default=1, help='number of server processes sharing the port'
+    )
+    parser.add_argument(
+        '--config', type=Path, default=DEFAULT_CONFIG_PATH, help='the sensorium.yaml to read'
+    )
+    parser.add_argument('--data-dir', help='the kitti dataset directory, overrides the config')
+    parser.add_argument('--cache-dir', help='directory of the thumbnail atlases')
+    parser.add_argument(
+        '--cache-size', type=int, help='sequences whose static data is kept in memory'
+    )
+    parser.add_argument(
+        '--compression-level',
+        type=int,
+        choices=range(1, 10),
+        metavar='{1..9}',
+        help='bz2 level of the camera images, 1 is fastest and 9 smallest',
+    )
+    parser.add_argument(
+        '--map-stride', type=int, help='frames between two lidar scans fused into the scene map'
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        parser.error('--workers above 1 needs SO_REUSEPORT, which this platform does not support')
+    if args.cache_size is not None and args.cache_size < 1:
+        parser.error('--cache-size must be at least 1')
+    if args.map_stride is not None and args.map_stride < 1:
+        parser.error('--map-stride must be at least 1')
+    if args.data_dir is None and not args.config.is_file():
+        parser.error(f'config file {args.config} not found, pass --config or --data-dir')
+    return args
+
+
+def get_server_config(args: argparse.Namespace) -> ServerConfig:
+    """Read the config file, if there is one, and override it by the command line options."""
+    if args.config.is_file():
+        config = load_server_config(args.config)
+    else:
+        config = ServerConfig(data_dir=args.data_dir)
+    overrides = {
+        'data_dir': args.data_dir,
+        'cache_dir': args.cache_dir,
+        'static_data_cache_size': args.cache_size,
+        'compression_level': args.compression_level,
+        'map_stride': args.map_stride,
+    }
+    return config._replace(**{key: value for key, value in overrides.items() if value is not None})
+
+
+def run_worker(port: int, host: str, config: ServerConfig, *, reuse_port: bool = False) -> None:
+    """Serve the clients in this process until it is interrupted."""
+    configure_server(config)
+    try:
+        asyncio.run(start_server(port, asyncio.Event(), host=host, reuse_port=reuse_port))
+    except KeyboardInterrupt:
+        print('Server stopped.')
+
+
+def start_workers(port: int, host: str, config: ServerConfig, workers: int) -> list[SpawnProcess]:
+    """Start the worker processes, which all listen on the port.
+
+    The workers are spawned instead of forked, so they start from a clean interpreter without
+    the threads and locks of the calling process.
+    """
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(port, host, config),
+            kwargs={'reuse_port': True},
+            name=f'sensorium-worker-{index}',
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    return processes
 
 
-def run() -> None:
+def run(argv: list[str] | None = None) -> None:
     """Entry point function."""
-    print('Hello server')
-    time.sleep(5)
+    args = parse_args(argv)
+    config = get_server_config(args)
+    if args.workers == 1:
+        run_worker(args.port, args.host, config)
+        return
+    print(f'Starting {args.workers} server workers on ws://{args.host}:{args.port}')
+    processes = start_workers(args.port, args.host, config, args.workers)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print('Stopping the server workers...')
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
 
 
 if __name__ == '__main__':
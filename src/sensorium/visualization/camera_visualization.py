@@ -2,19 +2,75 @@
 # SPDX-License-Identifier: Apache-2.0
 """Camera Visualization."""
 
+import asyncio
 import sys
 
 import numpy as np
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QImage, QPixmap
-from PySide6.QtWidgets import QApplication, QLabel, QMainWindow
+from numpy.typing import NDArray
+from PySide6.QtCore import QPoint, QRect, Qt
+from PySide6.QtGui import QImage, QPainter, QPaintEvent, QResizeEvent
+from PySide6.QtWidgets import QApplication, QMainWindow, QWidget
 
-from sensorium.communication.client_comm import get_camera2_data, get_camera3_data
+from sensorium.communication.client_comm import (
+    get_camera2_data,
+    get_camera3_data,
+    get_stereo_data,
+)
+from sensorium.communication.encoding import get_camera_shape
 
 CAMERA2_SHAPE = (370, 1226, 3)
 CAMERA3_SHAPE = (370, 1226, 3)
 
 
+def create_bgr_image(frame: NDArray[np.uint8]) -> QImage:
+    """Create a BGR888 QImage that shares the buffer of a (H, W, 3) frame without a copy."""
+    height, width, _ = frame.shape
+    return QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_BGR888)
+
+
+class CameraView(QWidget):
+    """Paints an image scaled to the widget, keeping its aspect ratio.
+
+    The target rectangle is only computed when the image or the widget size changes, and the
+    image is painted straight from its buffer without an intermediate pixmap.
+    """
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        """Initializes the view without an image."""
+        super().__init__(parent)
+        self._image = QImage()
+        self._target = QRect()
+
+    def image(self) -> QImage:
+        """The shown image."""
+        return self._image
+
+    def set_image(self, image: QImage) -> None:
+        """Show the image; call update() to repaint after its buffer has changed."""
+        self._image = image
+        self._update_target()
+        self.update()
+
+    def resizeEvent(self, event: QResizeEvent) -> None:  # noqa: N802
+        """Scale the target rectangle to the new size."""
+        self._update_target()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event: QPaintEvent) -> None:  # noqa: N802, ARG002
+        """Paint the image into the target rectangle."""
+        if self._image.isNull():
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawImage(self._target, self._image)
+        painter.end()
+
+    def _update_target(self) -> None:
+        """Fit the image size into the widget size."""
+        size = self._image.size().scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        self._target = QRect(QPoint(0, 0), size)
+
+
 class CameraWidget(QMainWindow):
     """Widget fo Visualizing camera data."""
 
@@ -24,7 +80,12 @@ class CameraWidget(QMainWindow):
         self.img_directory = ''
         self.camera_id = camera_id
         self._height, self._width = 370, 1226
+        self._display_size = (self._width, self._height)
+        self.quality_scale = 1.0
+        self._frame = np.zeros((0, 0, 3), dtype=np.uint8)
+        self._qimage = QImage()
         self.setup_lable()
+        self._allocate_frame(get_camera_shape())
 
     def setup_lable(self) -> None:
         """Setup up the lable required to display the image."""
@@ -33,9 +94,71 @@ class CameraWidget(QMainWindow):
         height = int(self._height * scale_factor)
         self.setWindowTitle('Video')
         self.setGeometry(100, 100, width, height)  # NOTE: make it scalable
-        self.label = QLabel(self)
+        self.label = CameraView(self)
         self.label.setGeometry(0, 0, width, height)
 
+    def set_display_size(self, width: int, height: int) -> None:
+        """Request the next frames at the resolution the label shows them with.
+
+        Args:
+            width: the label width in logical pixel.
+            height: the label height in logical pixel.
+        """
+        self._display_size = (width, height)
+        self._update_frame_shape()
+
+    def set_quality_scale(self, scale: float) -> None:
+        """Request the next frames at a part of the display resolution, e.g. on a slow link."""
+        self.quality_scale = scale
+        self._update_frame_shape()
+
+    def _update_frame_shape(self) -> None:
+        """Allocate a new frame buffer if the requested image size changed."""
+        width, height = self._display_size
+        ratio = self.label.devicePixelRatioF() * self.quality_scale
+        shape = get_camera_shape(max(1, round(width * ratio)), max(1, round(height * ratio)))
+        if shape != self._frame.shape:
+            self._allocate_frame(shape)
+
+    @property
+    def frame(self) -> NDArray[np.uint8]:
+        """The BGR frame buffer shown by the label, call label.update() after writing to it."""
+        return self._frame
+
+    def _allocate_frame(self, shape: tuple[int, int, int]) -> None:
+        """Allocate the frame buffer and the QImage that shares it.
+
+        The shown frame is scaled into the new buffer, so a resize does not need to fetch it
+        again; the following frames arrive in the new size.
+        """
+        # Keep the previous buffer alive until its image is painted into the new one
+        previous_frame, previous_image = self._frame, self._qimage
+        # Every frame is decoded into this buffer, which the BGR888 QImage shares without a copy
+        self._frame = np.zeros(shape, dtype=np.uint8)
+        self._qimage = create_bgr_image(self._frame)
+        if not previous_image.isNull():
+            self._draw_scaled(previous_image)
+        self.label.set_image(self._qimage)
+        del previous_frame, previous_image
+
+    def _draw_scaled(self, image: QImage) -> None:
+        """Draw an image scaled into the frame buffer."""
+        painter = QPainter(self._qimage)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawImage(self._qimage.rect(), image)
+        painter.end()
+
+    def show_frame(self, frame: NDArray[np.uint8]) -> None:
+        """Show a frame decoded into the frame buffer.
+
+        If the buffer was reallocated during the decode, e.g. by a resize, the frame was decoded
+        into the previous buffer and is scaled into the new one.
+        """
+        if frame is not self._frame:
+            self._draw_scaled(create_bgr_image(frame))
+        # The QImage shares the buffer, so a repaint is enough to show the new frame
+        self.label.update()
+
     async def show_image(self, seq_id: int, frame_id: int) -> None:
         """Creates an image from the raw data of the according frame and shows it in the label.
 
@@ -43,36 +166,38 @@ class CameraWidget(QMainWindow):
             seq_id: Sequence number.
             frame_id: Frame number.
         """
+        frame = self._frame
+        height, width, _ = frame.shape
         if self.camera_id == 'camera2':
-            raw_data = await get_camera2_data(seq_id, frame_id)
-            image = raw_data.reshape(CAMERA2_SHAPE).astype(np.uint8)
+            await get_camera2_data(seq_id, frame_id, out=frame, size=(width, height))
         elif self.camera_id == 'camera3':
-            raw_data = await get_camera3_data(seq_id, frame_id)
-            image = raw_data.reshape(CAMERA3_SHAPE).astype(np.uint8)
+            await get_camera3_data(seq_id, frame_id, out=frame, size=(width, height))
         else:
             message = 'Invalid camera_id'
             raise ValueError(message)
+        self.show_frame(frame)
+
+
+async def show_stereo_images(
+    left: CameraWidget, right: CameraWidget, seq_id: int, frame_id: int
+) -> None:
+    """Show the frame in the camera2 and camera3 widgets, fetched with one stereo request.
 
-        image = np.ascontiguousarray(image)
-        rgb_array = np.ascontiguousarray(image[..., ::-1])
-        height, width, channels = rgb_array.shape
-        bytes_per_line = channels * width
-        qimage = QImage(
-            rgb_array.data,
-            width,
-            height,
-            bytes_per_line,
-            QImage.Format.Format_RGB888,
-        )
-        pixmap = QPixmap.fromImage(qimage)
-
-        self.label.setPixmap(
-            pixmap.scaled(
-                self.label.width(),
-                self.label.height(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-            )
-        )
+    Args:
+        left: the camera2 widget.
+        right: the camera3 widget.
+        seq_id: Sequence number.
+        frame_id: Frame number.
+    """
+    if left.frame.shape != right.frame.shape:
+        # The server sends both images in the same size
+        await asyncio.gather(left.show_image(seq_id, frame_id), right.show_image(seq_id, frame_id))
+        return
+    left_frame, right_frame = left.frame, right.frame
+    height, width, _ = left_frame.shape
+    await get_stereo_data(seq_id, frame_id, out=(left_frame, right_frame), size=(width, height))
+    left.show_frame(left_frame)
+    right.show_frame(right_frame)
 
 
 if __name__ == '__main__':
@@ -3,21 +3,30 @@
 
 """Helper functions for voxel visualization."""
 
-import mayavi
-from mayavi import mlab
-
-try:
-    engine = mayavi.engine
-except (NameError, AttributeError):
-    from mayavi.api import Engine
+from typing import NamedTuple
 
-    engine = Engine()
-    engine.start()
 import numpy as np
+from mayavi import mlab
+from mayavi.modules.glyph import Glyph
+from mayavi.modules.surface import Surface
 from numpy.typing import NDArray
 from traits.api import Instance
 
 import sensorium.data_processing.utils.io_data as semkitti_io
+from sensorium.data_processing.voxel_process.voxel_geometry import (
+    VOXEL_SIZE,
+    VoxelGeometry,
+    extract_voxel_geometry,
+    get_camera_frustum,
+)
+
+
+class VoxelPlots(NamedTuple):
+    """The mayavi pipelines of a drawn voxel scene."""
+
+    camera: Surface
+    fov: Glyph
+    outfov: Glyph
 
 
 def position_scene_view(scene: mlab.figure, view: int = 1) -> None:
@@ -40,32 +49,6 @@ def position_scene_view(scene: mlab.figure, view: int = 1) -> None:
         scene.render()
 
 
-def get_grid_coords(dims: list[int], resolution: float) -> NDArray[np.float32]:
-    """Get the grid coordinates of the voxel.
-
-    Args:
-        dims: the dimensions of the grid [x, y, z] (i.e. [256, 256, 32])
-        resolution: the size of the voxel
-
-    Returns:
-        coords_grid: the center coordinates of the voxels in the grid
-    """
-    g_xx = np.arange(0, dims[0] + 1)
-    g_yy = np.arange(0, dims[1] + 1)
-    g_zz = np.arange(0, dims[2] + 1)
-
-    # Obtaining the grid with coords...
-    xx, yy, zz = np.meshgrid(g_xx[:-1], g_yy[:-1], g_zz[:-1])
-    coords_grid = np.array([xx.flatten(), yy.flatten(), zz.flatten()]).T
-    coords_grid = coords_grid.astype(float)
-    coords_grid = (coords_grid * resolution) + resolution / 2
-
-    temp = np.copy(coords_grid)
-    temp[:, 0] = coords_grid[:, 1]
-    temp[:, 1] = coords_grid[:, 0]
-    return np.copy(temp)
-
-
 def draw_semantic_voxel(
     voxels: NDArray[np.uint8] | NDArray[np.float32] | None,
     cam_pose: NDArray[np.float32],
@@ -82,52 +65,44 @@ def draw_semantic_voxel(
         fov_mask: the field of view mask
         scene: the mayavi scene object
     """
-    # Set meta data of the voxel
-    img_size = (1220, 370)  # for SemanticKITTI dataset.
-    f = 707.0912  # for SemanticKITTI dataset.
-    voxel_size = 0.2
-    d = 7  # 7m - determine the size of the mesh representing the camera
-    view = 1  # choose viewing mode defined in position_scene_view function
-
     # Check the input voxel
     if voxels is None:
         _e_msg = 'No voxel passed to draw_semantic_voxel function'
         raise ValueError(_e_msg)
 
-    # Compute the coordinates of the mesh representing camera
-    x = d * img_size[0] / (2 * f)
-    y = d * img_size[1] / (2 * f)
-    tri_points = np.array(
-        [
-            [0, 0, 0],
-            [x, y, d],
-            [-x, y, d],
-            [-x, -y, d],
-            [x, -y, d],
-        ]
-    )
-    tri_points = np.hstack([tri_points, np.ones((5, 1))])
-    tri_points = (np.linalg.inv(cam_pose) @ tri_points.T).T
-    x = tri_points[:, 0] - vox_origin[0]
-    y = tri_points[:, 1] - vox_origin[1]
-    z = tri_points[:, 2] - vox_origin[2]
+    geometry = extract_voxel_geometry(voxels.astype(np.uint8, copy=False), fov_mask, VOXEL_SIZE)
+    draw_voxel_geometry(geometry, cam_pose, vox_origin, scene)
+
+
+def draw_voxel_geometry(
+    geometry: VoxelGeometry,
+    cam_pose: NDArray[np.float32] | NDArray[np.float64],
+    vox_origin: NDArray[np.float32],
+    scene: Instance,  # type: ignore[type-arg]
+) -> VoxelPlots:
+    """Draw the occupied voxels and the camera frustum. Code adapted from Symphonies.
+
+    Args:
+        geometry: the occupied voxel centres and class ids, split by the camera FOV
+        cam_pose: the camera's extrinsic matrix relative to lidar
+        vox_origin: the origin coordinate of the voxel
+        scene: the mayavi scene object
+
+    Returns:
+        plots: the mayavi pipelines, to be updated in place with update_voxel_geometry
+    """
+    voxel_size = VOXEL_SIZE
+    view = 1  # choose viewing mode defined in position_scene_view function
+
+    # Draw the camera
+    x, y, z = get_camera_frustum(cam_pose, vox_origin)
     triangles = [
         (0, 1, 2),
         (0, 1, 4),
         (0, 3, 4),
         (0, 2, 3),
     ]
-
-    # Compute the voxels coordinates
-    grid_coords = get_grid_coords([voxels.shape[0], voxels.shape[1], voxels.shape[2]], voxel_size)
-    # Attach the predicted class to every voxel
-    grid_coords = np.vstack([grid_coords.T, voxels.reshape(-1)]).T.astype(np.float32)
-    # Get the voxels inside FOV
-    fov_grid_coords = grid_coords[fov_mask, :]
-    # Get the voxels outside FOV
-    outfov_grid_coords = grid_coords[~fov_mask, :]
-    # Draw the camera
-    scene.mlab.triangular_mesh(
+    camera = scene.mlab.triangular_mesh(
         x,
         y,
         z,
@@ -142,14 +117,19 @@ def draw_semantic_voxel(
     outfov_colors = colors.copy()
     outfov_colors[:, :3] = outfov_colors[:, :3] // 3 * 2
 
-    for i, grid_coords in enumerate((fov_grid_coords, outfov_grid_coords)):
-        # Remove empty and unknown voxels
-        voxels = grid_coords[(grid_coords[:, 3] > 0) & (grid_coords[:, 3] < 255)]
+    # The geometry only holds occupied voxels, empty and unknown ones are already removed
+    voxel_plots = []
+    for i, (centres, labels) in enumerate(
+        (
+            (geometry.fov_centres, geometry.fov_labels),
+            (geometry.outfov_centres, geometry.outfov_labels),
+        )
+    ):
         plt_plot = scene.mlab.points3d(
-            voxels[:, 0],
-            voxels[:, 1],
-            voxels[:, 2],
-            voxels[:, 3],
+            centres[:, 0],
+            centres[:, 1],
+            centres[:, 2],
+            labels.astype(np.float32),
             colormap='viridis',
             scale_factor=voxel_size - 0.05 * voxel_size,
             mode='cube',
@@ -161,5 +141,45 @@ def draw_semantic_voxel(
 
         plt_plot.glyph.scale_mode = 'scale_by_vector'
         plt_plot.module_manager.scalar_lut_manager.lut.table = colors if i == 0 else outfov_colors
+        voxel_plots.append(plt_plot)
 
     plt_plot.scene.camera.zoom(1.3)
+    return VoxelPlots(camera=camera, fov=voxel_plots[0], outfov=voxel_plots[1])
+
+
+def update_voxel_geometry(
+    plots: VoxelPlots,
+    geometry: VoxelGeometry,
+    cam_pose: NDArray[np.float32] | NDArray[np.float64],
+    vox_origin: NDArray[np.float32],
+    scene: Instance,  # type: ignore[type-arg]
+) -> None:
+    """Replace the data of the pipelines created by draw_voxel_geometry in place.
+
+    The glyph pipelines, the colormaps and the camera view of the scene are kept, so only the
+    new voxel data is uploaded.
+
+    Args:
+        plots: the mayavi pipelines returned by draw_voxel_geometry
+        geometry: the occupied voxel centres and class ids, split by the camera FOV
+        cam_pose: the camera's extrinsic matrix relative to lidar
+        vox_origin: the origin coordinate of the voxel
+        scene: the mayavi scene object
+    """
+    scene.disable_render = True  # type: ignore[attr-defined]
+    try:
+        x, y, z = get_camera_frustum(cam_pose, vox_origin)
+        plots.camera.mlab_source.set(x=x, y=y, z=z)
+        for plot, centres, labels in (
+            (plots.fov, geometry.fov_centres, geometry.fov_labels),
+            (plots.outfov, geometry.outfov_centres, geometry.outfov_labels),
+        ):
+            # reset instead of set, since the number of voxels changes between frames
+            plot.mlab_source.reset(
+                x=centres[:, 0],
+                y=centres[:, 1],
+                z=centres[:, 2],
+                scalars=labels.astype(np.float32),
+            )
+    finally:
+        scene.disable_render = False  # type: ignore[attr-defined]
@@ -12,6 +12,7 @@ from PySide6 import QtWidgets
 from wgpu.gui.qt import WgpuCanvas  # type: ignore[import-untyped]
 
 from sensorium.communication.client_comm import get_lidar_data
+from sensorium.data_processing.lidar_pointcloud.point_cloud import get_color_lut
 
 
 class PointcloudVis(QtWidgets.QWidget):
@@ -25,6 +26,11 @@ class PointcloudVis(QtWidgets.QWidget):
         self.config_file = Path()
         self.directory = Path()
         self.label_directory = Path()
+        self.lidar_encoding = 'raw'  # 'raw' or 'quantized', see client_comm.get_lidar_data
+        self.lidar_subsample = 1  # every n-th point is shown
+        self.color_mode = 'semantic'  # 'semantic' (ground truth) or 'gradient' (z-values)
+        # Precomputed RGB lookup table indexed by the uint16 semantic label
+        self.color_lut = np.ascontiguousarray(get_color_lut()[:, ::-1], dtype=np.float32) / 255
 
         self.setup_scene()
         layout = QtWidgets.QVBoxLayout()
@@ -98,6 +104,20 @@ class PointcloudVis(QtWidgets.QWidget):
         colors[:, 2] = 0  # blue
         return colors
 
+    def load_colors_semantic(
+        self, labels: np.ndarray[tuple[int, ...], np.dtype[np.uint16]]
+    ) -> np.ndarray[tuple[int, ...], np.dtype[np.float32]]:
+        """Assigns the ground truth color to each point through the precomputed lookup table.
+
+        Args:
+            labels: Array with the uint16 semantic labels of the points.
+
+        Returns:
+            np.ndarray[tuple[int, ...], np.dtype[np.float32]]: Array with the rgb values of the
+            points.
+        """
+        return self.color_lut[labels]
+
     def load_colors_ground_truth(
         self, frame_id: int
     ) -> np.ndarray[tuple[int, ...], np.dtype[np.float32]]:
@@ -130,13 +150,22 @@ class PointcloudVis(QtWidgets.QWidget):
             seq_id: Sequence number.
             frame_id: Frame number.
 
-        Note: get_lidar_data returns both the positions of the point and their ground truth colors.
-        Currently the colors are assigned via a gradient based on the z-values of the points.
+        Note: get_lidar_data returns both the positions of the points and their semantic labels.
+        The points are colored by their ground truth labels, or via a gradient based on the
+        z-values if the gradient mode is selected or no matching labels are available.
         """
-        # positions, colors = get_lidar_data(frame_id, seq_id)  # noqa: ERA001
-        points, _ = await get_lidar_data(seq_id, frame_id)
+        points, labels = await get_lidar_data(
+            seq_id, frame_id, self.lidar_encoding, subsample=self.lidar_subsample
+        )
         positions = np.ascontiguousarray(points, dtype=np.float32)
-        colors = np.ascontiguousarray(self.load_colors_gradient(positions), dtype=np.float32)
+        if (
+            self.color_mode == 'semantic'
+            and labels is not None
+            and labels.shape[0] == positions.shape[0]
+        ):
+            colors = self.load_colors_semantic(labels)
+        else:
+            colors = np.ascontiguousarray(self.load_colors_gradient(positions), dtype=np.float32)
         sizes = np.ascontiguousarray(
             np.ones(positions.shape[0], dtype=np.float32) * 0.03, dtype=np.float32
         )
@@ -0,0 +1,101 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Thumbnail strip above the frame slider."""
+
+from typing import TYPE_CHECKING
+
+from PySide6.QtCore import QRect, Qt
+from PySide6.QtGui import QImage, QPainter, QPaintEvent, QPen
+from PySide6.QtWidgets import QWidget
+
+from sensorium.communication.client_comm import get_thumbnail_data
+
+if TYPE_CHECKING:
+    from sensorium.data_processing.camera.thumbnails import ThumbnailAtlas
+
+STRIP_HEIGHT = 60  # in pixel
+PREVIEW_BORDER = 2  # width of the frame around the preview of the current frame
+
+
+class ThumbnailStrip(QWidget):
+    """Shows the thumbnails of a sequence along the slider and previews the current frame.
+
+    All thumbnails are cut from one atlas image that is fetched once per sequence, so moving the
+    slider only repaints the strip instead of requesting the frames.
+    """
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        """Initializes the strip, hidden until the thumbnails of a sequence are loaded."""
+        super().__init__(parent)
+        self.seq_id: int | None = None
+        self.maximum = 0
+        self.frame_id = 0
+        self._atlas: ThumbnailAtlas | None = None
+        self._image = QImage()
+        self.setFixedHeight(STRIP_HEIGHT)
+        self.hide()
+
+    def has_thumbnails(self, seq_id: int) -> bool:
+        """Whether the thumbnails of the sequence are loaded."""
+        return self._atlas is not None and self.seq_id == seq_id
+
+    async def load(self, seq_id: int) -> None:
+        """Fetch the thumbnail atlas of a sequence, the strip stays hidden if it fails."""
+        self.seq_id = seq_id
+        self._atlas = None
+        self.hide()
+        try:
+            atlas = await get_thumbnail_data(seq_id)
+        except (ConnectionError, RuntimeError, ValueError) as e:
+            print(f'Thumbnails of sequence {seq_id} not available: {e}')
+            return
+        if seq_id != self.seq_id:
+            return  # the sequence changed while loading
+        image = QImage.fromData(atlas.image)
+        if image.isNull():
+            print(f'Thumbnails of sequence {seq_id} cannot be decoded')
+            return
+        self._atlas = atlas
+        self._image = image
+        self.show()
+        self.update()
+
+    def set_range(self, maximum: int) -> None:
+        """Spread the thumbnails of the frames 0 to maximum over the width, like the slider."""
+        self.maximum = maximum
+        self.update()
+
+    def set_frame(self, frame_id: int) -> None:
+        """Preview the thumbnail of a frame at its position along the strip."""
+        self.frame_id = frame_id
+        self.update()
+
+    def _source(self, frame_id: int) -> QRect:
+        """The rectangle of the thumbnail of a frame in the atlas image."""
+        if self._atlas is None:
+            return QRect()
+        return QRect(*self._atlas.tile(frame_id, (self._image.width(), self._image.height())))
+
+    def paintEvent(self, event: QPaintEvent) -> None:  # noqa: N802, ARG002
+        """Paint the thumbnails side by side and the enlarged preview of the current frame."""
+        if self._atlas is None or self.maximum <= 0:
+            return
+        source = self._source(0)
+        tile_height = self.height() - 2 * PREVIEW_BORDER
+        tile_width = max(1, tile_height * source.width() // max(1, source.height()))
+        tiles = max(1, self.width() // tile_width)
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        for tile in range(tiles):
+            frame_id = tile * self.maximum // tiles
+            target = QRect(tile * tile_width, PREVIEW_BORDER, tile_width, tile_height)
+            painter.drawImage(target, self._image, self._source(frame_id))
+
+        # The preview is centred on the position of the slider handle
+        centre = self.width() * min(self.frame_id, self.maximum) // self.maximum
+        x = min(max(centre - tile_width // 2, 0), self.width() - tile_width)
+        preview = QRect(x, PREVIEW_BORDER, tile_width, tile_height)
+        painter.drawImage(preview, self._image, self._source(self.frame_id))
+        painter.setPen(QPen(Qt.GlobalColor.yellow, PREVIEW_BORDER))
+        painter.drawRect(preview)
+        painter.end()
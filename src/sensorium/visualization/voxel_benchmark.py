@@ -0,0 +1,149 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Compare the frame times of the mayavi and the pygfx voxel renderers.
+
+Both renderers draw the same synthetic SemanticKITTI-like frames into an offscreen window:
+
+- mayavi rebuild: clear the figure and create new glyph pipelines, as before the scene reuse
+- mayavi update: reset the data of the existing glyph pipelines, as VoxelWidget does
+- pygfx update: mesh the visible faces and overwrite the buffers, as VoxelGfxWidget does
+
+Run with ``python -m sensorium.visualization.voxel_benchmark``.
+"""
+
+import os
+import time
+from collections.abc import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from sensorium.data_processing.voxel_process.voxel_geometry import (
+    VOX_ORIGIN,
+    VoxelGeometry,
+    extract_voxel_geometry,
+)
+
+GRID_DIMS = (256, 256, 32)
+NUM_FRAMES = 10
+
+
+def make_frames(num_frames: int, seed: int = 0) -> list[VoxelGeometry]:
+    """Create voxel frames with a road, sidewalks, buildings and cars.
+
+    Args:
+        num_frames: the number of frames.
+        seed: the seed of the random generator.
+
+    Returns:
+        frames: the render geometry of every frame.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(num_frames):
+        voxel = np.zeros(GRID_DIMS, dtype=np.uint8)
+        voxel[:, :, :8] = 9  # road
+        voxel[:, :80, :9] = 11  # sidewalk
+        voxel[:, 176:, :9] = 11
+        for x in rng.integers(0, 240, size=12):  # buildings
+            y = int(rng.choice([rng.integers(0, 60), rng.integers(190, 240)]))
+            voxel[x : x + 16, y : y + 16, 9 : rng.integers(15, 32)] = 13
+        for x, y in rng.integers(0, 236, size=(15, 2)):  # cars
+            voxel[x : x + 20, y : y + 9, 8:16] = 1
+        voxel[rng.random(GRID_DIMS) < 0.02] = 255  # unknown voxels are never drawn
+        fov_mask = np.zeros(voxel.size, dtype=np.bool_)
+        fov_mask[: voxel.size // 2] = True
+        frames.append(extract_voxel_geometry(voxel, fov_mask))
+    return frames
+
+
+def time_frames(
+    frames: list[VoxelGeometry], draw: Callable[[VoxelGeometry], None]
+) -> NDArray[np.float64]:
+    """Time the draw function for every frame, after one warm-up frame.
+
+    Returns:
+        frame_times: the frame times in milliseconds.
+    """
+    draw(frames[0])
+    frame_times = []
+    for geometry in frames:
+        start = time.perf_counter()
+        draw(geometry)
+        frame_times.append((time.perf_counter() - start) * 1000)
+    return np.array(frame_times)
+
+
+def benchmark_mayavi(frames: list[VoxelGeometry], t_velo_2_cam: NDArray[np.float64]) -> None:
+    """Time the mayavi renderer, rebuilding the pipelines and updating them in place."""
+    from mayavi import mlab  # noqa: PLC0415
+
+    from sensorium.visualization import helper  # noqa: PLC0415
+
+    mlab.options.offscreen = True
+    figure = mlab.figure(size=(640, 480))
+
+    class Scene:
+        """Minimal stand-in of the MlabSceneModel used by VoxelVisualization."""
+
+        def __init__(self) -> None:
+            self.mlab = mlab
+            self.scene = figure.scene
+            self.disable_render = False
+
+    scene = Scene()
+
+    def rebuild(geometry: VoxelGeometry) -> None:
+        mlab.clf(figure)
+        helper.draw_voxel_geometry(geometry, t_velo_2_cam, VOX_ORIGIN, scene)  # type: ignore[arg-type]
+        figure.scene.render()
+
+    report('mayavi rebuild', time_frames(frames, rebuild))
+
+    plots = helper.draw_voxel_geometry(frames[0], t_velo_2_cam, VOX_ORIGIN, scene)  # type: ignore[arg-type]
+
+    def update(geometry: VoxelGeometry) -> None:
+        helper.update_voxel_geometry(plots, geometry, t_velo_2_cam, VOX_ORIGIN, scene)  # type: ignore[arg-type]
+        figure.scene.render()
+
+    report('mayavi update', time_frames(frames, update))
+
+
+def benchmark_pygfx(frames: list[VoxelGeometry], t_velo_2_cam: NDArray[np.float64]) -> None:
+    """Time the pygfx renderer, meshing, uploading and rendering every frame."""
+    import pygfx as gfx  # type: ignore[import-untyped]  # noqa: PLC0415
+    from wgpu.gui.offscreen import WgpuCanvas  # type: ignore[import-untyped]  # noqa: PLC0415
+
+    from sensorium.visualization.voxel_gfx_widget import VoxelGfxScene  # noqa: PLC0415
+
+    canvas = WgpuCanvas(size=(640, 480))
+    renderer = gfx.WgpuRenderer(canvas)
+    voxel_scene = VoxelGfxScene()
+    canvas.request_draw(lambda: renderer.render(voxel_scene.scene, voxel_scene.camera))
+
+    def update(geometry: VoxelGeometry) -> None:
+        voxel_scene.set_geometry(geometry, t_velo_2_cam)
+        canvas.draw()
+
+    report('pygfx update', time_frames(frames, update))
+
+
+def report(name: str, frame_times: NDArray[np.float64]) -> None:
+    """Print the mean and the worst frame time."""
+    print(f'{name:>15}: mean {frame_times.mean():8.1f} ms, max {frame_times.max():8.1f} ms')
+
+
+def main() -> None:
+    """Main function."""
+    os.environ.setdefault('ETS_TOOLKIT', 'null')
+    frames = make_frames(NUM_FRAMES)
+    num_voxels = np.mean([len(f.fov_labels) + len(f.outfov_labels) for f in frames])
+    print(f'{NUM_FRAMES} frames with {num_voxels:.0f} occupied voxels on average')
+
+    t_velo_2_cam = np.eye(4)
+    benchmark_pygfx(frames, t_velo_2_cam)
+    benchmark_mayavi(frames, t_velo_2_cam)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Voxel visualization on pygfx, an alternative to the mayavi VoxelWidget.
+
+The visible voxel faces are drawn as one quad mesh, see voxel_mesh. The mesh buffers are
+allocated with spare capacity and overwritten in place for every frame, so the GPU pipeline is
+only rebuilt when a frame needs more faces than any frame before.
+"""
+
+from functools import cache
+
+import numpy as np
+import pygfx as gfx  # type: ignore[import-untyped]
+from numpy.typing import NDArray
+from PySide6 import QtWidgets
+from wgpu.gui.qt import WgpuCanvas  # type: ignore[import-untyped]
+
+from sensorium.communication.client_comm import (
+    get_voxel_data,
+    get_voxel_geometry,
+    get_voxel_mesh,
+)
+from sensorium.data_processing.utils.io_data import get_cmap_semantickitti20
+from sensorium.data_processing.voxel_process.voxel_geometry import (
+    VOX_ORIGIN,
+    VoxelGeometry,
+    get_camera_frustum,
+)
+from sensorium.data_processing.voxel_process.voxel_mesh import (
+    VoxelMesh,
+    build_voxel_mesh,
+    extract_voxel_surface,
+    surface_to_mesh,
+)
+
+# Edges of the wireframe camera frustum, between the vertices of get_camera_frustum
+FRUSTUM_EDGES = np.array([[0, 1], [0, 2], [0, 3], [0, 4], [1, 2], [2, 3], [3, 4], [4, 1]])
+# Same view as position_scene_view(view=1) of the mayavi widget
+VIEW_POSITION = (-54.665532379571125, -43.712070618513835, 93.7371444096225)
+VIEW_FOCAL_POINT = (25.49999923631549, 25.49999923631549, 1.9999999515712261)
+
+
+@cache
+def get_voxel_color_luts() -> tuple[NDArray[np.float32], NDArray[np.float32]]:
+    """Get the RGBA lookup tables of the voxels inside and outside the FOV, indexed by class id.
+
+    The colors match the mayavi widget: get_cmap_semantickitti20 for the classes 1 to 19, with
+    darker colors outside the FOV.
+    """
+    cmap = get_cmap_semantickitti20()
+    outfov_cmap = cmap.copy()
+    outfov_cmap[:, :3] = outfov_cmap[:, :3] // 3 * 2
+
+    fov_lut = np.zeros((256, 4), dtype=np.float32)
+    outfov_lut = np.zeros((256, 4), dtype=np.float32)
+    fov_lut[1 : len(cmap) + 1] = cmap / 255
+    outfov_lut[1 : len(cmap) + 1] = outfov_cmap / 255
+    fov_lut.flags.writeable = False
+    outfov_lut.flags.writeable = False
+    return fov_lut, outfov_lut
+
+
+def get_vertex_colors(mesh: VoxelMesh) -> NDArray[np.float32]:
+    """Get the RGBA color of every mesh vertex from the class id and FOV side of its quad."""
+    fov_lut, outfov_lut = get_voxel_color_luts()
+    face_colors = np.where(mesh.in_fov[:, None], fov_lut[mesh.labels], outfov_lut[mesh.labels])
+    return np.repeat(face_colors, 4, axis=0)
+
+
+class VoxelGfxScene:
+    """pygfx scene with the voxel mesh and the camera frustum, updated in place per frame."""
+
+    def __init__(self) -> None:
+        """Initialize the scene, lights and camera; the mesh is created with the first frame."""
+        self.scene = gfx.Scene()
+        self.scene.add(gfx.AmbientLight(intensity=0.6))
+        self.camera = gfx.PerspectiveCamera(30)
+        self.camera.world.reference_up = (0, 0, 1)
+        self.camera.local.position = VIEW_POSITION
+        self.camera.look_at(VIEW_FOCAL_POINT)
+        self.camera.add(gfx.DirectionalLight(intensity=2.5))
+        self.scene.add(self.camera)
+        self.mesh: gfx.Mesh | None = None
+        self.frustum = gfx.Line(
+            gfx.Geometry(positions=np.zeros((len(FRUSTUM_EDGES) * 2, 3), dtype=np.float32)),
+            gfx.LineSegmentMaterial(thickness=3, color=(0, 0, 0, 1)),
+        )
+        self.scene.add(self.frustum)
+
+    def set_geometry(self, geometry: VoxelGeometry, t_velo_2_cam: NDArray[np.float64]) -> None:
+        """Show the occupied voxels of a frame, meshing their visible faces on the client.
+
+        Args:
+            geometry: the occupied voxel centres and class ids, split by the camera FOV.
+            t_velo_2_cam: (4, 4) transformation from lidar to camera.
+        """
+        self.set_mesh(build_voxel_mesh(geometry), t_velo_2_cam)
+
+    def set_mesh(self, mesh: VoxelMesh, t_velo_2_cam: NDArray[np.float64]) -> None:
+        """Show new voxel data by overwriting the mesh buffers.
+
+        Args:
+            mesh: the quad mesh of the visible voxel faces, relative to the grid origin.
+            t_velo_2_cam: (4, 4) transformation from lidar to camera.
+        """
+        num_faces = len(mesh.indices)
+        if self.mesh is None or num_faces > self.mesh.geometry.indices.nitems:
+            self.mesh = self._create_mesh(num_faces)
+
+        mesh_geometry = self.mesh.geometry
+        for buffer, data in (
+            (mesh_geometry.positions, mesh.positions),
+            (mesh_geometry.normals, mesh.normals),
+            (mesh_geometry.colors, get_vertex_colors(mesh)),
+            (mesh_geometry.indices, mesh.indices),
+        ):
+            buffer.data[: len(data)] = data
+            buffer.update_range(0, len(data))
+        mesh_geometry.indices.draw_range = (0, num_faces)
+
+        x, y, z = get_camera_frustum(t_velo_2_cam, VOX_ORIGIN)
+        vertices = np.stack([x, y, z], axis=1).astype(np.float32)
+        self.frustum.geometry.positions.data[:] = vertices[FRUSTUM_EDGES.reshape(-1)]
+        self.frustum.geometry.positions.update_range()
+
+    def _create_mesh(self, num_faces: int) -> gfx.Mesh:
+        """Replace the mesh by one with room for 1.5 times the requested number of faces."""
+        capacity = max(int(num_faces * 1.5), 1024)
+        mesh_geometry = gfx.Geometry(
+            positions=np.zeros((capacity * 4, 3), dtype=np.float32),
+            normals=np.zeros((capacity * 4, 3), dtype=np.float32),
+            colors=np.zeros((capacity * 4, 4), dtype=np.float32),
+            indices=np.zeros((capacity, 4), dtype=np.uint32),
+        )
+        if self.mesh is not None:
+            self.scene.remove(self.mesh)
+        mesh = gfx.Mesh(mesh_geometry, gfx.MeshPhongMaterial(color_mode='vertex'))
+        self.scene.add(mesh)
+        return mesh
+
+
+class VoxelGfxWidget(QtWidgets.QWidget):
+    """Widget for visualizing the voxel ground truth with pygfx, see VoxelWidget."""
+
+    def __init__(self, parent: QtWidgets.QWidget | None = None) -> None:
+        """Initialize the voxel widget."""
+        super().__init__(parent)
+        self.frame_number = 0
+        # 'mesh' lets the server extract the visible surface, 'geometry' the occupied voxels,
+        # 'dense' or 'rle' send the grid
+        self.voxel_encoding = 'dense'
+        self.setWindowTitle('Voxel Ground Truth')
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.canvas = WgpuCanvas(parent=self)
+        self.canvas.setSizePolicy(
+            QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Expanding
+        )
+        layout.addWidget(self.canvas)
+        self.renderer = gfx.WgpuRenderer(self.canvas)
+        self.voxel_scene = VoxelGfxScene()
+        self.controller = gfx.OrbitController(
+            self.voxel_scene.camera, register_events=self.renderer
+        )
+        self.canvas.request_draw(self.animate)
+
+    async def update_scene(self, seq_id: int, frame_id: int) -> None:
+        """Update the scene with the new voxel and show to the user."""
+        # First check the frame_id is valid
+        if frame_id % 5 != 0:
+            self.frame_number += 1
+            return
+        try:
+            if self.voxel_encoding == 'mesh':
+                mesh, t_velo_2_cam = await get_voxel_mesh(seq_id, frame_id)
+            elif self.voxel_encoding == 'geometry':
+                geometry, t_velo_2_cam = await get_voxel_geometry(seq_id, frame_id)
+                mesh = build_voxel_mesh(geometry)
+            else:
+                voxel, fov_mask, t_velo_2_cam = await get_voxel_data(
+                    seq_id, frame_id, self.voxel_encoding
+                )
+                mesh = surface_to_mesh(extract_voxel_surface(voxel, fov_mask))
+        except ValueError as e:
+            print(f'Error getting voxel data: {e}')
+            return
+
+        self.voxel_scene.set_mesh(mesh, t_velo_2_cam)
+        self.canvas.update()
+        self.frame_number += 1
+
+    def animate(self) -> None:
+        """Renders the scene."""
+        self.renderer.render(self.voxel_scene.scene, self.voxel_scene.camera)
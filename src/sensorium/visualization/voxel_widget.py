@@ -9,28 +9,51 @@ import sys
 
 import numpy as np
 from mayavi.core.ui.api import MayaviScene, MlabSceneModel, SceneEditor
+from numpy.typing import NDArray
 from PySide6.QtWidgets import QApplication, QVBoxLayout, QWidget
-from traits.api import Dict, HasTraits, Instance, on_trait_change
+from traits.api import Any, Dict, HasTraits, Instance, on_trait_change
 from traitsui.api import Item, View
 
-from sensorium.communication.client_comm import get_voxel_data
-from sensorium.visualization.helper import draw_semantic_voxel
+from sensorium.communication.client_comm import get_voxel_data, get_voxel_geometry
+from sensorium.data_processing.voxel_process.voxel_geometry import (
+    VOX_ORIGIN,
+    VoxelGeometry,
+    extract_voxel_geometry,
+)
+from sensorium.visualization.helper import draw_voxel_geometry, update_voxel_geometry
 
 
 class VoxelVisualization(HasTraits):
-    """Voxel Visualization class."""
+    """Voxel Visualization class.
+
+    The scene and its glyph pipelines are created once, later frames only replace their data.
+    """
 
     scene = Instance(MlabSceneModel, ())
     data = Dict()  # type: ignore[var-annotated]
+    plots = Any()
 
     @on_trait_change('scene.activated')  # type: ignore[misc]
     def update_plot(self) -> None:
-        """Load the new data and draw the new voxel."""
-        draw_semantic_voxel(
-            voxels=self.data['voxel'],
-            cam_pose=self.data['t_velo_2_cam'],
-            vox_origin=np.array([0, -25.6, -2]),
-            fov_mask=self.data['fov_mask'],
+        """Draw the voxel once the scene is ready."""
+        if self.data:
+            self.plots = draw_voxel_geometry(
+                geometry=self.data['geometry'],
+                cam_pose=self.data['t_velo_2_cam'],
+                vox_origin=VOX_ORIGIN,
+                scene=self.scene,  # type: ignore[arg-type]
+            )
+
+    def set_geometry(self, geometry: VoxelGeometry, t_velo_2_cam: NDArray[np.float64]) -> None:
+        """Show new voxel data, reusing the existing pipelines if they are already drawn."""
+        self.data = {'geometry': geometry, 't_velo_2_cam': t_velo_2_cam}
+        if self.plots is None:
+            return  # the scene is not activated yet, update_plot draws the data
+        update_voxel_geometry(
+            plots=self.plots,
+            geometry=geometry,
+            cam_pose=t_velo_2_cam,
+            vox_origin=VOX_ORIGIN,
             scene=self.scene,  # type: ignore[arg-type]
         )
 
@@ -48,6 +71,10 @@ class VoxelWidget(QWidget):
         """Initialize the voxel widget."""
         super().__init__(parent)
         self.frame_number = 0
+        # 'geometry' lets the server extract the occupied voxels, 'dense' or 'rle' send the grid.
+        # The glyphs need the voxel centres, so 'mesh' (pygfx only) also requests the geometry.
+        self.voxel_encoding = 'dense'
+        self.visualization: VoxelVisualization | None = None
         self.setWindowTitle('Voxel Ground Truth')
 
         # Create the main widget
@@ -62,35 +89,31 @@ class VoxelWidget(QWidget):
             self.frame_number += 1
             return
         try:
-            voxel, fov_mask, t_velo_2_cam = await get_voxel_data(seq_id, frame_id)
+            if self.voxel_encoding in {'geometry', 'mesh'}:
+                geometry, t_velo_2_cam = await get_voxel_geometry(seq_id, frame_id)
+            else:
+                voxel, fov_mask, t_velo_2_cam = await get_voxel_data(
+                    seq_id, frame_id, self.voxel_encoding
+                )
+                geometry = extract_voxel_geometry(voxel, fov_mask)
         except ValueError as e:
             print(f'Error getting voxel data: {e}')
             return
 
-        data = {
-            'voxel': voxel,
-            'fov_mask': fov_mask,
-            't_velo_2_cam': t_velo_2_cam,
-        }
-
-        self.visualization = VoxelVisualization(data=data)
-
-        # Clean up the previous UI and scene
-        if hasattr(self, 'ui'):
-            self.layout_window.removeWidget(self.ui)  # type: ignore[has-type]
-            self.ui.deleteLater()  # type: ignore[has-type]
-            if self.visualization.scene.scene_editor is not None:  # type: ignore[union-attr]
-                self.visualization.scene.scene_editor = None  # type: ignore[union-attr]
-
-        # Remove the figure
-        self.visualization.scene.mlab.clf()  # type: ignore[union-attr]
-
-        # Update the scene and add it to the layout
-        self.ui = self.visualization.edit_traits(
-            parent=self, kind='subpanel', context=self.visualization
-        ).control
-        self.layout_window.addWidget(self.ui)
-        self.ui.setParent(self)
+        if self.visualization is None:
+            # Create the scene once and add it to the layout, it is drawn when activated
+            data = {
+                'geometry': geometry,
+                't_velo_2_cam': t_velo_2_cam,
+            }
+            self.visualization = VoxelVisualization(data=data)
+            self.ui = self.visualization.edit_traits(
+                parent=self, kind='subpanel', context=self.visualization
+            ).control
+            self.layout_window.addWidget(self.ui)
+            self.ui.setParent(self)
+        else:
+            self.visualization.set_geometry(geometry, t_velo_2_cam)
 
         # Update the frame number
         self.frame_number += 1
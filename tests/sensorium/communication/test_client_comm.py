@@ -3,6 +3,7 @@
 
 """Test module for client communication."""
 
+import asyncio
 import bz2
 import gzip
 import json
@@ -15,11 +16,27 @@ import websockets
 from websockets.legacy.server import WebSocketServerProtocol
 
 from sensorium.communication import client_comm
+from sensorium.communication.encoding import (
+    CHUNK_OFFSET_BYTES,
+    MAX_MESSAGE_SIZE,
+    BytesLike,
+    announce_chunks,
+    encode_error,
+    encode_lidar,
+    encode_stereo,
+    encode_thumbnails,
+    encode_voxel_geometry,
+    encode_voxel_rle,
+    get_camera_shape,
+    iter_chunks,
+)
+from sensorium.data_processing.camera.thumbnails import THUMBNAIL_COLUMNS, ThumbnailAtlas
 
 FIXED_PORT = 8765
+LARGE_RESPONSE = bytes(range(256)) * 20
 
 
-async def dummy_ws_handler(websocket: WebSocketServerProtocol) -> None:
+async def dummy_ws_handler(websocket: WebSocketServerProtocol) -> None:  # noqa: C901, PLR0912, PLR0915
     """Dummy WebSocket handler for testing client communication.
 
     Args:
@@ -28,36 +45,89 @@ async def dummy_ws_handler(websocket: WebSocketServerProtocol) -> None:
     """
     async for message in websocket:
         request = json.loads(message)
+        if 'cancel' in request:
+            continue  # the requests are answered right away, nothing left to cancel
         sensor_type = request.get('sensor_type')
-        if sensor_type == 'camera2':
-            dummy = np.full(client_comm.CAMERA2_SHAPE, 128, dtype=np.uint8)
+        if sensor_type == 'slow':
+            await asyncio.sleep(0.2)
+            response = b'slow'
+        elif sensor_type == 'failing':
+            await asyncio.sleep(0.1)
+            await websocket.send(encode_error('Request failed: no such frame'))
+            continue
+        elif sensor_type == 'camera2':
+            options = request.get('options', {})
+            shape = get_camera_shape(options.get('width'), options.get('height'))
+            dummy = np.full(shape, 128, dtype=np.uint8)
             response = bz2.compress(dummy.tobytes())
         elif sensor_type == 'camera3':
             dummy = np.full(client_comm.CAMERA3_SHAPE, 64, dtype=np.uint8)
             response = bz2.compress(dummy.tobytes())
+        elif sensor_type == 'stereo':
+            options = request.get('options', {})
+            shape = get_camera_shape(options.get('width'), options.get('height'))
+            response = encode_stereo(
+                np.full(shape, 128, dtype=np.uint8),
+                np.full(shape, 64, dtype=np.uint8),
+                side_by_side=options.get('layout') == 'side_by_side',
+            )
         elif sensor_type == 'lidar':
+            options = request.get('options', {})
             dummy_pc = np.full((10, 3), 1.0, dtype=np.float32)
-            dummy_labels = np.full((10, 1), 2.0, dtype=np.float32)
-            combined = dummy_pc.tobytes() + b'__SPLIT__' + dummy_labels.tobytes()
-            response = gzip.compress(combined)
+            dummy_labels = np.full((10,), 2 | (5 << 16), dtype=np.uint32)
+            response = encode_lidar(
+                dummy_pc,
+                dummy_labels,
+                encoding=options.get('encoding', 'raw'),
+                instances=bool(options.get('instances', False)),
+            )
         elif sensor_type == 'voxel':
             voxel = np.full(client_comm.VOXEL_SHAPE, 255, dtype=np.uint8)
             fov_mask = np.full(client_comm.FOV_MASK_SHAPE, fill_value=True, dtype=bool)
             t_velo_2_cam = np.full(client_comm.T_VELO_2_CAM_SHAPE, 3.14, dtype=np.float64)
-            combined = (
-                voxel.tobytes()
-                + b'__SPLIT__'
-                + fov_mask.tobytes()
-                + b'__SPLIT__'
-                + t_velo_2_cam.tobytes()
-            )
-            response = gzip.compress(combined)
+            if request.get('options', {}).get('encoding') == 'rle':
+                response = encode_voxel_rle(voxel, fov_mask, t_velo_2_cam)
+            else:
+                combined = (
+                    voxel.tobytes()
+                    + b'__SPLIT__'
+                    + fov_mask.tobytes()
+                    + b'__SPLIT__'
+                    + t_velo_2_cam.tobytes()
+                )
+                response = gzip.compress(combined)
+        elif sensor_type == 'map':
+            voxel = np.zeros(client_comm.VOXEL_SHAPE, dtype=np.uint8)
+            voxel[:2, :2, 0] = 13
+            fov_mask = np.zeros(client_comm.FOV_MASK_SHAPE, dtype=bool)
+            fov_mask[0] = True
+            t_map_2_cam = np.full(client_comm.T_VELO_2_CAM_SHAPE, request['frame_id'], dtype=float)
+            response = encode_voxel_geometry(voxel, fov_mask, t_map_2_cam)
+        elif sensor_type == 'thumbnails':
+            options = request.get('options', {})
+            atlas = ThumbnailAtlas(b'jpeg', options['step'], 3, THUMBNAIL_COLUMNS)
+            response = encode_thumbnails(atlas)
         elif sensor_type == 'trajectory':
             trajectory = np.array([7.0, 8.0, 9.0], dtype=np.float64)
             response = trajectory.tobytes()
+        elif sensor_type == 'large':
+            response = LARGE_RESPONSE
         else:
             response = b''
+        await send_dummy_response(websocket, response, request['max_size'])
+
+
+async def send_dummy_response(
+    websocket: WebSocketServerProtocol, response: bytes, max_size: int
+) -> None:
+    """Send a response, streamed in chunks if it exceeds the message limit of the client."""
+    max_chunk_size = max_size - CHUNK_OFFSET_BYTES
+    if len(response) <= max_chunk_size:
         await websocket.send(response)
+        return
+    await websocket.send(announce_chunks(len(response), max_chunk_size))
+    for chunk in iter_chunks(response, max_chunk_size):
+        await websocket.send(chunk)
 
 
 @pytest_asyncio.fixture
@@ -71,7 +141,7 @@ async def dummy_server() -> AsyncGenerator[object, None]:
         dummy_ws_handler,  # type: ignore[arg-type]
         '127.0.0.1',
         FIXED_PORT,
-        max_size=2_097_152,
+        max_size=MAX_MESSAGE_SIZE,
     )
     try:
         yield server
@@ -85,9 +155,9 @@ async def dummy_server() -> AsyncGenerator[object, None]:
 async def test_client_connect_disconnect() -> None:
     """Test that connect_client and disconnect_client correctly established."""
     await client_comm.connect_client('127.0.0.1', FIXED_PORT)
-    assert client_comm._client_manager._client is not None  # noqa: SLF001
+    assert client_comm._client_manager.connected  # noqa: SLF001
     await client_comm.disconnect_client()
-    assert client_comm._client_manager._client is None  # noqa: SLF001
+    assert not client_comm._client_manager.connected  # noqa: SLF001
 
 
 @pytest.mark.usefixtures('dummy_server')
@@ -98,6 +168,11 @@ async def test_get_camera2_data() -> None:
     data = await client_comm.get_camera2_data(0, 0)
     expected = np.full(client_comm.CAMERA2_SHAPE, 128, dtype=np.uint8)
     assert np.array_equal(data, expected)
+
+    out = np.zeros((185, 613, 3), dtype=np.uint8)
+    data = await client_comm.get_camera2_data(0, 0, out=out, size=(613, 185))
+    assert data is out
+    assert np.all(out == 128)
     await client_comm.disconnect_client()
 
 
@@ -112,6 +187,25 @@ async def test_get_camera3_data() -> None:
     await client_comm.disconnect_client()
 
 
+@pytest.mark.usefixtures('dummy_server')
+@pytest.mark.asyncio
+async def test_get_stereo_data() -> None:
+    """Test get_stereo_data for both layouts, decoding into the given buffers."""
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT)
+    image_2, image_3 = await client_comm.get_stereo_data(0, 0)
+    assert np.array_equal(image_2, np.full(client_comm.CAMERA2_SHAPE, 128, dtype=np.uint8))
+    assert np.array_equal(image_3, np.full(client_comm.CAMERA3_SHAPE, 64, dtype=np.uint8))
+
+    for layout in ('pair', 'side_by_side'):
+        out = (np.zeros((185, 613, 3), dtype=np.uint8), np.zeros((185, 613, 3), dtype=np.uint8))
+        images = await client_comm.get_stereo_data(0, 0, out=out, size=(613, 185), layout=layout)
+        assert images[0] is out[0]
+        assert images[1] is out[1]
+        assert np.all(out[0] == 128)
+        assert np.all(out[1] == 64)
+    await client_comm.disconnect_client()
+
+
 @pytest.mark.usefixtures('dummy_server')
 @pytest.mark.asyncio
 async def test_get_lidar_data() -> None:
@@ -119,9 +213,18 @@ async def test_get_lidar_data() -> None:
     await client_comm.connect_client('127.0.0.1', FIXED_PORT)
     pc, labels = await client_comm.get_lidar_data(0, 0)
     expected_pc = np.full((10, 3), 1.0, dtype=np.float32)
-    expected_labels = np.full((10, 1), 2.0, dtype=np.float32)
+    expected_labels = np.full((10,), 2, dtype=np.uint16)
     assert np.array_equal(pc, expected_pc)
     assert np.array_equal(labels, expected_labels)
+    assert labels.dtype == np.uint16
+
+    pc, labels = await client_comm.get_lidar_data(0, 0, encoding='quantized')
+    assert np.allclose(pc, expected_pc)
+    assert np.array_equal(labels, expected_labels)
+
+    pc, labels, instances = await client_comm.get_lidar_instance_data(0, 0)
+    assert np.array_equal(labels, expected_labels)
+    assert np.array_equal(instances, np.full((10,), 5, dtype=np.uint16))
     await client_comm.disconnect_client()
 
 
@@ -137,6 +240,24 @@ async def test_get_voxel_data() -> None:
     assert np.array_equal(voxel, expected_voxel)
     assert np.array_equal(fov_mask, expected_fov)
     assert np.array_equal(t_velo_2_cam, expected_t)
+
+    voxel, fov_mask, t_velo_2_cam = await client_comm.get_voxel_data(0, 0, encoding='rle')
+    assert np.array_equal(voxel, expected_voxel)
+    assert np.array_equal(fov_mask, expected_fov)
+    assert np.array_equal(t_velo_2_cam, expected_t)
+    await client_comm.disconnect_client()
+
+
+@pytest.mark.usefixtures('dummy_server')
+@pytest.mark.asyncio
+async def test_get_scene_map() -> None:
+    """Test fetching the scene map of a frame as the geometry of its occupied voxels."""
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT)
+    geometry, t_map_2_cam = await client_comm.get_scene_map(0, 7)
+    assert len(geometry.fov_labels) == 1
+    assert np.all(geometry.outfov_labels == 13)
+    assert len(geometry.outfov_labels) == 3
+    assert np.all(t_map_2_cam == 7)
     await client_comm.disconnect_client()
 
 
@@ -151,6 +272,105 @@ async def test_get_trajectory_data() -> None:
     await client_comm.disconnect_client()
 
 
+@pytest.mark.usefixtures('dummy_server')
+@pytest.mark.asyncio
+async def test_get_thumbnail_data() -> None:
+    """Test get_thumbnail_data for correct request and decoding."""
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT)
+    atlas = await client_comm.get_thumbnail_data(0, step=5)
+    assert atlas == ThumbnailAtlas(b'jpeg', step=5, num_thumbnails=3, columns=THUMBNAIL_COLUMNS)
+    await client_comm.disconnect_client()
+
+
+@pytest.mark.usefixtures('dummy_server')
+@pytest.mark.asyncio
+async def test_cancelled_request() -> None:
+    """Test that the response of a cancelled request is not taken for the next response."""
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT)
+    result: dict[str, BytesLike] = {}
+    task = asyncio.create_task(client_comm._client_manager.get_data('slow', 0, 0, result))  # noqa: SLF001
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert 'data' not in result
+
+    # The next response on the same connection must not be the stale b'slow'
+    await client_comm._client_manager.get_data('unknown', 0, 0, result)  # noqa: SLF001
+    assert result['data'] == b''
+    await client_comm.disconnect_client()
+
+
+@pytest.mark.usefixtures('dummy_server')
+@pytest.mark.asyncio
+async def test_failed_request() -> None:
+    """Test that an error response raises a RuntimeError instead of being decoded."""
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT)
+    result: dict[str, BytesLike] = {}
+    with pytest.raises(RuntimeError, match='Server error: Request failed: no such frame'):
+        await client_comm._client_manager.get_data('failing', 0, 0, result)  # noqa: SLF001
+    assert 'data' not in result
+
+    # The error of a cancelled request does not fail the next request
+    task = asyncio.create_task(client_comm._client_manager.get_data('failing', 0, 0, result))  # noqa: SLF001
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await client_comm._client_manager.get_data('unknown', 0, 0, result)  # noqa: SLF001
+    assert result['data'] == b''
+    await client_comm.disconnect_client()
+
+
+@pytest.mark.usefixtures('dummy_server')
+@pytest.mark.asyncio
+async def test_connection_pool() -> None:
+    """Test that a small reply does not wait for a slow response on another connection."""
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT)
+    manager = client_comm._client_manager  # noqa: SLF001
+    assert manager.get_connection('trajectory') is not manager.get_connection('slow')
+    result: dict[str, BytesLike] = {}
+    slow = asyncio.create_task(manager.get_data('slow', 0, 0, result))
+    await asyncio.sleep(0.05)
+    data = await asyncio.wait_for(client_comm.get_trajectory_data(0, 0), timeout=0.1)
+    assert np.array_equal(data, np.array([7.0, 8.0, 9.0], dtype=np.float64))
+    assert not slow.done()
+    await slow
+    assert result['data'] == b'slow'
+    await client_comm.disconnect_client()
+
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT)
+    with pytest.raises(RuntimeError, match='cannot be changed while the client is connected'):
+        manager.set_routes({})
+    await client_comm.disconnect_client()
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT, routes={})
+    assert list(manager.connections) == [client_comm.DEFAULT_CONNECTION]
+    await client_comm.disconnect_client()
+    manager.set_routes(client_comm.DEFAULT_ROUTES)
+
+
+@pytest.mark.usefixtures('dummy_server')
+@pytest.mark.asyncio
+async def test_chunked_response() -> None:
+    """Test that a response larger than the message limit is reassembled from its chunks."""
+    await client_comm.connect_client('127.0.0.1', FIXED_PORT, max_message_size=1000)
+    result: dict[str, BytesLike] = {}
+    await client_comm._client_manager.get_data('large', 0, 0, result)  # noqa: SLF001
+    assert isinstance(result['data'], bytearray)
+    assert result['data'] == LARGE_RESPONSE
+
+    # A cancelled streamed response is read completely before the next response
+    task = asyncio.create_task(client_comm._client_manager.get_data('large', 0, 0, result))  # noqa: SLF001
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    result.clear()
+    await client_comm._client_manager.get_data('large', 0, 0, result)  # noqa: SLF001
+    assert result['data'] == LARGE_RESPONSE
+    await client_comm.disconnect_client()
+
+
 def test_decode_camera2_data() -> None:
     """Test the decode_camera2_data function directly."""
     shape = client_comm.CAMERA2_SHAPE
@@ -171,16 +391,33 @@ def test_decode_camera3_data() -> None:
     assert np.array_equal(decoded, original)
 
 
+def test_decode_camera_data_into_buffer() -> None:
+    """Decoding into a preallocated buffer must fill and return that buffer."""
+    shape = client_comm.CAMERA2_SHAPE
+    rng = np.random.default_rng()
+    original = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    compressed = bz2.compress(original.tobytes())
+    out = np.zeros(shape, dtype=np.uint8)
+    decoded = client_comm.decode_camera2_data(compressed, out=out)
+    assert decoded is out
+    assert np.array_equal(out, original)
+
+    with pytest.raises(ValueError, match='C-contiguous'):
+        client_comm.decode_camera2_data(compressed, out=np.zeros((10, 10, 3), dtype=np.uint8))
+    with pytest.raises(ValueError, match='bytes'):
+        client_comm.decode_camera2_data(bz2.compress(original.tobytes()[:-1]), out=out)
+
+
 def test_decode_lidar_data() -> None:
     """Test the decode_lidar_data function directly."""
     rng = np.random.default_rng()
     dummy_pc = rng.random((10, 3)).astype(np.float32)
-    dummy_labels = rng.random((10, 1)).astype(np.float32)
-    combined = dummy_pc.tobytes() + b'__SPLIT__' + dummy_labels.tobytes()
-    compressed = gzip.compress(combined)
+    dummy_labels = rng.integers(0, 260, size=10, dtype=np.uint32)
+    compressed = encode_lidar(dummy_pc, dummy_labels)
     decoded_pc, decoded_labels = client_comm.decode_lidar_data(compressed)
     assert np.array_equal(decoded_pc, dummy_pc)
     assert np.array_equal(decoded_labels, dummy_labels)
+    assert decoded_labels.dtype == np.uint16
 
 
 def test_decode_voxel_message() -> None:
@@ -208,3 +445,28 @@ def test_decode_trajectory_data() -> None:
     raw = trajectory.tobytes()
     decoded = client_comm.decode_trajectory_data(raw)
     assert np.array_equal(decoded, trajectory)
+
+
+def test_quality_controller() -> None:
+    """Test that the quality is lowered on slow responses and raised again on fast ones."""
+    controller = client_comm.QualityController(target_fps=10)
+    for _ in range(client_comm.QUALITY_WINDOW):
+        controller.record('lidar', 100_000, 0.2)
+    assert controller.level.name == 'full'  # disabled
+
+    controller.enabled = True
+    for _ in range(client_comm.QUALITY_WINDOW):
+        controller.record('lidar', 100_000, 0.2)
+        controller.record('voxel', 100_000, 5.0)  # not waited for during playback
+    assert controller.level == client_comm.QUALITY_LEVELS[1]
+    assert controller.throughput > 0
+
+    for _ in range(client_comm.QUALITY_WINDOW):
+        controller.record('stereo', 100_000, 0.08)
+    assert controller.level == client_comm.QUALITY_LEVELS[1]  # within the frame time
+    for _ in range(client_comm.QUALITY_WINDOW):
+        controller.record('stereo', 10_000, 0.01)
+    assert controller.level == client_comm.QUALITY_LEVELS[0]
+
+    # the unmeasured voxels must keep their configured encoding at every level
+    assert all(level.voxel_encoding is None for level in client_comm.QUALITY_LEVELS)
@@ -0,0 +1,274 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Test module for the compact wire encodings."""
+
+import bz2
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+from sensorium.communication import encoding
+from sensorium.data_processing.camera.thumbnails import ThumbnailAtlas
+from sensorium.data_processing.voxel_process.voxel_geometry import extract_voxel_geometry
+from sensorium.data_processing.voxel_process.voxel_mesh import (
+    extract_voxel_surface,
+    surface_to_mesh,
+)
+
+
+def test_message_round_trip() -> None:
+    """Header and parts must survive encode_message and decode_message unchanged."""
+    parts = [b'abc', b'', bytes(range(256))]
+    message = encoding.encode_message({'encoding': 'test', 'num_points': 3}, parts)
+    header, decoded_parts = encoding.decode_message(message)
+    assert header['encoding'] == 'test'
+    assert header['num_points'] == 3
+    assert header['sizes'] == [3, 0, 256]
+    assert [bytes(part) for part in decoded_parts] == parts
+
+
+def test_chunks_round_trip() -> None:
+    """A message streamed in chunks must be reassembled into the preallocated buffer."""
+    message = bytes(range(256)) * 10
+    announcement = encoding.announce_chunks(len(message), 1000)
+    assert json.loads(announcement) == {'chunked': 2560, 'chunks': 3}
+    size = encoding.get_chunked_size(announcement)
+    assert size == len(message)
+
+    buffer = bytearray(size)
+    chunks = list(encoding.iter_chunks(message, 1000))
+    assert [len(chunk) for chunk in chunks] == [1008, 1008, 568]
+    # The offset header places every chunk, whatever the order of arrival
+    assert sum(encoding.write_chunk(buffer, chunk) for chunk in reversed(chunks)) == size
+    assert buffer == message
+
+    assert encoding.get_chunked_size('{"error": "Invalid request"}') is None
+    with pytest.raises(ValueError, match='exceeds the message size'):
+        encoding.write_chunk(bytearray(100), chunks[1])
+    with pytest.raises(ValueError, match='Chunk size must be positive'):
+        encoding.announce_chunks(len(message), 0)
+
+
+def test_decode_message_corrupted() -> None:
+    """A truncated message must raise a ValueError."""
+    message = encoding.encode_message({}, [b'abcdef'])
+    with pytest.raises(ValueError, match='Part sizes do not match'):
+        encoding.decode_message(message[:-1])
+
+
+def test_get_camera_shape() -> None:
+    """The image must fit into the display size, keep its aspect ratio and never grow."""
+    assert encoding.get_camera_shape() == encoding.CAMERA_SHAPE
+    assert encoding.get_camera_shape(5000, 5000) == encoding.CAMERA_SHAPE
+    assert encoding.get_camera_shape(613, 1000) == (185, 613, 3)
+    assert encoding.get_camera_shape(2000, 185) == (185, 613, 3)
+    assert encoding.get_camera_shape(1, 1) == (1, 1, 3)
+
+
+def test_get_camera_shape_of_its_shape() -> None:
+    """A shape fitted into its own size must stay the same, like a frame buffer of the client."""
+    # The width 200 gives a height of 60.4, rounded to 60, which only fits 199 pixel wide
+    assert encoding.get_camera_shape(200, 61) == (60, 199, 3)
+    for width in range(1, 1300, 7):
+        for height in range(1, 400, 3):
+            shape = encoding.get_camera_shape(width, height)
+            assert shape[0] <= height
+            assert shape[1] <= width
+            assert encoding.get_camera_shape(shape[1], shape[0]) == shape
+
+
+def test_encode_stereo() -> None:
+    """The stereo message must hold two images or one side-by-side image of the same shape."""
+    image_2 = np.full((4, 6, 3), 1, dtype=np.uint8)
+    image_3 = np.full((4, 6, 3), 2, dtype=np.uint8)
+    header, parts = encoding.decode_message(encoding.encode_stereo(image_2, image_3))
+    assert header['layout'] == 'pair'
+    assert header['shape'] == [4, 6, 3]
+    assert len(parts) == 2
+
+    header, parts = encoding.decode_message(
+        encoding.encode_stereo(image_2, image_3, side_by_side=True)
+    )
+    assert header['layout'] == 'side_by_side'
+    both = np.frombuffer(bz2.decompress(parts[0]), dtype=np.uint8).reshape(4, 12, 3)
+    assert np.array_equal(both, np.hstack([image_2, image_3]))
+
+    with pytest.raises(ValueError, match='same shape'):
+        encoding.encode_stereo(image_2, image_3[:2])
+
+
+def test_morton_order() -> None:
+    """Points must be sorted along the Z-order curve."""
+    quantized = np.array([[1, 1, 1], [0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.int16)
+    order = encoding.morton_order(quantized)
+    assert np.array_equal(order, [1, 2, 3, 4, 0])
+
+    negative = np.array([[0, 0, 0], [-1, -1, -1]], dtype=np.int16)
+    assert np.array_equal(encoding.morton_order(negative), [1, 0])
+
+
+def test_lidar_quantized_round_trip() -> None:
+    """Quantized lidar must decode to the same point set within the resolution."""
+    rng = np.random.default_rng(seed=0)
+    points = rng.uniform(-80, 80, size=(5000, 3)).astype(np.float32)
+    labels = rng.integers(0, 260, size=5000, dtype=np.uint32) | np.uint32(7 << 16)
+
+    raw = encoding.encode_lidar(points, labels, 'quantized', resolution=0.01, instances=True)
+    decoded_points, decoded_labels, decoded_instances = encoding.decode_lidar(raw)
+
+    assert decoded_points.shape == points.shape
+    assert decoded_points.dtype == np.float32
+    assert decoded_labels.dtype == np.uint16
+    # Points are reordered, so compare after sorting both sides the same way
+    order = np.lexsort(np.rint(points / 0.01).T)
+    decoded_order = np.lexsort(np.rint(decoded_points / 0.01).T)
+    assert np.allclose(decoded_points[decoded_order], points[order], atol=0.005 + 1e-4)
+    assert np.array_equal(decoded_labels[decoded_order], (labels & 0xFFFF)[order])
+    assert decoded_instances is not None
+    assert np.all(decoded_instances == 7)
+
+
+def test_lidar_raw_round_trip() -> None:
+    """Raw lidar must keep the point order and send uint16 labels with their dtype."""
+    rng = np.random.default_rng(seed=2)
+    points = rng.uniform(-80, 80, size=(100, 3)).astype(np.float32)
+    labels = rng.integers(0, 260, size=100, dtype=np.uint32) | np.uint32(3 << 16)
+
+    decoded_points, decoded_labels, decoded_instances = encoding.decode_lidar(
+        encoding.encode_lidar(points, labels)
+    )
+    assert np.array_equal(decoded_points, points)
+    assert np.array_equal(decoded_labels, labels & 0xFFFF)
+    assert decoded_labels.dtype == np.uint16
+    assert decoded_instances is None
+
+
+def test_lidar_unknown_encoding() -> None:
+    """Unknown lidar encodings must raise a ValueError."""
+    points = np.zeros((1, 3), dtype=np.float32)
+    with pytest.raises(ValueError, match='Unknown lidar encoding'):
+        encoding.encode_lidar(points, np.zeros(1, dtype=np.uint32), 'unknown')
+
+
+def test_lidar_quantized_clips_and_mismatched_labels() -> None:
+    """Out of range points are clipped, mismatched labels are sent as unlabeled."""
+    points = np.array([[1000.0, -1000.0, 0.0], [1.0, 2.0, 3.0]], dtype=np.float32)
+    decoded_points, decoded_labels, _ = encoding.decode_lidar(
+        encoding.encode_lidar(points, np.zeros((1,), dtype=np.uint32), 'quantized')
+    )
+    assert np.all(np.abs(decoded_points) <= 327.67 + 1e-3)
+    assert np.array_equal(decoded_labels, [0, 0])
+
+
+def test_lidar_quantized_is_smaller_than_raw() -> None:
+    """The quantized encoding must be clearly smaller than the gzipped float32 payload."""
+    rng = np.random.default_rng(seed=1)
+    angles = rng.uniform(0, 2 * np.pi, size=50000)
+    ranges = rng.uniform(3, 60, size=50000)
+    points = np.stack(
+        [ranges * np.cos(angles), ranges * np.sin(angles), rng.normal(-1.5, 0.5, size=50000)],
+        axis=1,
+    ).astype(np.float32)
+    labels = rng.integers(0, 20, size=50000, dtype=np.uint32)
+
+    raw_size = len(gzip.compress(points.tobytes() + b'__SPLIT__' + labels.tobytes()))
+    quantized_size = len(encoding.encode_lidar(points, labels, 'quantized'))
+    assert quantized_size * 2 < raw_size
+
+
+def test_run_length_round_trip() -> None:
+    """Run-length encoding must be lossless and merge equal neighbours."""
+    values = np.array([0, 0, 0, 5, 5, 255, 0, 0], dtype=np.uint8)
+    run_values, run_lengths = encoding.run_length_encode(values)
+    assert np.array_equal(run_values, [0, 5, 255, 0])
+    assert np.array_equal(run_lengths, [3, 2, 1, 2])
+    assert np.array_equal(encoding.run_length_decode(run_values, run_lengths), values)
+
+    empty_values, empty_lengths = encoding.run_length_encode(np.zeros(0, dtype=np.uint8))
+    assert empty_values.size == 0
+    assert empty_lengths.size == 0
+
+
+def test_voxel_rle_round_trip() -> None:
+    """The run-length encoded voxel message must decode to the original arrays."""
+    rng = np.random.default_rng(seed=3)
+    voxel = np.zeros((256, 256, 32), dtype=np.uint8)
+    voxel[:, :, :4] = 9
+    voxel[100:200, 100:180, 4:12] = 255
+    voxel[50:60, 50:70, 4:10] = rng.integers(1, 20, size=(10, 20, 6), dtype=np.uint8)
+    fov_mask = np.zeros(voxel.size, dtype=np.bool_)
+    fov_mask[1000:900000] = True
+    t_velo_2_cam = rng.random((4, 4))
+
+    raw = encoding.encode_voxel_rle(voxel, fov_mask, t_velo_2_cam)
+    decoded_voxel, decoded_fov_mask, decoded_t_velo_2_cam = encoding.decode_voxel_rle(raw)
+    assert np.array_equal(decoded_voxel, voxel)
+    assert np.array_equal(decoded_fov_mask, fov_mask)
+    assert decoded_fov_mask.dtype == np.bool_
+    assert np.array_equal(decoded_t_velo_2_cam, t_velo_2_cam)
+
+    dense_size = voxel.nbytes + fov_mask.nbytes + t_velo_2_cam.nbytes
+    assert len(raw) * 10 < dense_size
+
+
+def test_voxel_geometry_round_trip() -> None:
+    """The geometry message must decode to the same voxels as the client side extraction."""
+    rng = np.random.default_rng(seed=4)
+    voxel = rng.choice(np.array([0, 3, 9, 255], dtype=np.uint8), size=(256, 256, 32))
+    fov_mask = rng.random(voxel.size) < 0.3
+    t_velo_2_cam = rng.random((4, 4))
+
+    geometry, decoded_t_velo_2_cam = encoding.decode_voxel_geometry(
+        encoding.encode_voxel_geometry(voxel, fov_mask, t_velo_2_cam)
+    )
+    expected = extract_voxel_geometry(voxel, fov_mask)
+    assert np.allclose(geometry.fov_centres, expected.fov_centres)
+    assert np.allclose(geometry.outfov_centres, expected.outfov_centres)
+    assert np.array_equal(geometry.fov_labels, expected.fov_labels)
+    assert np.array_equal(geometry.outfov_labels, expected.outfov_labels)
+    assert geometry.fov_centres.dtype == np.float32
+    assert np.array_equal(decoded_t_velo_2_cam, t_velo_2_cam)
+
+
+def test_voxel_mesh_round_trip() -> None:
+    """The mesh message must decode to the mesh of the locally extracted surface."""
+    rng = np.random.default_rng(seed=6)
+    voxel = rng.choice(np.array([0, 3, 9, 255], dtype=np.uint8), size=(32, 32, 8))
+    fov_mask = rng.random(voxel.size) < 0.5
+    t_velo_2_cam = rng.random((4, 4))
+
+    mesh, decoded_t_velo_2_cam = encoding.decode_voxel_mesh(
+        encoding.encode_voxel_mesh(voxel, fov_mask, t_velo_2_cam)
+    )
+    expected = surface_to_mesh(extract_voxel_surface(voxel, fov_mask))
+    assert np.allclose(mesh.positions, expected.positions)
+    assert np.array_equal(mesh.indices, expected.indices)
+    assert np.array_equal(mesh.labels, expected.labels)
+    assert np.array_equal(mesh.in_fov, expected.in_fov)
+    assert np.array_equal(decoded_t_velo_2_cam, t_velo_2_cam)
+
+
+def test_thumbnails_round_trip() -> None:
+    """The JPEG atlas and its layout must survive encode_thumbnails and decode_thumbnails."""
+    atlas = ThumbnailAtlas(b'\xff\xd8jpeg', step=10, num_thumbnails=401, columns=20)
+    assert encoding.decode_thumbnails(encoding.encode_thumbnails(atlas)) == atlas
+
+    with pytest.raises(ValueError, match='Unexpected thumbnail message format'):
+        encoding.decode_thumbnails(encoding.encode_message({'encoding': 'stereo'}, [b'']))
+
+
+def test_stream_frame_round_trip() -> None:
+    """The responses of a pushed frame must be decoded per sensor."""
+    responses = {'camera2': b'image', 'trajectory': bytes(24)}
+    frame = encoding.decode_stream_frame(encoding.encode_stream_frame(3, 42, responses))
+    assert (frame.seq_id, frame.frame_id, frame.error) == (3, 42, '')
+    assert {sensor: bytes(data) for sensor, data in frame.data.items()} == responses
+
+    frame = encoding.decode_stream_frame(encoding.encode_stream_frame(3, 43, {}, 'No frame'))
+    assert frame.data == {}
+    assert frame.error == 'No frame'
+    with pytest.raises(ValueError, match='Unexpected stream frame format'):
+        encoding.decode_stream_frame(encoding.encode_message({'encoding': 'stereo'}, []))
@@ -3,99 +3,127 @@
 
 """Test module for server communication."""
 
+import asyncio
 import bz2
 import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import numpy as np
 import pytest
+import websockets
 from numpy.typing import NDArray
 
-from sensorium.communication import server_comm
-
-
-def dummy_process_camera2(seq_id: int, frame_id: int) -> dict[str, NDArray[np.uint8]]:
+from sensorium.communication import client_comm, server_comm
+from sensorium.communication.encoding import (
+    decode_lidar,
+    decode_message,
+    decode_thumbnails,
+    decode_voxel_geometry,
+    decode_voxel_mesh,
+    decode_voxel_rle,
+)
+from sensorium.data_processing.camera.thumbnails import ThumbnailAtlas
+
+
+def dummy_process_camera2(
+    seq_id: int, frame_id: int, client_id: int | None = None
+) -> dict[str, NDArray[np.uint8]]:
     """Dummy backend process function for camera2.
 
     Args:
         seq_id: Sequence identifier.
         frame_id: Frame identifier.
+        client_id: Client identifier.
 
     Returns:
         A dictionary containing a dummy 'image_2' NumPy array.
     """
-    del seq_id, frame_id
+    del seq_id, frame_id, client_id
     dummy_image: NDArray[np.uint8] = np.full((370, 1226, 3), 255, dtype=np.uint8)
     return {'image_2': dummy_image}
 
 
-def dummy_process_camera3(seq_id: int, frame_id: int) -> dict[str, NDArray[np.uint8]]:
+def dummy_process_camera3(
+    seq_id: int, frame_id: int, client_id: int | None = None
+) -> dict[str, NDArray[np.uint8]]:
     """Dummy backend process function for camera3.
 
     Args:
         seq_id: Sequence identifier.
         frame_id: Frame identifier.
+        client_id: Client identifier.
 
     Returns:
         A dictionary containing a dummy 'image_3' NumPy array.
     """
-    del seq_id, frame_id
+    del seq_id, frame_id, client_id
     dummy_image: NDArray[np.uint8] = np.full((370, 1226, 3), 100, dtype=np.uint8)
     return {'image_3': dummy_image}
 
 
-def dummy_process_lidar(seq_id: int, frame_id: int) -> dict[str, NDArray[np.float32]]:
+def dummy_process_lidar(
+    seq_id: int, frame_id: int, client_id: int | None = None
+) -> dict[str, NDArray[np.float32]]:
     """Dummy backend process function for lidar.
 
     Args:
         seq_id: Sequence identifier.
         frame_id: Frame identifier.
+        client_id: Client identifier.
 
     Returns:
         A dictionary containing dummy 'lidar_pc' and 'lidar_pc_labels' arrays.
     """
-    del seq_id, frame_id
+    del seq_id, frame_id, client_id
     dummy_pc: NDArray[np.float32] = np.full((10, 3), 1.0, dtype=np.float32)
     dummy_labels: NDArray[np.float32] = np.full((10, 1), 2.0, dtype=np.float32)
     return {'lidar_pc': dummy_pc, 'lidar_pc_labels': dummy_labels}
 
 
 def dummy_process_voxel(
-    seq_id: int, frame_id: int
+    seq_id: int, frame_id: int, client_id: int | None = None
 ) -> dict[str, NDArray[np.uint8 | np.bool_ | np.float64]]:
     """Dummy backend process function for voxel.
 
     Args:
         seq_id: Sequence identifier.
         frame_id: Frame identifier.
+        client_id: Client identifier.
 
     Returns:
         A dictionary containing dummy 'voxel', 'fov_mask', and 't_velo_2_cam' arrays.
     """
-    del seq_id, frame_id
+    del seq_id, frame_id, client_id
     voxel: NDArray[np.uint8] = np.full((256, 256, 32), 77, dtype=np.uint8)
     fov_mask: NDArray[np.bool_] = np.full((2097152,), fill_value=True, dtype=np.bool_)
     t_velo_2_cam: NDArray[np.float64] = np.full((4, 4), 3.14, dtype=np.float64)
     return {'voxel': voxel, 'fov_mask': fov_mask, 't_velo_2_cam': t_velo_2_cam}
 
 
-def dummy_process_trajectory(seq_id: int, frame_id: int) -> dict[str, NDArray[np.float64]]:
+def dummy_process_trajectory(
+    seq_id: int, frame_id: int, client_id: int | None = None
+) -> dict[str, NDArray[np.float64]]:
     """Dummy backend process function for trajectory.
 
     Args:
         seq_id: Sequence identifier.
         frame_id: Frame identifier.
+        client_id: Client identifier.
 
     Returns:
         A dictionary containing a dummy 'trajectory' array.
     """
-    del seq_id, frame_id
+    del seq_id, frame_id, client_id
     trajectory: NDArray[np.float64] = np.array([7.0, 8.0, 9.0], dtype=np.float64)
     return {'trajectory': trajectory}
 
 
 def test_create_response_camera2(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test that create_response correctly compresses and returns a response for camera2."""
-    monkeypatch.setattr(server_comm.backend_engine, 'process', dummy_process_camera2)
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_camera2)
     response = server_comm.create_response('camera2', 0, 0)
     decompressed = bz2.decompress(response)
     expected = np.full((370, 1226, 3), 255, dtype=np.uint8).tobytes()
@@ -104,29 +132,90 @@ def test_create_response_camera2(monkeypatch: pytest.MonkeyPatch) -> None:
 
 def test_create_response_camera3(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test that create_response correctly compresses and returns a response for camera3."""
-    monkeypatch.setattr(server_comm.backend_engine, 'process', dummy_process_camera3)
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_camera3)
     response = server_comm.create_response('camera3', 0, 0)
     decompressed = bz2.decompress(response)
     expected = np.full((370, 1226, 3), 100, dtype=np.uint8).tobytes()
     assert decompressed == expected
 
 
+def test_create_response_camera_resized(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that camera images are resized to the requested size once per frame and size."""
+    calls: list[tuple[int, int, str, int | None]] = []
+
+    def counting_load_image(
+        seq_id: int, frame_id: int, camera: str, *, client_id: int | None = None
+    ) -> tuple[NDArray[np.uint8], bool]:
+        calls.append((seq_id, frame_id, camera, client_id))
+        # Frame 9 is missing, its image is taken from the buffer memory of the client
+        return np.full((376, 1241, 3), 255, dtype=np.uint8), frame_id == 9
+
+    server_comm.camera_cache.clear()
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'load_image', counting_load_image)
+    options: dict[str, str | int | float] = {'width': 613, 'height': 400}
+    response = server_comm.create_response('camera2', 0, 0, options, client_id=1)
+    assert server_comm.create_response('camera2', 0, 0, options, client_id=2) is response
+    assert calls == [(0, 0, 'image_2', 1)]
+    server_comm.create_response('camera2', 0, 0, {'width': 306, 'height': 400})
+    assert len(calls) == 2
+
+    # The buffered image of one client is not served to the others
+    server_comm.create_response('camera2', 0, 9, options, client_id=1)
+    server_comm.create_response('camera2', 0, 9, options, client_id=2)
+    assert calls[2:] == [(0, 9, 'image_2', 1), (0, 9, 'image_2', 2)]
+    assert len(server_comm.camera_cache) == 2
+    server_comm.camera_cache.clear()
+
+    decompressed = bz2.decompress(response)
+    assert decompressed == np.full((185, 613, 3), 255, dtype=np.uint8).tobytes()
+
+
+def test_create_response_stereo(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a stereo response packs both camera images, resized to the requested size."""
+
+    def dummy_load_images(
+        seq_id: int, frame_id: int, client_id: int | None = None
+    ) -> tuple[NDArray[np.uint8], ...]:
+        del client_id
+        return (
+            dummy_process_camera2(seq_id, frame_id)['image_2'],
+            dummy_process_camera3(seq_id, frame_id)['image_3'],
+        )
+
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'load_images', dummy_load_images)
+    header, parts = decode_message(server_comm.create_response('stereo', 0, 0))
+    assert header['layout'] == 'pair'
+    assert header['shape'] == [370, 1226, 3]
+    assert bz2.decompress(parts[1]) == np.full((370, 1226, 3), 100, dtype=np.uint8).tobytes()
+
+    options: dict[str, str | int | float] = {'width': 613, 'height': 185, 'layout': 'side_by_side'}
+    header, parts = decode_message(server_comm.create_response('stereo', 0, 0, options))
+    assert header['layout'] == 'side_by_side'
+    assert header['shape'] == [185, 613, 3]
+    both = np.frombuffer(bz2.decompress(parts[0]), dtype=np.uint8).reshape(185, 1226, 3)
+    assert np.all(both[:, :613] == 255)
+    assert np.all(both[:, 613:] == 100)
+
+
 def test_create_response_lidar(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test that create_response correctly compresses and returns a response for lidar."""
-    monkeypatch.setattr(server_comm.backend_engine, 'process', dummy_process_lidar)
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_lidar)
     response = server_comm.create_response('lidar', 0, 0)
-    decompressed = gzip.decompress(response)
-    parts = decompressed.split(b'__SPLIT__')
-    assert len(parts) == 2
-    expected_pc = np.full((10, 3), 1.0, dtype=np.float32).tobytes()
-    expected_labels = np.full((10, 1), 2.0, dtype=np.float32).tobytes()
-    assert parts[0] == expected_pc
-    assert parts[1] == expected_labels
+    points, labels, instances = decode_lidar(response)
+    assert np.array_equal(points, np.full((10, 3), 1.0, dtype=np.float32))
+    assert np.array_equal(labels, np.full((10,), 2, dtype=np.uint16))
+    assert labels.dtype == np.uint16
+    assert instances is None
+
+    response = server_comm.create_response('lidar', 0, 0, {'instances': 1})
+    _, _, instances = decode_lidar(response)
+    assert instances is not None
+    assert np.array_equal(instances, np.zeros((10,), dtype=np.uint16))
 
 
 def test_create_response_voxel(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test that create_response correctly compresses and returns a response for voxel."""
-    monkeypatch.setattr(server_comm.backend_engine, 'process', dummy_process_voxel)
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_voxel)
     response = server_comm.create_response('voxel', 0, 0)
     decompressed = gzip.decompress(response)
     parts = decompressed.split(b'__SPLIT__')
@@ -141,7 +230,7 @@ def test_create_response_voxel(monkeypatch: pytest.MonkeyPatch) -> None:
 
 def test_create_response_trajectory(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test that create_response correctly returns a response for trajectory."""
-    monkeypatch.setattr(server_comm.backend_engine, 'process', dummy_process_trajectory)
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_trajectory)
     response = server_comm.create_response('trajectory', 0, 0)
     expected = np.array([7.0, 8.0, 9.0], dtype=np.float64).tobytes()
     assert response == expected
@@ -149,6 +238,482 @@ def test_create_response_trajectory(monkeypatch: pytest.MonkeyPatch) -> None:
 
 def test_create_response_unknown_sensor(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test that create_response raises a ValueError for an unknown sensor type."""
-    monkeypatch.setattr(server_comm.backend_engine, 'process', dummy_process_camera2)
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_camera2)
     with pytest.raises(ValueError, match='Unknown sensor type'):
         server_comm.create_response('invalid_sensor', 0, 0)
+
+
+def test_create_response_lidar_quantized(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that create_response honours the quantized lidar encoding option."""
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_lidar)
+    response = server_comm.create_response('lidar', 0, 0, {'encoding': 'quantized'})
+    points, labels, _ = decode_lidar(response)
+    assert np.allclose(points, np.full((10, 3), 1.0, dtype=np.float32))
+    assert labels.dtype == np.uint16
+    assert labels.shape == (10,)
+
+
+def test_create_response_lidar_subsample(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that create_response only sends every n-th point with its label."""
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_lidar)
+    response = server_comm.create_response('lidar', 0, 0, {'subsample': 3})
+    points, labels, _ = decode_lidar(response)
+    assert points.shape == (4, 3)
+    assert labels.shape == (4,)
+
+
+def test_create_response_voxel_rle(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that create_response run-length encodes the voxel message on request."""
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_voxel)
+    dense = server_comm.create_response('voxel', 0, 0)
+    response = server_comm.create_response('voxel', 0, 0, {'encoding': 'rle'})
+    voxel, fov_mask, t_velo_2_cam = decode_voxel_rle(response)
+    assert np.array_equal(voxel, np.full((256, 256, 32), 77, dtype=np.uint8))
+    assert np.array_equal(fov_mask, np.full((2097152,), fill_value=True, dtype=bool))
+    assert np.array_equal(t_velo_2_cam, np.full((4, 4), 3.14, dtype=np.float64))
+    assert len(response) < len(dense)
+
+
+def test_create_response_voxel_geometry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that create_response sends only the occupied voxels on request."""
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'process', dummy_process_voxel)
+    response = server_comm.create_response('voxel', 0, 0, {'encoding': 'geometry'})
+    geometry, t_velo_2_cam = decode_voxel_geometry(response)
+    assert geometry.fov_centres.shape == (2097152, 3)
+    assert np.all(geometry.fov_labels == 77)
+    assert geometry.outfov_centres.shape == (0, 3)
+    assert np.array_equal(t_velo_2_cam, np.full((4, 4), 3.14, dtype=np.float64))
+
+
+def monkeypatch_voxel_loading(
+    monkeypatch: pytest.MonkeyPatch, calls: list[tuple[int, int, int | None]]
+) -> None:
+    """Load the dummy voxel grid, frame 10 is missing and taken from the buffer memory."""
+
+    def counting_load_voxel(
+        seq_id: int, frame_id: int, *, client_id: int | None = None
+    ) -> tuple[NDArray[np.uint8], bool]:
+        calls.append((seq_id, frame_id, client_id))
+        return np.asarray(dummy_process_voxel(seq_id, frame_id)['voxel']), frame_id == 10
+
+    def dummy_get_static_data(
+        seq_id: int,
+    ) -> dict[str, NDArray[np.uint8 | np.bool_ | np.float64]]:
+        data = dummy_process_voxel(seq_id, 0)
+        return {'fov_mask': data['fov_mask'], 't_velo_2_cam': data['t_velo_2_cam']}
+
+    engine = server_comm.get_backend_engine()
+    monkeypatch.setattr(engine, 'load_voxel', counting_load_voxel)
+    monkeypatch.setattr(engine, 'get_static_data', dummy_get_static_data)
+
+
+def test_create_response_voxel_mesh_is_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the meshed voxel surface is computed once per frame."""
+    calls: list[tuple[int, int, int | None]] = []
+    monkeypatch_voxel_loading(monkeypatch, calls)
+
+    server_comm.voxel_mesh_cache.clear()
+    response = server_comm.create_response('voxel', 0, 5, {'encoding': 'mesh'}, client_id=1)
+    assert server_comm.create_response('voxel', 0, 5, {'encoding': 'mesh'}) is response
+    assert calls == [(0, 5, 1)]
+    # The buffered voxel grid of a missing frame is not cached
+    server_comm.create_response('voxel', 0, 10, {'encoding': 'mesh'}, client_id=1)
+    server_comm.create_response('voxel', 0, 10, {'encoding': 'mesh'}, client_id=2)
+    assert calls[1:] == [(0, 10, 1), (0, 10, 2)]
+    server_comm.voxel_mesh_cache.clear()
+
+    mesh, t_velo_2_cam = decode_voxel_mesh(response)
+    # The full grid of class 77 is one box with one rectangle per side
+    assert mesh.indices.shape == (6, 4)
+    assert np.all(mesh.labels == 77)
+    assert np.array_equal(t_velo_2_cam, np.full((4, 4), 3.14, dtype=np.float64))
+
+
+def test_create_response_map(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that create_response encodes the scene map like a voxel grid."""
+    frames: list[tuple[int, int]] = []
+
+    def dummy_process_scene_map(
+        seq_id: int, frame_id: int, *, client_id: int | None = None
+    ) -> dict[str, NDArray[np.uint8 | np.bool_ | np.float64]]:
+        assert client_id == 5
+        frames.append((seq_id, frame_id))
+        return dummy_process_voxel(seq_id, frame_id)
+
+    monkeypatch.setattr(
+        server_comm.get_backend_engine(), 'process_scene_map', dummy_process_scene_map
+    )
+    geometry, t_map_2_cam = decode_voxel_geometry(
+        server_comm.create_response('map', 0, 7, client_id=5)
+    )
+    assert np.all(geometry.fov_labels == 77)
+    assert np.array_equal(t_map_2_cam, np.full((4, 4), 3.14, dtype=np.float64))
+    mesh, _ = decode_voxel_mesh(
+        server_comm.create_response('map', 0, 8, {'encoding': 'mesh'}, client_id=5)
+    )
+    assert mesh.indices.shape == (6, 4)
+    assert frames == [(0, 7), (0, 8)]
+    with pytest.raises(ValueError, match='Unknown scene map encoding'):
+        server_comm.create_response('map', 0, 8, {'encoding': 'dense'}, client_id=5)
+
+
+def test_create_response_thumbnails(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the thumbnail atlas of the sequence is sent with its layout."""
+    requested: list[tuple[int | str, int, int]] = []
+
+    def dummy_load_thumbnails(sequence_id: int | str, step: int, width: int) -> ThumbnailAtlas:
+        requested.append((sequence_id, step, width))
+        return ThumbnailAtlas(b'jpeg', step=step, num_thumbnails=3, columns=20)
+
+    monkeypatch.setattr(server_comm.get_backend_engine(), 'load_thumbnails', dummy_load_thumbnails)
+    response = server_comm.create_response('thumbnails', 4, 0, {'step': 5, 'width': 80})
+    assert requested == [(4, 5, 80)]
+    assert decode_thumbnails(response) == ThumbnailAtlas(
+        b'jpeg', step=5, num_thumbnails=3, columns=20
+    )
+
+    def missing_load_thumbnails(sequence_id: int | str, step: int, width: int) -> ThumbnailAtlas:
+        msg = f'No camera images of {sequence_id} for {step}/{width}'
+        raise FileNotFoundError(msg)
+
+    monkeypatch.setattr(
+        server_comm.get_backend_engine(), 'load_thumbnails', missing_load_thumbnails
+    )
+    with pytest.raises(ValueError, match='No thumbnails for sequence 4'):
+        server_comm.create_response('thumbnails', 4, 0)
+
+
+def test_server_context(tmp_path: Path) -> None:
+    """The settings and the backend engine must be created on first use, after configuring."""
+    config_file = tmp_path / 'sensorium.yaml'
+    config_file.write_text(
+        'backend_engine:\n  data_dir: kitti\ncommunication:\n  chunk_size: 1024\n'
+    )
+    config = server_comm.load_server_config(config_file)
+    assert config == server_comm.ServerConfig('kitti', chunk_size=1024)
+
+    context = server_comm.ServerContext()
+    context.configure(config._replace(static_data_cache_size=2))
+    engine = context.backend_engine
+    assert context.backend_engine is engine
+    assert (engine.data_dir, engine.static_data_cache_size) == ('kitti', 2)
+    context.configure(config)
+    assert context.backend_engine is not engine
+
+
+def test_configure_clears_cached_responses(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The cached responses of the previous data must be dropped when the server is configured."""
+    server_comm.voxel_mesh_cache.clear()
+    server_comm.camera_cache.clear()
+    monkeypatch_voxel_loading(monkeypatch, [])
+    server_comm.create_response('voxel', 0, 5, {'encoding': 'mesh'})
+    assert len(server_comm.voxel_mesh_cache) == 1
+    monkeypatch.setattr(
+        server_comm.get_backend_engine(),
+        'load_image',
+        lambda *_, **__: (np.zeros((376, 1241, 3), dtype=np.uint8), False),
+    )
+    server_comm.create_response('camera2', 0, 5, {'width': 613, 'height': 185})
+    assert len(server_comm.camera_cache) == 1
+
+    server_comm.ServerContext().configure(server_comm.ServerConfig('other'))
+    assert len(server_comm.voxel_mesh_cache) == 0
+    assert len(server_comm.camera_cache) == 0
+
+
+class RecordingWebSocket:
+    """Records the sent messages instead of sending them."""
+
+    def __init__(self) -> None:
+        """Start without messages."""
+        self.messages: list[str | bytes] = []
+
+    async def send(self, message: str | bytes) -> None:
+        """Record a message."""
+        self.messages.append(message)
+
+
+@pytest.mark.asyncio
+async def test_send_response_chunked() -> None:
+    """Test that a response larger than a chunk is announced and streamed in chunks."""
+    websocket = RecordingWebSocket()
+    await server_comm.send_response(websocket, b'small', max_chunk_size=10)  # type: ignore[arg-type]
+    assert websocket.messages == [b'small']
+
+    websocket = RecordingWebSocket()
+    response = bytes(range(25))
+    await server_comm.send_response(websocket, response, max_chunk_size=10)  # type: ignore[arg-type]
+    announcement, *chunks = websocket.messages
+    assert isinstance(announcement, str)
+    assert json.loads(announcement) == {'chunked': 25, 'chunks': 3}
+    assert chunks[2] == (20).to_bytes(8, 'little') + response[20:]
+
+
+@pytest.mark.asyncio
+async def test_handle_client_cancelled_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a cancelled request gets an empty response and the next one is answered."""
+
+    def slow_create_response(
+        sensor_type: str,
+        seq_id: int,
+        frame_id: int,
+        options: dict[str, object],
+        client_id: int | None = None,
+    ) -> bytes:
+        del options, client_id
+        time.sleep(0.2)
+        return f'{sensor_type} {seq_id}/{frame_id}'.encode()
+
+    monkeypatch.setattr(server_comm, 'create_response', slow_create_response)
+    server = await websockets.serve(server_comm.handle_client, '127.0.0.1', 8766)
+    try:
+        async with websockets.connect('ws://127.0.0.1:8766') as websocket:
+            for request_id, frame_id in ((1, 10), (2, 11)):
+                request = {'sensor_type': 'camera2', 'seq_id': 0, 'frame_id': frame_id}
+                await websocket.send(json.dumps({**request, 'request_id': request_id}))
+            await websocket.send(json.dumps({'cancel': 1}))
+            assert await websocket.recv() == b''
+            assert await websocket.recv() == b'camera2 0/11'
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_handle_client_connections_in_parallel(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a small request is answered while a slow one of another connection runs."""
+
+    def slow_voxel_create_response(
+        sensor_type: str,
+        seq_id: int,
+        frame_id: int,
+        options: dict[str, object],
+        client_id: int | None = None,
+    ) -> bytes:
+        del seq_id, frame_id, options, client_id
+        if sensor_type == 'voxel':
+            time.sleep(1)
+        return sensor_type.encode()
+
+    monkeypatch.setattr(server_comm, 'create_response', slow_voxel_create_response)
+    server = await websockets.serve(server_comm.handle_client, '127.0.0.1', 8771)
+    try:
+        async with (
+            websockets.connect('ws://127.0.0.1:8771') as voxel_connection,
+            websockets.connect('ws://127.0.0.1:8771') as small_connection,
+        ):
+            await voxel_connection.send(json.dumps({'sensor_type': 'voxel'}))
+            await asyncio.sleep(0.05)  # the voxel response is computed now
+            start_time = time.perf_counter()
+            await small_connection.send(json.dumps({'sensor_type': 'trajectory'}))
+            assert await small_connection.recv() == b'trajectory'
+            assert time.perf_counter() - start_time < 0.5
+            assert await voxel_connection.recv() == b'voxel'
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_handle_client_failed_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a bad or failing request gets an error response and the next one is answered."""
+
+    def failing_create_response(
+        sensor_type: str,
+        seq_id: int,
+        frame_id: int,
+        options: dict[str, object],
+        client_id: int | None = None,
+    ) -> bytes:
+        del options, client_id
+        if frame_id == 404:
+            msg = f'No frame {frame_id}'
+            raise FileNotFoundError(msg)
+        return f'{sensor_type} {seq_id}/{frame_id}'.encode()
+
+    monkeypatch.setattr(server_comm, 'create_response', failing_create_response)
+    server = await websockets.serve(server_comm.handle_client, '127.0.0.1', 8769)
+    try:
+        async with websockets.connect('ws://127.0.0.1:8769') as websocket:
+            await websocket.send(json.dumps({'sensor_type': 'camera2', 'seq_id': 'x'}))
+            assert json.loads(await websocket.recv())['error'].startswith('Invalid request')
+            await websocket.send(json.dumps([1, 2]))
+            assert json.loads(await websocket.recv())['error'].startswith('Invalid request')
+            await websocket.send(json.dumps({'sensor_type': 'camera2', 'frame_id': 404}))
+            error = json.loads(await websocket.recv())['error']
+            assert error == 'Request failed: No frame 404'
+            await websocket.send(json.dumps({'sensor_type': 'camera2', 'seq_id': 0, 'frame_id': 5}))
+            assert await websocket.recv() == b'camera2 0/5'
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_client_failed_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the client raises the error of a failed request, and gets the next response."""
+
+    def failing_create_response(
+        sensor_type: str,
+        seq_id: int,
+        frame_id: int,
+        options: dict[str, object],
+        client_id: int | None = None,
+    ) -> bytes:
+        del sensor_type, seq_id, options, client_id
+        if frame_id == 404:
+            msg = f'No frame {frame_id}'
+            raise FileNotFoundError(msg)
+        return np.array([1.0, 2.0, 3.0]).tobytes()
+
+    monkeypatch.setattr(server_comm, 'create_response', failing_create_response)
+    server = await websockets.serve(server_comm.handle_client, '127.0.0.1', 8773)
+    try:
+        await client_comm.connect_client('127.0.0.1', 8773)
+        with pytest.raises(RuntimeError, match='Request failed: No frame 404'):
+            await client_comm.get_trajectory_data(0, 404)
+        trajectory = await client_comm.get_trajectory_data(0, 5)
+        np.testing.assert_array_equal(trajectory, [1.0, 2.0, 3.0])
+    finally:
+        await client_comm.disconnect_client()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_worker_failure_closes_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the connection is closed if its requests are not answered anymore."""
+
+    async def failing_answer_requests(*args: object) -> None:
+        del args
+        msg = 'worker failed'
+        raise RuntimeError(msg)
+
+    monkeypatch.setattr(server_comm, 'answer_requests', failing_answer_requests)
+    server = await websockets.serve(server_comm.handle_client, '127.0.0.1', 8770)
+    try:
+        async with websockets.connect('ws://127.0.0.1:8770') as websocket:
+            await asyncio.wait_for(websocket.wait_closed(), timeout=5)
+            assert websocket.close_code == 1011
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_frame_stream(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the frames of a subscription are pushed until the end of the sequence."""
+
+    def frame_response(
+        sensor_type: str,
+        seq_id: int,
+        frame_id: int,
+        options: dict[str, object] | None,
+        client_id: int | None = None,
+    ) -> bytes:
+        del client_id
+        return f'{sensor_type} {seq_id}/{frame_id} {options}'.encode()
+
+    monkeypatch.setattr(server_comm, 'create_response', frame_response)
+    monkeypatch.setattr(server_comm, 'get_num_frames', lambda _: 13)
+    server = await websockets.serve(server_comm.handle_client, '127.0.0.1', 8767)
+    try:
+        await client_comm.connect_client('127.0.0.1', 8767)
+        subscription = await client_comm.subscribe(
+            2, 10, 20, ['trajectory', 'lidar'], {'lidar': {'encoding': 'quantized'}}
+        )
+        frames = [await subscription.receive() for _ in range(3)]
+        assert [frame.frame_id for frame in frames] == [10, 11, 12]
+        assert bytes(frames[0].data['trajectory']) == b'trajectory 2/10 None'
+        assert bytes(frames[0].data['lidar']) == b"lidar 2/10 {'encoding': 'quantized'}"
+        end = await subscription.receive()
+        assert (end.frame_id, end.data) == (13, {})
+        assert end.error == 'End of sequence 2, its last frame is 12'
+
+        # The stream stays at the end until it is moved on
+        await subscription.seek(1)
+        await subscription.resume()
+        frame = await subscription.receive()
+        assert (frame.seq_id, frame.frame_id) == (2, 1)
+        await subscription.pause()
+        await subscription.set_rate(0)
+        error = await subscription.receive()
+        assert 'Stream rate must be positive' in error.error
+
+        await subscription.unsubscribe()
+        assert not subscription.connected
+    finally:
+        await client_comm.disconnect_client()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_frame_stream_end_of_sequence(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a stream of the backend engine pauses after the last frame of a sequence."""
+    sequence_path = tmp_path / 'sequences' / '07'
+    sequence_path.mkdir(parents=True)
+    identity = '1 0 0 0 0 1 0 0 0 0 1 0'
+    (sequence_path / 'calib.txt').write_text(f'P2: {identity}\nTr: {identity}\n')
+    (sequence_path / 'poses.txt').write_text(
+        ''.join(f'1 0 0 {x} 0 1 0 0 0 0 1 0\n' for x in range(3))
+    )
+    context = server_comm.ServerContext()
+    context.configure(server_comm.ServerConfig(str(tmp_path)))
+    monkeypatch.setattr(server_comm, '_server_context', context)
+    # Processed before, so the first frame is not late and no frame is dropped
+    context.backend_engine.get_static_data(7)
+
+    server = await websockets.serve(server_comm.handle_client, '127.0.0.1', 8772)
+    try:
+        await client_comm.connect_client('127.0.0.1', 8772)
+        subscription = await client_comm.subscribe(7, 1, 10, ['trajectory'], {})
+        frames = [await asyncio.wait_for(subscription.receive(), 5) for _ in range(3)]
+        assert [frame.frame_id for frame in frames] == [1, 2, 3]
+        assert client_comm.decode_trajectory_data(frames[1].data['trajectory']).ravel()[0] == 2
+        assert frames[2].error == 'End of sequence 7, its last frame is 2'
+
+        # A frame that fails in the backend engine pauses the stream too, instead of ending it:
+        # frame 0 has a voxel grid, but neither its file nor a buffered one exists
+        await subscription.seek(0)
+        await subscription.resume()
+        failed = await asyncio.wait_for(subscription.receive(), 5)
+        assert (failed.frame_id, failed.data) == (0, {})
+        assert failed.error
+        await subscription.seek(2)
+        await subscription.resume()
+        frame = await asyncio.wait_for(subscription.receive(), 5)
+        assert (frame.frame_id, frame.error) == (2, '')
+        await subscription.unsubscribe()
+    finally:
+        await client_comm.disconnect_client()
+        server.close()
+        await server.wait_closed()
+
+
+class FullTransport:
+    """Transport whose write buffer is never taken by the client."""
+
+    def get_write_buffer_size(self) -> int:
+        """Report more unsent bytes than a stream accepts."""
+        return server_comm.get_server_config().stream_buffer_size + 1
+
+
+@pytest.mark.asyncio
+async def test_frame_stream_drops_frames() -> None:
+    """Test that no frames are pushed while the client does not take them from the socket."""
+    websocket = RecordingWebSocket()
+    websocket.transport = FullTransport()  # type: ignore[attr-defined]
+    stream = server_comm.FrameStream(
+        websocket,  # type: ignore[arg-type]
+        asyncio.Lock(),
+        ThreadPoolExecutor(max_workers=1),
+    )
+    stream.subscribe(0, 0, fps=100, sensors=['trajectory'], options={})
+    await asyncio.sleep(0.05)
+    stream.close()
+    assert websocket.messages == []
+    assert stream.dropped > 0
+    assert stream.frame_id >= stream.dropped
@@ -0,0 +1,3 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Tests for camera data processing."""
@@ -0,0 +1,89 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Test the thumbnail atlas of a camera sequence."""
+
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from sensorium.data_processing.camera.thumbnails import (
+    THUMBNAIL_COLUMNS,
+    ThumbnailAtlas,
+    build_thumbnail_atlas,
+    get_thumbnail_frames,
+    load_thumbnail_atlas,
+)
+
+
+def create_images(image_dir: Path, count: int) -> None:
+    """Create gray images whose brightness is the frame number, in the KITTI aspect ratio."""
+    image_dir.mkdir(parents=True)
+    for frame_id in range(count):
+        image = np.full((37, 122, 3), frame_id, dtype=np.uint8)
+        cv2.imwrite(str(image_dir / f'{frame_id:06d}.png'), image)
+
+
+def test_build_thumbnail_atlas(tmp_path: Path) -> None:
+    """Every step-th image must be downscaled into its tile, row by row."""
+    create_images(tmp_path / 'image_2', 25)
+    image_paths = get_thumbnail_frames(tmp_path / 'image_2', step=2)
+    assert len(image_paths) == 13
+    atlas = build_thumbnail_atlas(image_paths, width=20, columns=5)
+    # 122x37 scaled to a width of 20 is 6 pixel high, 13 thumbnails fill 3 rows
+    assert atlas.shape == (18, 100, 3)
+    assert np.all(atlas[:6, :20] == 0)
+    assert np.all(atlas[6:12, 20:40] == 12)  # the 7th thumbnail shows frame 12
+    assert np.all(atlas[12:, 60:] == 0)  # unused tiles stay black
+
+    with pytest.raises(ValueError, match='Thumbnail step must be positive'):
+        get_thumbnail_frames(tmp_path, step=0)
+
+
+def test_load_thumbnail_atlas_is_cached(tmp_path: Path) -> None:
+    """The atlas must be written once and read from the cache file afterwards."""
+    image_dir = tmp_path / 'image_2'
+    create_images(image_dir, 30)
+    cache_file = tmp_path / 'cache' / 'thumbnails.jpg'
+    atlas = load_thumbnail_atlas(image_dir, cache_file, step=10, width=20)
+    assert atlas.num_thumbnails == 3
+    assert atlas.columns == THUMBNAIL_COLUMNS
+    assert cache_file.read_bytes() == atlas.image
+    decoded = cv2.imdecode(np.frombuffer(atlas.image, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded is not None
+    assert decoded.shape == (6, 20 * THUMBNAIL_COLUMNS, 3)
+
+    cache_file.write_bytes(b'cached')
+    assert load_thumbnail_atlas(image_dir, cache_file, step=10, width=20).image == b'cached'
+
+    with pytest.raises(FileNotFoundError, match='No camera images found'):
+        load_thumbnail_atlas(tmp_path / 'missing', cache_file)
+
+
+def test_thumbnail_atlas_tile() -> None:
+    """A frame must map to the tile of its closest thumbnail."""
+    atlas = ThumbnailAtlas(b'', step=10, num_thumbnails=25, columns=20)
+    assert atlas.rows == 2
+    assert atlas.thumbnail_index(0) == 0
+    assert atlas.thumbnail_index(14) == 1
+    assert atlas.thumbnail_index(16) == 2
+    assert atlas.thumbnail_index(1000) == 24
+    assert atlas.tile(212, (3200, 96)) == (160, 48, 160, 48)
+
+
+def test_load_thumbnail_atlas_replaces_cache(tmp_path: Path) -> None:
+    """A stale cache file must be replaced as a whole, without leaving a temporary file."""
+    image_dir = tmp_path / 'image_2'
+    create_images(image_dir, 30)
+    cache_file = tmp_path / 'cache' / 'thumbnails.jpg'
+    cache_file.parent.mkdir()
+    cache_file.write_bytes(b'stale')
+    os.utime(cache_file, (0, 0))
+
+    atlas = load_thumbnail_atlas(image_dir, cache_file, step=10, width=20)
+    assert atlas.image != b'stale'
+    assert cache_file.read_bytes() == atlas.image
+    assert list(cache_file.parent.iterdir()) == [cache_file]
@@ -9,9 +9,14 @@ from pathlib import Path
 import numpy as np
 import pytest
 import yaml
+from numpy.typing import NDArray
 from PIL import Image
 
+from sensorium.data_processing.engine import backend_engine
 from sensorium.data_processing.engine.backend_engine import BackendEngine
+from sensorium.data_processing.utils import io_data
+from sensorium.data_processing.voxel_process.ssc_voxel_loader import vox2pix
+from sensorium.data_processing.voxel_process.voxel_geometry import VOX_ORIGIN
 
 
 def test_create_engine() -> None:
@@ -361,7 +366,7 @@ def create_mock_voxel_files(label_path: str, invalid_path: str, grid_n: int) ->
     invalid_data.tofile(invalid_path)
 
 
-def test_return_process() -> None:
+def test_return_process() -> None:  # noqa: PLR0915
     """The process method must return the correct data. Test only non-tested parts."""
     data_dir = str(Path.cwd() / 'tmp')
     config_path = Path.cwd() / 'configs' / 'sensorium.yaml'
@@ -395,8 +400,7 @@ def test_return_process() -> None:
         )
 
         # No static data processed yet
-        with pytest.raises(AttributeError):
-            _ = engine.static_data['sequence_id'] == '99'
+        assert '99' not in engine.static_data
 
         # Process the data and check the return value
         ret = engine.process(99, 111110)
@@ -423,5 +427,135 @@ def test_return_process() -> None:
         assert ret['fov_mask'].shape[0] == int(np.prod(engine.scene_dim))  # type: ignore[union-attr]
         assert ret['t_velo_2_cam'].dtype == np.float64  # type: ignore[union-attr]
         assert np.allclose(ret['t_velo_2_cam'], np.eye(4))  # type: ignore[arg-type]
+        assert list(engine.static_data) == ['99']
+
+        # Another client gets its own buffer memory for the missing files
+        ret = engine.process(99, 111111, client_id=1)
+        assert np.allclose(ret['image_2'], np.zeros((1,)))  # type: ignore[arg-type]
+        assert np.allclose(engine.buf_mem['image_2'], np.arange(27).reshape(3, 3, 3))  # type: ignore[arg-type]
+        assert 1 in engine.client_buf_mem
+        engine.release_client(1)
+        assert engine.client_buf_mem == {}
     finally:
         shutil.rmtree(data_dir)
+
+
+def test_static_data_lru(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The static data of the recently used sequences must only be processed once."""
+    engine = BackendEngine(data_dir='test')
+    engine.static_data_cache_size = 2
+    processed: list[str] = []
+
+    def dummy_process_static_data(sequence_id: str) -> dict[str, str]:
+        processed.append(sequence_id)
+        return {'sequence_id': sequence_id}
+
+    monkeypatch.setattr(engine, 'process_static_data', dummy_process_static_data)
+    for sequence_id in (1, 2, 1, 2, '01'):
+        assert engine.get_static_data(sequence_id)['sequence_id'] == f'{int(sequence_id):02d}'
+    assert processed == ['01', '02']
+
+    # The least recently used sequence is dropped
+    engine.get_static_data(3)
+    assert list(engine.static_data) == ['01', '03']
+    engine.get_static_data(2)
+    assert processed == ['01', '02', '03', '02']
+
+
+def test_process_scene_map(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The scans up to a frame must be fused into the scene map of the sequence once."""
+    sequence_path = tmp_path / 'sequences' / '99'
+    (sequence_path / 'velodyne').mkdir(parents=True)
+    (sequence_path / 'labels').mkdir()
+    create_mock_calib_file(str(sequence_path / 'calib.txt'))
+    create_mock_pose_file(str(sequence_path / 'poses.txt'))
+    # A wall of building points 10 m in front of the lidar, only the scan of frame 0 exists
+    y, z = np.meshgrid(np.arange(-2, 2, 0.05), np.arange(-1.5, 0, 0.05))
+    scan = np.stack([np.full(y.size, 10), y.ravel(), z.ravel(), np.ones(y.size)], axis=1)
+    scan.astype(np.float32).tofile(sequence_path / 'velodyne' / '000000.bin')
+    np.full(y.size, 50, dtype=np.uint32).tofile(sequence_path / 'labels' / '000000.label')
+
+    engine = BackendEngine(data_dir=str(tmp_path))
+    engine.map_stride = 1
+    result = engine.process_scene_map(99, 1)
+    scene_map = engine.scene_maps['99', None]
+    assert scene_map.frame_id == 1
+
+    voxel = result['voxel']
+    assert isinstance(voxel, np.ndarray)
+    assert voxel.shape == engine.scene_dim
+    assert set(np.unique(voxel)) == {0, 13}
+    assert result['fov_mask'].shape == (np.prod(engine.scene_dim),)  # type: ignore[union-attr]
+    # The map corner, placed at VOX_ORIGIN, is half a scene beside the pose of frame 0, and is
+    # transformed to the lidar of frame 1
+    corner = np.asarray(result['t_velo_2_cam']) @ np.append(VOX_ORIGIN, 1)
+    assert np.allclose(corner[:3], (1 - 25.6 - 4, 2 - 25.6 - 5, 3 - 2 - 6))
+
+    # The next frame does not fuse the scans again
+    integrate_calls: list[int] = []
+    scene_map.integrate = lambda frame_id, *_: integrate_calls.append(frame_id)  # type: ignore[method-assign]
+    # The FOV mask of the same transformation, and the class lookup table, are reused
+    vox2pix_calls: list[bytes] = []
+
+    def counting_vox2pix(
+        cam_e: NDArray[np.float64],
+        cam_k: NDArray[np.float64],
+        vol_origin: NDArray[np.float64],
+        img_shape: tuple[int, int],
+        scene_size: tuple[float, float, float],
+    ) -> tuple[NDArray[np.int64], NDArray[np.bool_], NDArray[np.float32]]:
+        vox2pix_calls.append(cam_e.tobytes())
+        return vox2pix(cam_e, cam_k, vol_origin, img_shape, scene_size)
+
+    def missing_remap_lut(path: str) -> NDArray[np.int32]:
+        raise AssertionError(path)
+
+    monkeypatch.setattr(backend_engine, 'vox2pix', counting_vox2pix)
+    monkeypatch.setattr(io_data, 'get_remap_lut', missing_remap_lut)
+    fov_mask = engine.process_scene_map(99, 1)['fov_mask']
+    assert integrate_calls == []
+    assert vox2pix_calls == []
+    assert fov_mask is result['fov_mask']
+    # Another frame is seen from another pose
+    engine.process_scene_map(99, 0)
+    assert len(vox2pix_calls) == 1
+
+    # Every client fuses its own map, a client at an earlier frame does not reset the others
+    engine.process_scene_map(99, 0, client_id=1)
+    assert engine.scene_maps['99', 1] is not scene_map
+    assert engine.scene_maps['99', 1].frame_id == 0
+    engine.release_client(1)
+    assert list(engine.scene_maps) == [('99', None)]
+    assert list(engine.scene_map_fov_masks) == [('99', None)]
+
+
+def test_load_image_and_voxel_report_buffer_memory(tmp_path: Path) -> None:
+    """A missing file must be replaced by the buffer memory of the client, and be reported."""
+    sequence_path = tmp_path / 'sequences' / '99'
+    (sequence_path / 'image_2').mkdir(parents=True)
+    (sequence_path / 'voxels').mkdir()
+    create_mock_image_files(str(sequence_path / 'image_2' / '000000.png'))
+    create_mock_voxel_files(
+        str(sequence_path / 'voxels' / '000000.label'),
+        str(sequence_path / 'voxels' / '000000.invalid'),
+        2097152,
+    )
+    engine = BackendEngine(data_dir=str(tmp_path))
+
+    image, buffered = engine.load_image(99, 0, 'image_2', client_id=1)
+    assert (image.shape, buffered) == ((3, 3, 3), False)
+    buffered_image, buffered = engine.load_image(99, 1, 'image_2', client_id=1)
+    assert buffered
+    assert np.array_equal(buffered_image, image)
+    # Another client has not loaded an image yet
+    other_image, buffered = engine.load_image(99, 1, 'image_2', client_id=2)
+    assert buffered
+    assert other_image.shape == (1,)
+
+    voxel, buffered = engine.load_voxel(99, 0, client_id=1)
+    assert (voxel.shape, buffered) == (engine.scene_dim, False)
+    buffered_voxel, buffered = engine.load_voxel(99, 5, client_id=1)
+    assert buffered
+    assert buffered_voxel is voxel
+    with pytest.raises(ValueError, match='multiple of 5'):
+        engine.load_voxel(99, 1)
@@ -8,6 +8,7 @@ import numpy as np
 
 from sensorium.data_processing.lidar_pointcloud.point_cloud import (
     get_cmap,
+    get_color_lut,
     read_labels,
     read_labels_and_colors,
     read_point_cloud,
@@ -98,9 +99,23 @@ def test_read_labels_and_colors() -> None:
     Path(test_file).unlink()
 
 
+def test_get_color_lut() -> None:
+    """Test the get_color_lut function matches the color map and ignores instance bits."""
+    lut = get_color_lut()
+    assert lut.shape == (65536, 3)
+    assert lut.dtype == np.uint8
+    for label, color in get_cmap().items():
+        assert np.all(lut[label] == color)
+    assert np.all(lut[2] == 0)  # not in the color map
+
+    labels = np.array([10 | (3 << 16), 40 | (1 << 16)], dtype=np.uint32)
+    assert np.all(lut[labels & 0xFFFF] == [[245, 150, 100], [255, 0, 255]])
+
+
 if __name__ == '__main__':
     test_read_point_cloud()
     test_read_labels()
     test_get_cmap()
     test_read_labels_and_colors()
+    test_get_color_lut()
     print('All tests passed.')
@@ -6,8 +6,30 @@
 import numpy as np
 import pytest
 from numba.core.dispatcher import Dispatcher  # type: ignore[import-untyped]
-
-from sensorium.data_processing.voxel_process.fusion import TSDFVolume, rigid_transform
+from numpy.typing import NDArray
+
+from sensorium.data_processing.voxel_process import fusion
+from sensorium.data_processing.voxel_process.fusion import (
+    RANGE_IMAGE_SHAPE,
+    TSDFVolume,
+    cam2pix_numpy,
+    create_range_image,
+    integrate_tsdf_numpy,
+    lidar2pix_numpy,
+    rigid_transform,
+    vox2world_numpy,
+)
+
+
+def create_wall_scan(distance: float = 10.0) -> NDArray[np.float32]:
+    """Create a scan of a wall in front of the lidar, one point per range image pixel."""
+    rows, cols = np.meshgrid(np.arange(8, 40), np.arange(960, 1088), indexing='ij')
+    pitch = np.radians(3.0) - (rows.ravel() + 0.5) / RANGE_IMAGE_SHAPE[0] * np.radians(28.0)
+    yaw = np.pi * (1 - 2 * (cols.ravel() + 0.5) / RANGE_IMAGE_SHAPE[1])
+    directions = np.stack(
+        [np.cos(pitch) * np.cos(yaw), np.cos(pitch) * np.sin(yaw), np.sin(pitch)], axis=1
+    )
+    return np.astype(directions * distance / directions[:, :1], np.float32)
 
 
 def test_tsdf_volume_initialization() -> None:
@@ -97,8 +119,115 @@ def test_vox2world_with_custom_offsets() -> None:
     assert np.array_equal(world_coords[0], np.array([0.0, 0.0, 0.0]))
 
 
+@pytest.mark.skipif(not fusion.USE_NUMBA, reason='the kernels are not compiled with numba')
 def test_optimization() -> None:
     """Test whether the numba decorators are working."""
     # Test njit compilation
     assert isinstance(TSDFVolume.vox2world.__get__(None, TSDFVolume), Dispatcher)
     assert isinstance(TSDFVolume.cam2pix.__get__(None, TSDFVolume), Dispatcher)
+    assert isinstance(TSDFVolume.lidar2pix.__get__(None, TSDFVolume), Dispatcher)
+    assert isinstance(TSDFVolume.integrate_tsdf.__get__(None, TSDFVolume), Dispatcher)
+
+
+def test_numpy_fallback() -> None:
+    """Test that the numpy versions match the numba kernels."""
+    rng = np.random.default_rng(0)
+    vol_origin = np.array([0, -25.6, -2])
+    vox_coords = rng.integers(0, 256, size=(1000, 3)).astype(np.float32)
+    np.testing.assert_array_equal(
+        vox2world_numpy(vol_origin, vox_coords, 0.2),
+        TSDFVolume.vox2world(vol_origin, vox_coords, 0.2),
+    )
+
+    cam_pts = rng.uniform(-50, 50, size=(1000, 3)).astype(np.float32)
+    cam_pts[:, 2] = np.abs(cam_pts[:, 2]) + 0.1
+    intr = np.array([[718.856, 0, 607.1928], [0, 718.856, 185.2157], [0, 0, 1]])
+    np.testing.assert_array_equal(cam2pix_numpy(cam_pts, intr), TSDFVolume.cam2pix(cam_pts, intr))
+
+    velo_pts = rng.uniform(-50, 50, size=(1000, 3)).astype(np.float32)
+    pix, ranges = TSDFVolume.lidar2pix(velo_pts)
+    pix_numpy, ranges_numpy = lidar2pix_numpy(velo_pts)
+    np.testing.assert_array_equal(pix_numpy, pix)
+    np.testing.assert_allclose(ranges_numpy, ranges, rtol=1e-6)
+
+    tsdf_vol = rng.uniform(-1, 1, size=1000).astype(np.float32)
+    dist = rng.uniform(-1, 1, size=1000).astype(np.float32)
+    w_old = rng.integers(0, 10, size=1000).astype(np.float32)
+    for numpy_vol, numba_vol in zip(
+        integrate_tsdf_numpy(tsdf_vol, dist, w_old, 1.0),
+        TSDFVolume.integrate_tsdf(tsdf_vol, dist, w_old, 1.0),
+        strict=True,
+    ):
+        np.testing.assert_allclose(numpy_vol, numba_vol, rtol=1e-6)
+
+
+def test_lidar2pix() -> None:
+    """Test lidar to range image conversion."""
+    velo_pts = np.array([[10, -0.01, 0], [0.01, 10, 0], [-10, -0.01, 0]], dtype=np.float32)
+    pix, ranges = TSDFVolume.lidar2pix(velo_pts)
+    # The horizon is 3 of the 28 degree below the top, the front is the centre column
+    np.testing.assert_array_equal(pix, [[6, 1024], [6, 512], [6, 2047]])
+    np.testing.assert_array_almost_equal(ranges, [10, 10, 10], decimal=3)
+
+
+def test_create_range_image() -> None:
+    """Test that the range image keeps the nearest point of a pixel."""
+    velo_pts = np.array([[10, 0, 0], [5, 0, 0], [0, 0, 10]], dtype=np.float32)
+    labels = np.array([1, 2, 3], dtype=np.uint8)
+    range_image, label_image = create_range_image(velo_pts, labels)
+    assert range_image.shape == RANGE_IMAGE_SHAPE
+    # The point above the field of view is dropped
+    assert np.count_nonzero(range_image) == 1
+    assert range_image[6, 1024] == 5
+    assert label_image is not None
+    assert label_image[6, 1024] == 2
+
+
+def test_integrate_scan() -> None:
+    """Test that a lidar scan of a wall is fused into a surface at the wall."""
+    tsdf = TSDFVolume(np.array([[0, 12.8], [-3.2, 3.2], [-1.6, 1.6]]), 0.2)
+    scan = create_wall_scan(distance=10.1)
+    for _ in range(2):
+        tsdf.integrate_scan(scan, np.identity(4), np.full(len(scan), 13, dtype=np.uint8))
+    tsdf_vol, color_vol = tsdf.get_volume()
+    surface = tsdf.get_surface()
+
+    # The voxels in front of the wall are free, the surface is the wall
+    assert np.all(tsdf_vol[10:45, 16, 8][tsdf._weight_vol_cpu[10:45, 16, 8] > 0] == 1)  # noqa: SLF001
+    assert np.unique(np.argwhere(surface)[:, 0]).tolist() == [50]
+    assert np.all(color_vol[surface] == 13)
+    assert np.all(tsdf._weight_vol_cpu[surface] == 2)  # noqa: SLF001
+
+
+def test_integrate_scan_numpy_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a scan is fused with the numpy kernels like with the selected kernels."""
+    scan = create_wall_scan(distance=10.1)
+    labels = np.full(len(scan), 13, dtype=np.uint8)
+    vol_bnds = np.array([[0, 12.8], [-3.2, 3.2], [-1.6, 1.6]])
+    expected = TSDFVolume(vol_bnds, 0.2)
+    expected.integrate_scan(scan, np.identity(4), labels)
+
+    # The kernels parallel_kernel selects without numba, e.g. with SENSORIUM_NUMBA=0
+    monkeypatch.setattr(TSDFVolume, 'vox2world', staticmethod(vox2world_numpy))
+    monkeypatch.setattr(TSDFVolume, 'cam2pix', staticmethod(cam2pix_numpy))
+    monkeypatch.setattr(TSDFVolume, 'lidar2pix', staticmethod(lidar2pix_numpy))
+    monkeypatch.setattr(TSDFVolume, 'integrate_tsdf', staticmethod(integrate_tsdf_numpy))
+    tsdf = TSDFVolume(vol_bnds, 0.2)
+    tsdf.integrate_scan(scan, np.identity(4), labels)
+    np.testing.assert_array_equal(tsdf.get_surface(), expected.get_surface())
+    for volume, expected_volume in zip(tsdf.get_volume(), expected.get_volume(), strict=True):
+        np.testing.assert_allclose(volume, expected_volume, atol=1e-5)
+    assert np.unique(np.argwhere(tsdf.get_surface())[:, 0]).tolist() == [50]
+
+
+def test_shift() -> None:
+    """Test that shifting the volume keeps the voxels inside it."""
+    tsdf = TSDFVolume(np.array([[0, 12.8], [-3.2, 3.2], [-1.6, 1.6]]), 0.2)
+    tsdf.integrate_scan(create_wall_scan(distance=10.1), np.identity(4))
+    surface = tsdf.get_surface()
+    tsdf.shift(np.array([10, -2, 0]))
+    np.testing.assert_array_almost_equal(tsdf.vol_origin, [2, -3.6, -1.6])
+    np.testing.assert_array_equal(tsdf.get_surface()[40:54, 2:], surface[50:, :-2])
+    # The voxels that entered the volume are unobserved
+    assert not np.any(tsdf._weight_vol_cpu[-10:])  # noqa: SLF001
+    assert not np.any(tsdf._weight_vol_cpu[:, :2])  # noqa: SLF001
@@ -0,0 +1,100 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Test the scene map module."""
+
+import numpy as np
+import pytest
+from numpy.typing import NDArray
+
+from sensorium.data_processing.voxel_process import fusion
+from sensorium.data_processing.voxel_process.fusion import TSDFVolume, rigid_transform
+from sensorium.data_processing.voxel_process.scene_map import (
+    UNLABELED_SURFACE_CLASS,
+    SceneMap,
+    warm_up_integrate_scan,
+)
+from sensorium.data_processing.voxel_process.voxel_geometry import VOX_ORIGIN
+
+from .test_fusion import create_wall_scan
+
+
+def create_poses(num_frames: int, speed: float = 1.0) -> list[NDArray[np.float64]]:
+    """Create the poses of a lidar driving along x."""
+    poses = []
+    for frame_id in range(num_frames):
+        pose = np.identity(4)
+        pose[0, 3] = frame_id * speed
+        poses.append(pose)
+    return poses
+
+
+def test_get_frames_to_fuse() -> None:
+    """Test that the scans are fused incrementally, and the map is rebuilt after a seek."""
+    scene_map = SceneMap(create_poses(200), stride=5, max_scans=4)
+    assert list(scene_map.get_frames_to_fuse(12)) == [0, 5, 10]
+    scene_map.frame_id = 10
+    assert list(scene_map.get_frames_to_fuse(14)) == []
+    assert list(scene_map.get_frames_to_fuse(27)) == [15, 20, 25]
+    assert scene_map.frame_id == 10
+
+    # A seek rebuilds the map from the last max_scans scans
+    assert list(scene_map.get_frames_to_fuse(40)) == [25, 30, 35, 40]
+    assert scene_map.frame_id is None
+    scene_map.frame_id = 40
+    assert list(scene_map.get_frames_to_fuse(20)) == [5, 10, 15, 20]
+    # Frames after the last pose use the last pose
+    assert list(scene_map.get_frames_to_fuse(500))[-1] == 195
+
+
+def test_integrate_follows_the_car() -> None:
+    """Test that the map keeps the fused surface while the volume follows the car."""
+    scene_map = SceneMap(create_poses(50), stride=5)
+    assert not np.any(scene_map.get_voxel())
+
+    scan = create_wall_scan(distance=20.1)
+    # The left half of the wall is labeled
+    labels = np.where(scan[:, 1] > 0, 13, 0).astype(np.uint8)
+    for frame_id in scene_map.get_frames_to_fuse(5):
+        # The wall stays at x = 20.1 in the coordinates of the first frame
+        scene_map.integrate(frame_id, create_wall_scan(distance=20.1 - frame_id), labels)
+    assert scene_map.frame_id == 5
+    assert scene_map.volume is not None
+    np.testing.assert_array_almost_equal(scene_map.volume.vol_origin, [-25.6, -25.6, -2])
+
+    voxel = scene_map.get_voxel()
+    assert voxel.shape == (256, 256, 32)
+    occupied = np.argwhere(voxel)
+    assert np.unique(occupied[:, 0]).tolist() == [228]
+    assert set(np.unique(voxel[voxel > 0])) == {13, UNLABELED_SURFACE_CLASS}
+
+    # The volume is shifted once the car is a quarter of the scene away from its centre
+    scene_map.integrate(15, None)
+    assert scene_map.frame_id == 15
+    scene_map.integrate(20, create_wall_scan(distance=0.1))
+    np.testing.assert_array_almost_equal(scene_map.volume.vol_origin, [-5.6, -25.6, -2])
+    assert np.unique(np.argwhere(scene_map.get_voxel())[:, 0]).tolist() == [128]
+
+
+def test_get_map_2_velo() -> None:
+    """Test that the map placed at VOX_ORIGIN is transformed to the lidar of a frame."""
+    scene_map = SceneMap(create_poses(50), stride=5)
+    scene_map.integrate(0, create_wall_scan())
+    map_2_velo = scene_map.get_map_2_velo(10)
+    # The map corner is 25.6 m behind and right of the first lidar pose, which is 10 m behind
+    corner = rigid_transform(VOX_ORIGIN[None].astype(np.float32), map_2_velo)
+    np.testing.assert_array_almost_equal(corner, [[-35.6, -25.6, -2]], decimal=5)
+
+
+@pytest.mark.skipif(not fusion.USE_NUMBA, reason='the kernels are not compiled with numba')
+def test_warm_up_integrate_scan() -> None:
+    """The warm-up must compile the kernels for the scans of BackendEngine.process_scene_map."""
+    warm_up_integrate_scan()
+    kernels = (TSDFVolume.vox2world, TSDFVolume.lidar2pix, TSDFVolume.integrate_tsdf)
+    signatures = [list(kernel.signatures) for kernel in kernels]  # type: ignore[union-attr]
+
+    scan = create_wall_scan()
+    scan_file = np.hstack([scan, np.ones((len(scan), 1), dtype=np.float32)])
+    labels = np.full(len(scan), 13, dtype=np.int32)
+    SceneMap(create_poses(1)).integrate(0, scan_file[:, :3], labels.astype(np.uint8))
+    assert [list(kernel.signatures) for kernel in kernels] == signatures  # type: ignore[union-attr]
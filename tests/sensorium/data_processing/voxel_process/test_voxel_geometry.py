@@ -0,0 +1,47 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Test module for the voxel render geometry extraction."""
+
+import numpy as np
+
+from sensorium.data_processing.voxel_process.voxel_geometry import (
+    extract_voxel_geometry,
+    get_grid_coords,
+    grid_indices_to_centres,
+)
+
+
+def test_get_grid_coords() -> None:
+    """The grid coordinates must follow the C order of the grid and be cached."""
+    coords = get_grid_coords((2, 3, 4), 0.2)
+    assert coords.shape == (24, 3)
+    assert coords.dtype == np.float32
+    assert np.allclose(coords[0], [0.1, 0.1, 0.1])
+    # Flat index 1 * 12 + 2 * 4 + 3 is voxel (1, 2, 3)
+    assert np.allclose(coords[23], [0.3, 0.5, 0.7])
+    assert not coords.flags.writeable
+    assert get_grid_coords((2, 3, 4), 0.2) is coords
+
+
+def test_grid_indices_to_centres() -> None:
+    """Integer voxel indices must map to the same centres as the grid coordinates."""
+    indices = np.array([[0, 0, 0], [1, 2, 3]], dtype=np.uint8)
+    coords = get_grid_coords((2, 3, 4), 0.2)
+    assert np.allclose(grid_indices_to_centres(indices, 0.2), coords[[0, 23]])
+
+
+def test_extract_voxel_geometry() -> None:
+    """Only occupied voxels must be extracted and split by the FOV mask."""
+    voxel = np.zeros((2, 2, 2), dtype=np.uint8)
+    voxel[0, 0, 0] = 5
+    voxel[1, 1, 1] = 9
+    voxel[0, 1, 0] = 255
+    fov_mask = np.zeros(8, dtype=np.bool_)
+    fov_mask[0] = True
+
+    geometry = extract_voxel_geometry(voxel, fov_mask, 1.0)
+    assert np.array_equal(geometry.fov_labels, [5])
+    assert np.allclose(geometry.fov_centres, [[0.5, 0.5, 0.5]])
+    assert np.array_equal(geometry.outfov_labels, [9])
+    assert np.allclose(geometry.outfov_centres, [[1.5, 1.5, 1.5]])
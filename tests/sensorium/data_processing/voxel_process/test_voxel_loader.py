@@ -10,10 +10,13 @@ import pytest
 import yaml
 
 import sensorium.data_processing.utils.io_data as semkitti_io
+from sensorium.data_processing.voxel_process import fusion
+from sensorium.data_processing.voxel_process.fusion import TSDFVolume
 from sensorium.data_processing.voxel_process.ssc_voxel_loader import (
     load_ssc_voxel,
     read_calib,
     vox2pix,
+    warm_up_vox2pix,
 )
 
 # Global config
@@ -174,3 +177,15 @@ def test_vox_to_pix() -> None:
     assert pix_z.dtype == np.float32
     assert np.all(pix_z[fov_mask] >= 0)
     assert np.all(pix_z[fov_mask] < 100)  # cam should not have depth beyond 100m
+
+
+@pytest.mark.skipif(not fusion.USE_NUMBA, reason='the kernels are not compiled with numba')
+def test_warm_up_vox2pix() -> None:
+    """The warm-up must compile the kernels for the arguments of process_static_data."""
+    warm_up_vox2pix()
+    kernels = (TSDFVolume.vox2world, TSDFVolume.cam2pix)
+    signatures = [list(kernel.signatures) for kernel in kernels]  # type: ignore[union-attr]
+
+    cam_k = np.array([float(v) for v in range(12)]).reshape(3, 4)[:3, :3]  # like read_calib
+    vox2pix(np.identity(4), cam_k, np.array((0, -25.6, -2)), (1220, 370), (1, 1, 1))
+    assert [list(kernel.signatures) for kernel in kernels] == signatures  # type: ignore[union-attr]
@@ -0,0 +1,141 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Test module for the voxel surface extraction."""
+
+import numpy as np
+import pytest
+from numpy.typing import NDArray
+
+from sensorium.data_processing.voxel_process import fusion
+from sensorium.data_processing.voxel_process.voxel_geometry import (
+    VoxelGeometry,
+    extract_voxel_geometry,
+)
+from sensorium.data_processing.voxel_process.voxel_mesh import (
+    VoxelMesh,
+    build_voxel_mesh,
+    compile_greedy_rectangles,
+    extract_voxel_surface,
+    greedy_rectangles,
+    greedy_rectangles_numpy,
+    surface_to_mesh,
+)
+
+
+def quad_areas(mesh: VoxelMesh) -> NDArray[np.float32]:
+    """Get the area of every quad of the mesh."""
+    corners = mesh.positions.reshape(-1, 4, 3)
+    return np.linalg.norm(  # type: ignore[no-any-return]
+        np.cross(corners[:, 1] - corners[:, 0], corners[:, 3] - corners[:, 0]), axis=1
+    )
+
+
+def test_greedy_rectangles() -> None:
+    """Equal cells must be merged into the largest rectangles found row by row."""
+    slices = np.array([[[1, 1, 2], [1, 1, 0], [0, 3, 3]]], dtype=np.int16)
+    rectangles = greedy_rectangles(slices, 7)
+    assert sorted(rectangles.tolist()) == [
+        [0, 0, 0, 2, 2, 1],
+        [0, 0, 2, 1, 1, 2],
+        [0, 2, 1, 1, 2, 3],
+    ]
+
+
+def test_greedy_rectangles_numpy() -> None:
+    """The numpy fallback must cover the same faces with rectangles of one key each."""
+    rng = np.random.default_rng(0)
+    slices = rng.choice(np.array([0, 0, 1, 2, 258], dtype=np.int16), size=(4, 9, 11))
+    slices[1, 2:7, 3:9] = 5
+    max_rectangles = int(np.count_nonzero(slices))
+    for rectangles in (
+        greedy_rectangles(slices, max_rectangles),
+        greedy_rectangles_numpy(slices, max_rectangles),
+    ):
+        covered = np.zeros_like(slices)
+        for s, u, v, extent_u, extent_v, key in rectangles:
+            assert np.all(covered[s, u : u + extent_u, v : v + extent_v] == 0)
+            assert np.all(slices[s, u : u + extent_u, v : v + extent_v] == key)
+            covered[s, u : u + extent_u, v : v + extent_v] = key
+        np.testing.assert_array_equal(covered, slices)
+    # The block is merged into one rectangle
+    assert [1, 2, 3, 5, 6, 5] in greedy_rectangles_numpy(slices, max_rectangles).tolist()
+
+
+def test_greedy_rectangles_without_numba(monkeypatch: pytest.MonkeyPatch) -> None:
+    """With SENSORIUM_NUMBA=0 the numpy fallback must be used for the surface extraction."""
+    monkeypatch.setattr(fusion, 'USE_NUMBA', False)
+    compile_greedy_rectangles.cache_clear()
+    try:
+        assert compile_greedy_rectangles() is greedy_rectangles_numpy
+        voxel = np.zeros((6, 6, 6), dtype=np.uint8)
+        voxel[1:4, 1:5, 2:4] = 7
+        surface = extract_voxel_surface(voxel, np.ones(voxel.size, dtype=np.bool_))
+        assert sorted(surface.directions.tolist()) == [0, 1, 2, 3, 4, 5]
+    finally:
+        compile_greedy_rectangles.cache_clear()
+
+
+def test_extract_voxel_surface_merges_faces() -> None:
+    """A solid box of one class must give one rectangle per side."""
+    voxel = np.zeros((6, 6, 6), dtype=np.uint8)
+    voxel[1:4, 1:5, 2:4] = 7
+    fov_mask = np.ones(voxel.size, dtype=np.bool_)
+
+    surface = extract_voxel_surface(voxel, fov_mask)
+    assert sorted(surface.directions.tolist()) == [0, 1, 2, 3, 4, 5]
+    assert np.all(surface.labels == 7)
+    assert np.all(surface.in_fov)
+
+    mesh = surface_to_mesh(surface, voxel_size=1.0)
+    assert mesh.indices.shape == (6, 4)
+    assert np.isclose(quad_areas(mesh).sum(), 2 * (3 * 4 + 3 * 2 + 4 * 2))
+    # The winding of every quad must match its outward normal
+    corners = mesh.positions.reshape(-1, 4, 3)
+    winding = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    assert np.all(np.sum(winding * mesh.normals[::4], axis=1) > 0)
+
+
+def test_extract_voxel_surface_matches_culled_faces() -> None:
+    """Greedy meshing must cover the same visible area per class as the culled cube faces."""
+    rng = np.random.default_rng(seed=5)
+    voxel = rng.choice(np.array([0, 3, 9, 255], dtype=np.uint8), size=(20, 18, 7))
+    fov_mask = rng.random(voxel.size) < 0.4
+
+    greedy = surface_to_mesh(extract_voxel_surface(voxel, fov_mask), voxel_size=1.0)
+    culled = build_voxel_mesh(extract_voxel_geometry(voxel, fov_mask, 1.0), voxel_size=1.0)
+    assert len(greedy.indices) < len(culled.indices)
+    for label in (3, 9):
+        for in_fov in (True, False):
+            greedy_area = quad_areas(greedy)[(greedy.labels == label) & (greedy.in_fov == in_fov)]
+            culled_area = quad_areas(culled)[(culled.labels == label) & (culled.in_fov == in_fov)]
+            assert np.isclose(greedy_area.sum(), culled_area.sum())
+
+
+def test_build_voxel_mesh_culls_hidden_faces() -> None:
+    """Two neighbouring voxels must share no face, giving 10 visible faces."""
+    voxel = np.zeros((4, 4, 4), dtype=np.uint8)
+    voxel[1, 1, 1] = 1
+    voxel[2, 1, 1] = 9
+    fov_mask = np.zeros(voxel.size, dtype=np.bool_)
+
+    mesh = build_voxel_mesh(extract_voxel_geometry(voxel, fov_mask, 1.0), voxel_size=1.0)
+    assert mesh.indices.shape == (10, 4)
+    assert mesh.positions.shape == (40, 3)
+    # The shared faces at x = 2 are removed, only the outer faces look along the x axis
+    x_faces = mesh.positions[mesh.normals[:, 0] != 0, 0]
+    assert np.allclose(np.unique(x_faces), [1.0, 3.0])
+    assert sorted(mesh.labels.tolist()) == [1] * 5 + [9] * 5
+
+
+def test_build_voxel_mesh_empty() -> None:
+    """An empty geometry must give an empty mesh."""
+    empty = VoxelGeometry(
+        fov_centres=np.zeros((0, 3), dtype=np.float32),
+        fov_labels=np.zeros(0, dtype=np.uint8),
+        outfov_centres=np.zeros((0, 3), dtype=np.float32),
+        outfov_labels=np.zeros(0, dtype=np.uint8),
+    )
+    mesh = build_voxel_mesh(empty)
+    assert mesh.indices.shape == (0, 4)
+    assert mesh.positions.shape == (0, 3)
@@ -0,0 +1,75 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Test module for the playback scheduler."""
+
+import pytest
+
+from sensorium.engine.playback import PlaybackScheduler
+
+
+class FakeClock:
+    """Clock that only advances when told to."""
+
+    def __init__(self) -> None:
+        """Start at an arbitrary time."""
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        """The current time in seconds."""
+        return self.now
+
+
+def test_playback_on_time() -> None:
+    """Frames that are loaded within their slot must be shown one by one at their due time."""
+    clock = FakeClock()
+    scheduler = PlaybackScheduler(0.1, clock=clock)
+    assert scheduler.wait_time() == 0
+
+    for _ in range(5):
+        clock.now += scheduler.wait_time() + 0.03  # loading takes 30 ms
+        assert scheduler.frame_shown() == 1
+        assert scheduler.wait_time() == pytest.approx(0.07)
+
+    stats = scheduler.stats()
+    assert stats.shown == 5
+    assert stats.dropped == 0
+    assert stats.fps == pytest.approx(10)
+
+
+def test_playback_drop_policy() -> None:
+    """Late frames must be dropped to continue with the frame that is due now."""
+    clock = FakeClock()
+    scheduler = PlaybackScheduler(0.1, policy='drop', clock=clock)
+    clock.now += 0.25  # frame 0 took 250 ms, frame 1 is late and frame 2 is due
+    assert scheduler.frame_shown() == 2
+    assert scheduler.wait_time() == 0
+    clock.now += 0.01
+    assert scheduler.frame_shown() == 1
+    assert scheduler.wait_time() == pytest.approx(0.04)
+    assert scheduler.stats().dropped == 1
+
+
+def test_playback_slow_policy() -> None:
+    """Every frame must be shown, the schedule is shifted behind a late frame."""
+    clock = FakeClock()
+    scheduler = PlaybackScheduler(0.1, policy='slow', clock=clock)
+    clock.now += 0.25
+    assert scheduler.frame_shown() == 1
+    assert scheduler.wait_time() == 0
+    clock.now += 0.01
+    assert scheduler.frame_shown() == 1
+    assert scheduler.wait_time() == pytest.approx(0.09)
+    assert scheduler.stats().dropped == 0
+
+
+def test_playback_set_frame_time() -> None:
+    """Changing the frame time must keep the progress within the current frame."""
+    clock = FakeClock()
+    scheduler = PlaybackScheduler(0.1, clock=clock)
+    clock.now += 0.05
+    scheduler.frame_shown()
+    scheduler.set_frame_time(0.2)
+    assert scheduler.wait_time() == pytest.approx(0.1)
+
+    with pytest.raises(ValueError, match='Unknown playback policy'):
+        scheduler.policy = 'fast'
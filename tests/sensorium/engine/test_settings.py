@@ -26,12 +26,15 @@ def test_open_settings_window(qtbot: QtBot) -> None:
 
     dialog.input_field.setText(str(100))
     dialog.speed_input.setText(str(10))
+    dialog.policy_input.setCurrentText('slow')
     assert dialog.input_field.text() == str(100)
     assert dialog.speed_input.text() == str(10)
 
     qtbot.mouseClick(dialog.apply_button, Qt.LeftButton)  # type: ignore[attr-defined]
     assert vizualisation.fps == 10
     assert vizualisation.next_frame_time == 100
+    assert vizualisation.playback.frame_time == 0.1
+    assert vizualisation.playback.policy == 'slow'
     assert vizualisation.maxframe == 100
 
     assert not dialog.isVisible()
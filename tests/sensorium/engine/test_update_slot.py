@@ -0,0 +1,72 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Test module for the widget update slots."""
+
+import asyncio
+
+import pytest
+
+from sensorium.engine.update_slot import UpdateSlot
+
+
+@pytest.mark.asyncio
+async def test_update_slot_latest_wins() -> None:
+    """Frames requested while an update is in flight must collapse into the latest one."""
+    shown: list[tuple[int, int]] = []
+    release = asyncio.Event()
+
+    async def slow_update(seq_id: int, frame_id: int) -> None:
+        await release.wait()
+        shown.append((seq_id, frame_id))
+
+    slot = UpdateSlot('slow', slow_update)
+    task = slot.request(0, 1)
+    await asyncio.sleep(0)
+    assert slot.busy
+    for frame_id in range(2, 5):
+        assert slot.request(0, frame_id) is task
+
+    release.set()
+    await task
+    assert shown == [(0, 1), (0, 4)]
+    assert slot.skipped == 2
+    assert not slot.busy
+
+
+@pytest.mark.asyncio
+async def test_update_slot_error(capsys: pytest.CaptureFixture[str]) -> None:
+    """A failing update must be reported without stopping the slot."""
+
+    async def failing_update(seq_id: int, frame_id: int) -> None:
+        msg = f'no data for {seq_id}/{frame_id}'
+        raise ValueError(msg)
+
+    slot = UpdateSlot('voxel', failing_update)
+    await slot.request(0, 5)
+    assert 'Error updating voxel: no data for 0/5' in capsys.readouterr().out
+    await slot.request(0, 10)
+    assert 'no data for 0/10' in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_update_slot_cancel_superseded() -> None:
+    """A cancelling request must abort the update in flight and show only the new frame."""
+    shown: list[tuple[int, int]] = []
+    cancelled: list[tuple[int, int]] = []
+
+    async def slow_update(seq_id: int, frame_id: int) -> None:
+        try:
+            await asyncio.sleep(0 if frame_id == 9 else 10)
+        except asyncio.CancelledError:
+            cancelled.append((seq_id, frame_id))
+            raise
+        shown.append((seq_id, frame_id))
+
+    slot = UpdateSlot('camera', slow_update)
+    task = slot.request(0, 1)
+    await asyncio.sleep(0.01)
+    assert slot.request(0, 9, cancel=True) is task
+    await asyncio.wait_for(task, timeout=1)
+    assert cancelled == [(0, 1)]
+    assert shown == [(0, 9)]
+    assert slot.skipped == 1
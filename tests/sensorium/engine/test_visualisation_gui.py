@@ -74,9 +74,7 @@ async def test_update_scene(qtbot: QtBot) -> None:
     qtbot.addWidget(visualisation)
     visualisation.framenumber = 1
     with (
-        patch(
-            'sensorium.visualization.camera_visualization.CameraWidget.show_image'
-        ) as mock_update_camera,
+        patch('sensorium.engine.visualization_gui.show_stereo_images') as mock_update_camera,
         patch(
             'sensorium.visualization.trajectory_visualization.Trajectory.draw_line'
         ) as mock_update_trajectory,
@@ -89,7 +87,9 @@ async def test_update_scene(qtbot: QtBot) -> None:
         patch('sensorium.visualization.voxel_widget.VoxelWidget.update_scene') as mock_update_voxel,
     ):
         await visualisation.update_scene()
-        mock_update_camera.assert_called_with(0, 1)
+        mock_update_camera.assert_called_once_with(
+            visualisation.camera2, visualisation.camera3, 0, 1
+        )
         mock_update_trajectory.assert_called_once_with(0, 1)
         mock_update_pointcloud.assert_called_once_with(0, 1)
         mock_update_voxel.assert_called_once_with(0, 1)
@@ -105,9 +105,7 @@ async def test_load_frame(qtbot: QtBot) -> None:
     qtbot.addWidget(visualisation)
     visualisation.framenumber = 1
     with (
-        patch(
-            'sensorium.visualization.camera_visualization.CameraWidget.show_image'
-        ) as mock_update_camera,
+        patch('sensorium.engine.visualization_gui.show_stereo_images') as mock_update_camera,
         patch(
             'sensorium.visualization.trajectory_visualization.Trajectory.draw_line'
         ) as mock_update_trajectory,
@@ -117,12 +115,61 @@ async def test_load_frame(qtbot: QtBot) -> None:
         patch('sensorium.visualization.voxel_widget.VoxelWidget.update_scene') as mock_update_voxel,
     ):
         await visualisation.load_frame(0, 1)
-        mock_update_camera.assert_called_with(0, 1)
+        mock_update_camera.assert_called_once_with(
+            visualisation.camera2, visualisation.camera3, 0, 1
+        )
         mock_update_trajectory.assert_called_once_with(0, 1)
         mock_update_pointcloud.assert_called_once_with(0, 1)
         mock_update_voxel.assert_called_once_with(0, 1)
 
 
+@pytest.mark.usefixtures('_event_loop')
+@pytest.mark.skipif(bool(os.getenv('CI')), reason='no windowing system available in CI')
+@pytest.mark.asyncio
+async def test_resize_does_not_load_frame(qtbot: QtBot) -> None:
+    """Resizing must reuse the shown frame and only update the camera size after a pause."""
+    visualisation = VisualisationGui()
+    qtbot.addWidget(visualisation)
+    with (
+        patch('sensorium.engine.visualization_gui.show_stereo_images') as mock_update_camera,
+        patch('sensorium.visualization.trajectory_visualization.Trajectory.draw_line'),
+        patch('sensorium.visualization.lidar_visualization.PointcloudVis.update_scene'),
+        patch('sensorium.visualization.voxel_widget.VoxelWidget.update_scene'),
+    ):
+        await visualisation.load_frame(0, 5)
+        await visualisation.load_frame(0, 5)
+        assert mock_update_camera.call_count == 1
+
+        for width in range(800, 1200, 100):
+            visualisation.resize(width, 900)
+        await asyncio.sleep(0.1)
+        assert visualisation.resize_timer.isActive()
+        qtbot.waitUntil(lambda: not visualisation.resize_timer.isActive())
+        assert mock_update_camera.call_count == 1
+
+
+@pytest.mark.usefixtures('_event_loop')
+@pytest.mark.skipif(bool(os.getenv('CI')), reason='no windowing system available in CI')
+@pytest.mark.asyncio
+async def test_apply_quality(qtbot: QtBot) -> None:
+    """The widgets must request the data at the quality level of the controller."""
+    visualisation = VisualisationGui()
+    qtbot.addWidget(visualisation)
+    visualisation.quality.enabled = True
+    visualisation.quality.level_index = len(visualisation.quality.levels) - 1
+    visualisation.apply_quality()
+    level = visualisation.quality.level
+    assert visualisation.pointcloud.lidar_subsample == level.lidar_subsample
+    assert visualisation.voxel.voxel_encoding == level.voxel_encoding
+    assert visualisation.camera2.quality_scale == level.camera_scale
+
+    visualisation.quality.level_index = 0
+    visualisation.apply_quality()
+    assert visualisation.pointcloud.lidar_encoding == visualisation.lidar_encoding
+    assert visualisation.voxel.voxel_encoding == visualisation.voxel_encoding
+    assert visualisation.camera3.quality_scale == 1.0
+
+
 @pytest.mark.usefixtures('_event_loop')
 @pytest.mark.skipif(bool(os.getenv('CI')), reason='no windowing system available in CI')
 @pytest.mark.asyncio
@@ -149,9 +196,9 @@ async def test_toggle_play_stop(qtbot: QtBot) -> None:
     await visualisation.toggle_play_stop()
     assert visualisation.play_en is False
     assert visualisation.button_play_stop.text() == 'Stop'
-    assert visualisation.animation_timer.isActive()
+    assert visualisation.playback_task is not None
     qtbot.mouseClick(visualisation.button_play_stop, Qt.LeftButton)  # type: ignore[attr-defined]
     await asyncio.sleep(0.1)
     assert visualisation.play_en is True
     assert visualisation.button_play_stop.text() == 'Play'
-    assert not visualisation.animation_timer.isActive()
+    assert visualisation.playback_task is None
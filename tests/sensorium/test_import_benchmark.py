@@ -0,0 +1,21 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Import time benchmark tests."""
+
+from __future__ import annotations
+
+from sensorium.import_benchmark import measure_import
+
+
+def test_server_imports_no_gui() -> None:
+    """Test that the headless server loads neither Qt nor a visualization stack nor numba."""
+    import_time = measure_import('sensorium.server')
+    assert import_time.module == 'sensorium.server'
+    assert import_time.seconds > 0
+    assert import_time.heavy_packages == ['cv2']
+
+
+def test_launch_defers_visualization() -> None:
+    """Test that the launch window loads the visualization stacks only in client mode."""
+    heavy_packages = measure_import('sensorium.launch.launch').heavy_packages
+    assert not {'numba', 'pygfx', 'wgpu', 'mayavi', 'vtk'} & set(heavy_packages)
@@ -4,9 +4,19 @@
 
 from __future__ import annotations
 
+import asyncio
+import socket
+from typing import TYPE_CHECKING
 from unittest.mock import patch
 
-from sensorium.server import run
+import pytest
+import websockets
+
+from sensorium.communication.server_comm import ServerConfig
+from sensorium.server import get_server_config, parse_args, run, start_workers
+
+if TYPE_CHECKING:
+    from pathlib import Path
 
 
 def test_entrypoint() -> None:
@@ -14,8 +24,58 @@ def test_entrypoint() -> None:
     assert callable(run)
 
 
-def test_calls_sleep() -> None:
-    """Test entrypoint calls sleep."""
-    with patch('time.sleep') as sleep_mock:
-        run()
-        sleep_mock.assert_called_once_with(5)
+def test_parse_args() -> None:
+    """Test the command line options."""
+    args = parse_args(['--port', '9000', '--workers', '3'])
+    assert (args.port, args.host, args.workers) == (9000, 'localhost', 3)
+    with pytest.raises(SystemExit):
+        parse_args(['--workers', '0'])
+    with pytest.raises(SystemExit):
+        parse_args(['--compression-level', '10'])
+    with pytest.raises(SystemExit):
+        parse_args(['--map-stride', '0'])
+    with pytest.raises(SystemExit):
+        parse_args(['--config', 'missing.yaml'])
+
+
+def test_get_server_config(tmp_path: Path) -> None:
+    """Test that the command line options override the config file."""
+    config_file = tmp_path / 'sensorium.yaml'
+    config_file.write_text('backend_engine:\n  data_dir: kitti\n  cache_dir: cache\n')
+    args = parse_args(['--config', str(config_file), '--cache-size', '2', '--map-stride', '1'])
+    assert get_server_config(args) == ServerConfig(
+        'kitti', 'cache', static_data_cache_size=2, map_stride=1
+    )
+
+    args = parse_args(['--config', str(tmp_path / 'missing.yaml'), '--data-dir', 'other'])
+    args.compression_level = 1
+    assert get_server_config(args) == ServerConfig('other', compression_level=1)
+
+
+def test_run_single_worker(tmp_path: Path) -> None:
+    """Test that one worker serves in the calling process."""
+    with patch('sensorium.server.run_worker') as run_worker_mock:
+        run(['--port', '9001', '--data-dir', str(tmp_path), '--config', str(tmp_path / 'x')])
+        run_worker_mock.assert_called_once_with(9001, 'localhost', ServerConfig(str(tmp_path)))
+
+
+@pytest.mark.skipif(not hasattr(socket, 'SO_REUSEPORT'), reason='SO_REUSEPORT not supported')
+@pytest.mark.asyncio
+async def test_workers_share_port(tmp_path: Path) -> None:
+    """Test that the worker processes all listen on the same port."""
+    processes = start_workers(8768, '127.0.0.1', ServerConfig(str(tmp_path)), 2)
+    try:
+        for _ in range(100):  # the workers need a moment to import and bind
+            try:
+                async with websockets.connect('ws://127.0.0.1:8768'):
+                    break
+            except OSError:
+                await asyncio.sleep(0.1)
+        for _ in range(4):
+            async with websockets.connect('ws://127.0.0.1:8768') as websocket:
+                assert websocket.open
+        assert all(process.is_alive() for process in processes)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
@@ -7,11 +7,25 @@ from unittest.mock import patch
 import numpy as np
 import pytest
 import qimage2ndarray  # type: ignore[import-untyped]
+from numpy.typing import NDArray
+from PySide6.QtGui import QImage
 from pytestqt.qtbot import QtBot  # type: ignore[import-untyped]
 
 from sensorium.visualization.camera_visualization import CAMERA2_SHAPE, CameraWidget
 
-MOCK_CAMERA_DATA = np.zeros(np.prod(CAMERA2_SHAPE), dtype=np.uint8)
+MOCK_BGR = (255, 0, 0)
+
+
+async def mock_get_camera_data(
+    sequence_id: int,  # noqa: ARG001
+    frame_id: int,  # noqa: ARG001
+    out: NDArray[np.uint8],
+    size: tuple[int, int],
+) -> NDArray[np.uint8]:
+    """Fill the buffer with a blue BGR frame, like get_camera2_data."""
+    assert out.shape == (size[1], size[0], 3)
+    out[:] = MOCK_BGR
+    return out
 
 
 @pytest.mark.asyncio
@@ -23,23 +37,68 @@ async def test_show_image(qtbot: QtBot) -> None:
     """
     with patch(
         'sensorium.visualization.camera_visualization.get_camera2_data',
-        return_value=MOCK_CAMERA_DATA,
+        side_effect=mock_get_camera_data,
     ):
         widget = CameraWidget(camera_id='camera2')
         qtbot.addWidget(widget)
+        frame_buffer = widget.label.image().constBits()
 
         await widget.show_image(seq_id=0, frame_id=0)
 
-        pixmap = widget.label.pixmap()
-        assert not pixmap.isNull()
-        assert (pixmap.height(), pixmap.width()) == CAMERA2_SHAPE[:2]
+        image = widget.label.image()
+        assert not image.isNull()
+        assert (image.height(), image.width()) == CAMERA2_SHAPE[:2]
+        # The frame is decoded into the buffer shared by the image, without a new image
+        assert image.constBits() == frame_buffer
 
-        # qimage2ndarray extenion used to convert QImage to a numpy array
-        img_array = qimage2ndarray.rgb_view(pixmap.toImage())
+        # qimage2ndarray extenion used to convert QImage to a numpy array, it has no BGR888 view
+        rgb_image = image.convertToFormat(QImage.Format.Format_RGB32)
+        img_array = qimage2ndarray.rgb_view(rgb_image)
         assert img_array.shape == CAMERA2_SHAPE
+        assert np.all(img_array == MOCK_BGR[::-1])
+
+        # The painted image is scaled to the view, keeping the aspect ratio
+        widget.label.resize(CAMERA2_SHAPE[1] // 2, CAMERA2_SHAPE[0])
+        painted_image = widget.label.grab().toImage()
+        painted = qimage2ndarray.rgb_view(painted_image)
+        assert np.all(painted[0, 0] == MOCK_BGR[::-1])
+        assert np.all(painted[-1, 0] != MOCK_BGR[::-1])
+
+        # A smaller label requests smaller frames, decoded into a new shared buffer that starts
+        # with the shown frame scaled down
+        widget.set_display_size(613, 300)
+        assert np.all(widget.frame == MOCK_BGR)
+        await widget.show_image(seq_id=0, frame_id=0)
+        assert widget.label.image().size().toTuple() == (613, 185)
+
+        # A lower quality requests a part of the display resolution
+        widget.set_quality_scale(0.5)
+        assert widget.frame.shape == (92, 305, 3)
 
         widget = CameraWidget(camera_id='invalid_camera')
         qtbot.addWidget(widget)
 
         with pytest.raises(ValueError, match='Invalid camera_id'):
             await widget.show_image(seq_id=0, frame_id=0)
+
+
+@pytest.mark.asyncio
+async def test_show_image_resized_during_decode(qtbot: QtBot) -> None:
+    """A frame decoded while the buffer is reallocated must be scaled into the new buffer."""
+    widget = CameraWidget(camera_id='camera2')
+    qtbot.addWidget(widget)
+
+    async def resizing_get_camera_data(
+        sequence_id: int, frame_id: int, out: NDArray[np.uint8], size: tuple[int, int]
+    ) -> NDArray[np.uint8]:
+        widget.set_display_size(613, 300)
+        return await mock_get_camera_data(sequence_id, frame_id, out, size)
+
+    with patch(
+        'sensorium.visualization.camera_visualization.get_camera2_data',
+        side_effect=resizing_get_camera_data,
+    ):
+        await widget.show_image(seq_id=0, frame_id=0)
+    assert widget.frame.shape == (185, 613, 3)
+    assert widget.label.image().size().toTuple() == (613, 185)
+    assert np.all(widget.frame == MOCK_BGR)
@@ -98,3 +98,16 @@ def test_load_colors_gradient() -> None:
     assert np.all(colors[:, 0] == 1)
     assert np.all(colors[:, 2] == 0)
     assert colors[0, 1] > colors[1, 1] > colors[2, 1]
+
+
+@pytest.mark.skipif(bool(os.getenv('CI')), reason='no windowing system available in CI')
+def test_load_colors_semantic() -> None:
+    """Test the load_colors_semantic method uses the ground truth RGB colors."""
+    pointcloud_vis = PointcloudVis()
+    labels = np.array([0, 10, 40], dtype=np.uint16)
+    colors = pointcloud_vis.load_colors_semantic(labels)
+    assert colors.shape == (3, 3)
+    assert colors.dtype == np.float32
+    assert np.allclose(colors[0], [0, 0, 0])
+    assert np.allclose(colors[1], np.array([100, 150, 245]) / 255)  # car, BGR to RGB
+    assert np.allclose(colors[2], np.array([255, 0, 255]) / 255)  # road
@@ -0,0 +1,64 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Test module for the thumbnail strip."""
+
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from pytestqt.qtbot import QtBot
+
+from sensorium.data_processing.camera.thumbnails import ThumbnailAtlas
+from sensorium.visualization.thumbnail_strip import ThumbnailStrip
+
+
+async def mock_get_thumbnail_data(sequence_id: int) -> ThumbnailAtlas:
+    """Return an atlas of 4 red thumbnails of 16x5 pixel, like get_thumbnail_data."""
+    atlas = np.zeros((5, 4 * 16, 3), dtype=np.uint8)
+    atlas[:, :, 2] = 255
+    _, encoded = cv2.imencode('.jpg', atlas)
+    return ThumbnailAtlas(encoded.tobytes(), step=10, num_thumbnails=4 + sequence_id, columns=4)
+
+
+@pytest.mark.asyncio
+async def test_load_thumbnails(qtbot: QtBot) -> None:
+    """The strip must be shown once the atlas of the sequence is loaded."""
+    widget = ThumbnailStrip()
+    qtbot.addWidget(widget)
+    widget.set_range(40)
+    widget.set_frame(25)
+    assert not widget.has_thumbnails(0)
+
+    with patch(
+        'sensorium.visualization.thumbnail_strip.get_thumbnail_data',
+        side_effect=mock_get_thumbnail_data,
+    ):
+        await widget.load(0)
+    assert widget.has_thumbnails(0)
+    assert not widget.has_thumbnails(1)
+    assert not widget.isHidden()
+
+    # The strip paints from the atlas without any request
+    widget.resize(320, widget.height())
+    image = widget.grab().toImage()
+    color = image.pixelColor(10, image.height() // 2)
+    assert color.red() > 200
+    assert color.blue() < 50
+
+
+@pytest.mark.asyncio
+async def test_load_thumbnails_unavailable(
+    qtbot: QtBot, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """The strip must stay hidden if the server cannot send the thumbnails."""
+    widget = ThumbnailStrip()
+    qtbot.addWidget(widget)
+    with patch(
+        'sensorium.visualization.thumbnail_strip.get_thumbnail_data',
+        side_effect=ConnectionError('Client is not connected.'),
+    ):
+        await widget.load(3)
+    assert not widget.has_thumbnails(3)
+    assert widget.seq_id == 3  # not requested again for every frame
+    assert 'Thumbnails of sequence 3 not available' in capsys.readouterr().out
@@ -0,0 +1,50 @@
+# Copyright 2024  Projektpraktikum Python.
+# SPDX-License-Identifier: Apache-2.0
+"""Test module for the pygfx voxel visualization."""
+
+import numpy as np
+
+from sensorium.data_processing.voxel_process.voxel_geometry import extract_voxel_geometry
+from sensorium.data_processing.voxel_process.voxel_mesh import (
+    extract_voxel_surface,
+    surface_to_mesh,
+)
+from sensorium.visualization.voxel_gfx_widget import (
+    VoxelGfxScene,
+    get_vertex_colors,
+    get_voxel_color_luts,
+)
+
+
+def test_get_vertex_colors() -> None:
+    """Every vertex must get the class color of its quad, darker outside the FOV."""
+    voxel = np.zeros((4, 4, 4), dtype=np.uint8)
+    voxel[1, 1, 1] = 1
+    voxel[2, 1, 1] = 9
+    fov_mask = np.zeros(voxel.size, dtype=np.bool_)
+    fov_mask[np.ravel_multi_index((1, 1, 1), voxel.shape)] = True
+
+    colors = get_vertex_colors(surface_to_mesh(extract_voxel_surface(voxel, fov_mask)))
+    fov_lut, outfov_lut = get_voxel_color_luts()
+    assert colors.shape == (40, 4)
+    assert np.sum(np.all(colors == fov_lut[1], axis=1)) == 20
+    assert np.sum(np.all(colors == outfov_lut[9], axis=1)) == 20
+
+
+def test_voxel_gfx_scene_updates_in_place() -> None:
+    """Smaller frames must reuse the mesh buffers and only change the draw range."""
+    voxel = np.zeros((8, 8, 8), dtype=np.uint8)
+    voxel[::2, ::2, ::2] = 3
+    fov_mask = np.ones(voxel.size, dtype=np.bool_)
+    t_velo_2_cam = np.eye(4)
+
+    voxel_scene = VoxelGfxScene()
+    voxel_scene.set_geometry(extract_voxel_geometry(voxel, fov_mask), t_velo_2_cam)
+    mesh = voxel_scene.mesh
+    assert mesh is not None
+    assert mesh.geometry.indices.draw_range == (0, 64 * 6)
+
+    voxel[4:] = 0
+    voxel_scene.set_mesh(surface_to_mesh(extract_voxel_surface(voxel, fov_mask)), t_velo_2_cam)
+    assert voxel_scene.mesh is mesh
+    assert voxel_scene.mesh.geometry.indices.draw_range == (0, 32 * 6)